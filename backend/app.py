@@ -5,7 +5,6 @@ import logging
 import time
 import sys
 import threading
-from datetime import date
 
 # Add parent directory to Python path so we can import backend modules
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -20,13 +19,23 @@ from backend.routes.user_routes import user_bp
 from backend.routes.cart_routes import cart_bp
 from backend.routes.order_routes import order_bp
 from backend.routes.wishlist_routes import wishlist_bp
-from backend.routes.banner_routes import banner_bp
-from backend.routes.offer_routes import offer_bp
+from backend.routes.banner_routes import banner_bp, ACTIVE_BANNERS_CACHE_KEY, build_active_banners_payload
+from backend.routes.offer_routes import offer_bp, ACTIVE_OFFERS_CACHE_KEY, build_active_offers_payload
 from backend.routes.analytics_routes import analytics_bp
 from backend.routes.review_routes import review_bp
 from backend.routes.report_routes import report_bp
-from backend.utils.database import db
+from backend.routes.ops_routes import ops_bp
+from backend.utils.database import db, get_db_stats
+from backend.utils.query_profiler import init_query_profiler
 from backend.utils.response_cache import response_cache
+from backend.utils.http_cache import cache_encoded, get_http_cache_stats
+from backend.utils.auth_middleware import get_auth_cache_stats
+from backend.services.catalog_service import CatalogService, get_catalog_stats
+from backend.services.inventory_service import InventoryService
+from backend.services.related_products_service import RelatedProductsService
+from backend.services.review_service import ReviewService
+from backend.services.sales_rollup_service import SalesRollupService
+from backend.utils.rate_limiter import RateLimiter
 
 # Configure logging
 logging.basicConfig(
@@ -52,93 +61,43 @@ def create_app():
          allow_headers=["Content-Type", "Authorization"],
          supports_credentials=True)
     
+    # Request-scoped database connection, returned to the pool at teardown
+    db.init_app(app)
+    # Per-endpoint latency / statement / DB time histograms (see /api/ops/endpoints)
+    init_query_profiler(app)
+
     # Test database connection on startup
     with app.app_context():
         if db.test_connection():
             logging.info("✅ Database connection successful")
+            # Fills the rating aggregates only while their table is empty
+            ReviewService.seed_stats()
         else:
             logging.error("❌ Database connection failed")
 
     def prime_read_cache():
         """Warm the most requested home-page payloads after startup."""
         try:
-            categories_query = """
-                SELECT c.*, COUNT(p.id) as products_count
-                FROM categories c
-                LEFT JOIN products p ON c.id = p.category_id
-                    AND p.status = 'active'
-                    AND p.stock > 0
-                WHERE c.status = 'active'
-                GROUP BY c.id
-                ORDER BY c.position, c.id
-            """
-            categories = db.execute_query(categories_query, fetch=True)
-            categories_payload = {
-                "success": True,
-                "categories": [dict(cat) for cat in categories if cat['products_count'] > 0],
-                "count": len([cat for cat in categories if cat['products_count'] > 0]),
-            }
-            response_cache.set("categories:active:v1", categories_payload, ttl_seconds=45)
-
-            products_query = """
-                SELECT p.*, c.name as category_name
-                FROM products p
-                LEFT JOIN categories c ON p.category_id = c.id
-                WHERE p.status = 'active' AND p.stock > 0
-                ORDER BY p.id
-            """
-            products = db.execute_query(products_query, fetch=True)
-            products_payload = {
-                "success": True,
-                "products": [dict(product) for product in products],
-                "count": len(products),
-            }
-            response_cache.set(
-                "products:list:v2:category=:search=:limit=:include_oos=False",
-                products_payload,
-                ttl_seconds=30,
-            )
+            # Products and categories are served from the in-process catalog snapshot
+            CatalogService.snapshot()
+            logging.info("✅ Catalog snapshot built")
+        except Exception as catalog_exc:
+            logging.warning(f"⚠️ Catalog snapshot warmup skipped: {catalog_exc}")
 
-            banners_query = """
-                SELECT * FROM banners
-                WHERE status = 'active'
-                AND (start_date IS NULL OR start_date <= CURRENT_DATE)
-                AND (end_date IS NULL OR end_date >= CURRENT_DATE)
-                ORDER BY display_order, id
-            """
-            banners = db.execute_query(banners_query, fetch=True)
-            response_cache.set(
-                "banners:active:v1",
-                {
-                    "success": True,
-                    "banners": [dict(banner) for banner in banners],
-                    "count": len(banners),
-                },
-                ttl_seconds=60,
-            )
+        hot_payloads = (
+            (ACTIVE_BANNERS_CACHE_KEY, build_active_banners_payload, 60),
+            (ACTIVE_OFFERS_CACHE_KEY, build_active_offers_payload, 45),
+        )
+        # With a shared backend the first worker to boot warms the cache for the rest
+        if all(response_cache.get(key) is not None for key, _, _ in hot_payloads):
+            logging.info(f"✅ Hot API cache already warm ({response_cache.backend.name} backend)")
+            return
 
-            today = date.today().isoformat()
-            offers_query = """
-                SELECT id, title, description, code, discount_type, discount_value,
-                       min_order_value, max_discount_amount, image_url,
-                       start_date, end_date, offer_type
-                FROM offers
-                WHERE status = 'active'
-                  AND start_date <= %s
-                  AND end_date >= %s
-                  AND used_count < usage_limit
-                ORDER BY id ASC
-            """
-            offers = db.execute_query(offers_query, (today, today), fetch=True)
-            offers_payload = []
-            for offer in offers:
-                offer_dict = dict(offer)
-                if offer_dict.get('start_date'):
-                    offer_dict['start_date'] = offer_dict['start_date'].isoformat()
-                if offer_dict.get('end_date'):
-                    offer_dict['end_date'] = offer_dict['end_date'].isoformat()
-                offers_payload.append(offer_dict)
-            response_cache.set("offers:active:v1", offers_payload, ttl_seconds=45)
+        try:
+            # Encoding uses the app's JSON provider, so it needs an app context
+            with app.app_context():
+                for cache_key, build_payload, ttl_seconds in hot_payloads:
+                    cache_encoded(cache_key, build_payload, ttl_seconds=ttl_seconds)
 
             logging.info("✅ Hot API cache primed")
         except Exception as cache_exc:
@@ -157,9 +116,43 @@ def create_app():
     app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
     app.register_blueprint(review_bp, url_prefix='/api/reviews')
     app.register_blueprint(report_bp, url_prefix='/api/reports')
+    app.register_blueprint(ops_bp, url_prefix='/api/ops')
 
     # Prime cache in background so first user doesn't pay cold-query latency.
     threading.Thread(target=prime_read_cache, daemon=True).start()
+
+    def sweep_stock_holds():
+        """Return stock from expired checkout holds on a fixed interval."""
+        while True:
+            time.sleep(Config.STOCK_HOLD_SWEEP_SECONDS)
+            InventoryService.release_expired_holds()
+
+    threading.Thread(target=sweep_stock_holds, daemon=True).start()
+
+    def sweep_rate_limits():
+        """Drop expired rate limit counters off the request path."""
+        while True:
+            time.sleep(Config.RATE_LIMIT_SWEEP_SECONDS)
+            RateLimiter.purge_expired()
+
+    threading.Thread(target=sweep_rate_limits, daemon=True).start()
+
+    def catch_up_sales_rollups():
+        """Backfill, then keep the dashboard rollups in sync with orders."""
+        while True:
+            SalesRollupService.catch_up()
+            time.sleep(Config.SALES_ROLLUP_CATCHUP_SECONDS)
+
+    threading.Thread(target=catch_up_sales_rollups, daemon=True).start()
+
+    def refresh_related_products():
+        """Count co-purchases of new orders, then reload changed neighbor lists."""
+        while True:
+            RelatedProductsService.catch_up()
+            RelatedProductsService.refresh()
+            time.sleep(Config.RELATED_PRODUCTS_REFRESH_SECONDS)
+
+    threading.Thread(target=refresh_related_products, daemon=True).start()
     
     # Add security headers
     @app.after_request
@@ -226,6 +219,14 @@ def health_check():
             'sms': sms_services,
             'payments': False,  # TODO: Add payment gateway check
         },
+        'response_cache': {
+            'backend': response_cache.backend.name,
+            'worker_pid': os.getpid(),
+            **get_http_cache_stats(),
+        },
+        'auth_cache': get_auth_cache_stats(),
+        'catalog': get_catalog_stats(),
+        'database': get_db_stats(),
         'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
         'version': '2.0.0'
     })
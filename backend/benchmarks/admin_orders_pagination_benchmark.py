@@ -0,0 +1,156 @@
+"""
+Benchmark: Admin Orders Pagination
+Seeds N synthetic orders (default 1,000,000, two items and one timeline
+entry each) and compares, page by page at increasing depth:
+- legacy: OFFSET paging with per-row JSON_AGG subqueries
+- keyset: (created_at, id) cursor with batch-loaded items/timeline
+plus the exact / approx / cached total count modes.
+
+Usage (from repo root, DATABASE_URL pointing at a scratch database):
+    python backend/benchmarks/admin_orders_pagination_benchmark.py
+    python backend/benchmarks/admin_orders_pagination_benchmark.py --orders 200000 --keep
+Synthetic rows use the id prefix BENCH and are deleted afterwards unless --keep.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add repo root and backend to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+sys.path.insert(0, BACKEND_DIR)
+
+from backend.utils.database import db
+from backend.services.order_list_service import OrderListService
+
+ID_PREFIX = 'BENCH'
+
+LEGACY_QUERY = """
+    SELECT o.*,
+           (SELECT COUNT(*) FROM order_items WHERE order_id = o.id) as items_count,
+           COALESCE(
+               (SELECT JSON_AGG(
+                   JSON_BUILD_OBJECT(
+                       'product_name', oi.product_name,
+                       'quantity', oi.quantity,
+                       'price', oi.product_price,
+                       'total', oi.total_price,
+                       'product_id', oi.product_id
+                   )
+               )
+               FROM order_items oi
+               WHERE oi.order_id = o.id),
+               '[]'::json
+           ) as items,
+           COALESCE(
+               (SELECT JSON_AGG(
+                   JSON_BUILD_OBJECT(
+                       'status', ot.status,
+                       'timestamp', ot.timestamp,
+                       'completed', ot.completed,
+                       'notes', ot.notes
+                   ) ORDER BY ot.timestamp
+               )
+               FROM order_timeline ot
+               WHERE ot.order_id = o.id),
+               '[]'::json
+           ) as timeline
+    FROM orders o
+    ORDER BY o.created_at DESC
+    LIMIT %s OFFSET %s
+"""
+
+
+def seed(n_orders, batch=100000):
+    existing = db.execute_query_one(
+        "SELECT COUNT(*) as n FROM orders WHERE id LIKE %s", (ID_PREFIX + '%',)
+    )['n']
+    if existing >= n_orders:
+        print(f"♻️  Reusing {existing:,} seeded orders")
+        return
+
+    print(f"🌱 Seeding {n_orders - existing:,} orders...")
+    started = time.perf_counter()
+    for low in range(existing, n_orders, batch):
+        high = min(low + batch, n_orders) - 1
+        db.execute_query("""
+            INSERT INTO orders (id, phone, user_name, total, subtotal, delivery_fee, status,
+                                payment_status, payment_method, delivery_address, created_at, order_date)
+            SELECT %s || g, '9000000000', 'Bench User', 120.00, 100.00, 20.00,
+                   (ARRAY['pending','confirmed','preparing','out_for_delivery','delivered','cancelled'])[1 + g %% 6],
+                   'pending', 'cash', 'Bench Street',
+                   TIMESTAMP '2020-01-01' + g * INTERVAL '1 minute',
+                   (TIMESTAMP '2020-01-01' + g * INTERVAL '1 minute')::date
+            FROM generate_series(%s, %s) g;
+
+            INSERT INTO order_items (order_id, product_name, product_price, quantity, total_price)
+            SELECT %s || g, 'Bench Item ' || k, 50.00, 1, 50.00
+            FROM generate_series(%s, %s) g, generate_series(1, 2) k;
+
+            INSERT INTO order_timeline (order_id, status, completed, timestamp)
+            SELECT %s || g, 'Order Placed', true, TIMESTAMP '2020-01-01' + g * INTERVAL '1 minute'
+            FROM generate_series(%s, %s) g;
+        """, (ID_PREFIX, low, high, ID_PREFIX, low, high, ID_PREFIX, low, high))
+        print(f"   {high + 1:,} / {n_orders:,}")
+    db.execute_query("ANALYZE orders; ANALYZE order_items; ANALYZE order_timeline;")
+    print(f"   seeded in {time.perf_counter() - started:.1f}s")
+
+
+def cleanup():
+    db.execute_query("DELETE FROM orders WHERE id LIKE %s", (ID_PREFIX + '%',))
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def cursor_at(depth):
+    """Cursor for the row just before `depth` (found once, not timed)"""
+    if depth == 0:
+        return None
+    row = db.execute_query_one(
+        "SELECT created_at, id FROM orders ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET %s",
+        (depth - 1,)
+    )
+    return OrderListService.encode_cursor(row)
+
+
+def run(args):
+    OrderListService.init_order_indexes()
+    seed(args.orders)
+    total = db.execute_query_one("SELECT COUNT(*) as n FROM orders")['n']
+    depths = [d for d in (0, 1000, 10000, 100000, 500000, 900000) if d < total]
+
+    print(f"\n📊 page size {args.limit}, {total:,} orders, median of {args.repeat} runs (ms)")
+    print(f"{'depth':>10} {'legacy OFFSET':>15} {'keyset':>10}")
+    for depth in depths:
+        legacy_ms = timed(lambda: db.execute_query(LEGACY_QUERY, (args.limit, depth), fetch=True), args.repeat)
+        cursor = cursor_at(depth)
+        keyset_ms = timed(lambda: OrderListService.fetch_page(limit=args.limit, cursor=cursor), args.repeat)
+        print(f"{depth:>10,} {legacy_ms:>15.1f} {keyset_ms:>10.1f}")
+
+    print(f"\n{'count mode':>10} {'ms':>10} {'value':>12}")
+    OrderListService.invalidate_counts()
+    for mode in ('exact', 'approx', 'cached'):
+        ms = timed(lambda: OrderListService.count(None, mode), args.repeat)
+        print(f"{mode:>10} {ms:>10.2f} {OrderListService.count(None, mode):>12,}")
+
+    if not args.keep:
+        print("\n🧹 Removing synthetic orders...")
+        cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help='keep the seeded orders for reruns')
+    run(parser.parse_args())
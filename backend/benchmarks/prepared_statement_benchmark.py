@@ -0,0 +1,137 @@
+"""
+Benchmark: Prepared Statements
+Compares plain and server-side prepared execution (db.execute_query /
+execute_query_one with prepared=True) for the hot lookups:
+- per query: product stock, user by id and the cart join, run on one
+  request-scoped connection (one round trip each, no checkout)
+- per endpoint: GET /api/cart/ and POST /api/cart/add, whose product
+  and cart queries are prepared
+
+Usage (from repo root, DATABASE_URL pointing at a scratch database):
+    python backend/benchmarks/prepared_statement_benchmark.py
+    python backend/benchmarks/prepared_statement_benchmark.py --cart-items 20 --repeat 5000 --keep
+Synthetic rows are marked with image_url 'bench://prepared' (products)
+and phone BENCH_PHONE (user, cart), and deleted afterwards unless --keep.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add repo root and backend to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+sys.path.insert(0, BACKEND_DIR)
+
+from flask import Flask
+
+import backend.utils.database as database
+from backend.utils.database import db
+from backend.routes.cart_routes import cart_bp
+
+MARKER = 'bench://prepared'
+BENCH_PHONE = '0000000042'
+
+PRODUCT_QUERY = "SELECT stock FROM products WHERE id = %s AND status = 'active'"
+USER_QUERY = "SELECT * FROM users WHERE id = %s"
+CART_QUERY = """
+            SELECT c.*, p.name, p.price, p.original_price, p.size,
+                   p.image_url, p.stock, p.category_name
+            FROM cart_items c
+            JOIN products p ON c.product_id = p.id
+            WHERE c.user_id = %s AND p.status = 'active'
+            ORDER BY c.created_at DESC
+        """
+
+
+def seed(n_cart_items):
+    user = db.execute_query_one("SELECT id FROM users WHERE phone = %s", (BENCH_PHONE,))
+    if user is None:
+        user = db.execute_query_one(
+            "INSERT INTO users (name, phone) VALUES ('Benchmark User', %s) RETURNING id",
+            (BENCH_PHONE,)
+        )
+    products = db.execute_query("SELECT id FROM products WHERE image_url = %s ORDER BY id", (MARKER,), fetch=True)
+    if len(products) < n_cart_items:
+        db.execute_query("""
+            INSERT INTO products (name, price, original_price, size, stock, image_url, status)
+            SELECT 'Benchmark Product ' || g, 10 + g, 12 + g, '1 pc', 100000, %s, 'active'
+            FROM generate_series(%s, %s) g
+        """, (MARKER, len(products) + 1, n_cart_items))
+        products = db.execute_query("SELECT id FROM products WHERE image_url = %s ORDER BY id", (MARKER,), fetch=True)
+
+    db.execute_query("DELETE FROM cart_items WHERE phone = %s", (BENCH_PHONE,))
+    db.execute_query("""
+        INSERT INTO cart_items (user_id, phone, product_id, quantity)
+        SELECT %s, %s, id, 1 FROM unnest(%s::int[]) id
+    """, (user['id'], BENCH_PHONE, [p['id'] for p in products[:n_cart_items]]))
+    return user['id'], products[0]['id']
+
+
+def cleanup():
+    db.execute_query("DELETE FROM cart_items WHERE phone = %s", (BENCH_PHONE,))
+    db.execute_query("DELETE FROM users WHERE phone = %s", (BENCH_PHONE,))
+    db.execute_query("DELETE FROM products WHERE image_url = %s", (MARKER,))
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), statistics.quantiles(samples, n=20)[-1]
+
+
+def run(args):
+    user_id, product_id = seed(args.cart_items)
+    app = Flask(__name__)
+    app.register_blueprint(cart_bp, url_prefix='/api/cart')
+    db.init_app(app)
+    client = app.test_client()
+
+    queries = [
+        ('product stock', lambda prepared: db.execute_query_one(PRODUCT_QUERY, (product_id,), prepared=prepared)),
+        ('user by id', lambda prepared: db.execute_query_one(USER_QUERY, (user_id,), prepared=prepared)),
+        ('cart join', lambda prepared: db.execute_query(CART_QUERY, (user_id,), fetch=True, prepared=prepared)),
+    ]
+    print(f"\n📊 {args.cart_items} cart items, median / p95 of {args.repeat} runs (ms)")
+    print(f"{'query':>16} {'plain':>8} {'p95':>8} {'prepared':>9} {'p95':>8}")
+    for label, query in queries:
+        # One connection for the whole loop, like the queries of one request
+        with app.test_request_context():
+            query(True)
+            plain = timed(lambda: query(False), args.repeat)
+            prepared = timed(lambda: query(True), args.repeat)
+            db.release_request_connection()
+        print(f"{label:>16} {plain[0]:>8.3f} {plain[1]:>8.3f} {prepared[0]:>9.3f} {prepared[1]:>8.3f}")
+
+    endpoints = [
+        ('GET /cart', lambda: client.get(f'/api/cart/?phone={BENCH_PHONE}')),
+        ('POST /cart/add', lambda: client.post(
+            '/api/cart/add', json={'phone': BENCH_PHONE, 'product_id': product_id, 'quantity': 1}
+        )),
+    ]
+    print(f"\n{'endpoint':>16} {'plain':>8} {'p95':>8} {'prepared':>9} {'p95':>8}")
+    for label, request in endpoints:
+        results = []
+        for enabled in (False, True):
+            database.Config.DB_PREPARED_STATEMENTS = enabled
+            request()
+            results.append(timed(request, max(args.repeat // 10, 20)))
+        (plain, plain_p95), (prepared, prepared_p95) = results
+        print(f"{label:>16} {plain:>8.3f} {plain_p95:>8.3f} {prepared:>9.3f} {prepared_p95:>8.3f}")
+
+    print(f"\n{database.get_db_stats()}")
+    if not args.keep:
+        print("\n🧹 Removing synthetic rows...")
+        cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cart-items', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--keep', action='store_true', help='keep the seeded rows for reruns')
+    run(parser.parse_args())
@@ -0,0 +1,141 @@
+"""
+Benchmark: Product Search
+Seeds N synthetic products (default 100,000) and compares, per search
+string (whole word, prefix, two words, typo, mid-word fragment, no hit):
+- legacy: name/description ILIKE '%term%' (sequential scan)
+- search: ProductSearchService (GIN full-text index, plus the trigram
+  index when pg_trgm is installed), uncached
+- cached: the same search served from search_cache
+
+Usage (from repo root, DATABASE_URL pointing at a scratch database):
+    python backend/benchmarks/product_search_benchmark.py
+    python backend/benchmarks/product_search_benchmark.py --products 20000 --limit 0 --keep
+Synthetic rows are marked with image_url 'bench://product' and deleted
+afterwards unless --keep.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add repo root and backend to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+sys.path.insert(0, BACKEND_DIR)
+
+from backend.utils.database import db
+from backend.services.product_search_service import ProductSearchService
+
+MARKER = 'bench://product'
+
+BRANDS = ['Amul', 'Tata', 'Haldiram', 'Britannia', 'Nestle', 'Parle', 'Cadbury', 'Dabur',
+          'Patanjali', 'Mother Dairy', 'Aashirvaad', 'Fortune', 'MTR', 'Lays', 'Kissan']
+ADJECTIVES = ['Classic', 'Dark', 'Fresh', 'Organic', 'Crunchy', 'Spicy', 'Roasted', 'Sweet',
+              'Salted', 'Premium', 'Masala', 'Creamy', 'Toasted', 'Natural', 'Instant']
+ITEMS = ['Chocolate', 'Biscuits', 'Butter', 'Paneer', 'Chips', 'Noodles', 'Tea', 'Coffee',
+         'Cookies', 'Almonds', 'Cashews', 'Honey', 'Ketchup', 'Rice', 'Atta', 'Ghee',
+         'Yogurt', 'Juice', 'Namkeen', 'Muesli']
+
+SEARCHES = [
+    ('word', 'chocolate'),
+    ('prefix', 'choc'),
+    ('two words', 'dark choc'),
+    ('typo', 'chocolte'),
+    ('mid-word', 'ocola'),
+    ('no hit', 'zzqx'),
+]
+
+LEGACY_QUERY = """
+    SELECT p.*, c.name as category_name
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.id
+    WHERE p.status = 'active' AND p.stock > 0
+    AND (p.name ILIKE %s OR p.description ILIKE %s)
+    ORDER BY p.id
+"""
+
+
+def seed(n_products, batch=50000):
+    existing = db.execute_query_one(
+        "SELECT COUNT(*) as n FROM products WHERE image_url = %s", (MARKER,)
+    )['n']
+    if existing >= n_products:
+        print(f"♻️  Reusing {existing:,} seeded products")
+        return
+
+    print(f"🌱 Seeding {n_products - existing:,} products...")
+    started = time.perf_counter()
+    for low in range(existing, n_products, batch):
+        high = min(low + batch, n_products) - 1
+        db.execute_query("""
+            INSERT INTO products (name, price, original_price, size, stock, image_url, description, status)
+            SELECT b.brand || ' ' || a.adjective || ' ' || i.item || ' ' || g,
+                   50 + g %% 500, 60 + g %% 500, '100g', 1 + g %% 50, %s,
+                   a.adjective || ' ' || lower(i.item) || ' by ' || b.brand || ', pack ' || g,
+                   'active'
+            FROM generate_series(%s, %s) g
+            JOIN (SELECT adjective, ordinality - 1 as n FROM unnest(%s::text[]) WITH ORDINALITY adjective) a
+              ON a.n = g %% %s
+            JOIN (SELECT item, ordinality - 1 as n FROM unnest(%s::text[]) WITH ORDINALITY item) i
+              ON i.n = (g / %s) %% %s
+            JOIN (SELECT brand, ordinality - 1 as n FROM unnest(%s::text[]) WITH ORDINALITY brand) b
+              ON b.n = (g / 7) %% %s
+        """, (MARKER, low, high, ADJECTIVES, len(ADJECTIVES), ITEMS, len(ADJECTIVES), len(ITEMS),
+              BRANDS, len(BRANDS)))
+        print(f"   {high + 1:,} / {n_products:,}")
+    db.execute_query("ANALYZE products;")
+    print(f"   seeded in {time.perf_counter() - started:.1f}s")
+
+
+def cleanup():
+    db.execute_query("DELETE FROM products WHERE image_url = %s", (MARKER,))
+    ProductSearchService.invalidate()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def run(args):
+    ProductSearchService.init_search_indexes()
+    seed(args.products)
+    total = db.execute_query_one("SELECT COUNT(*) as n FROM products")['n']
+    limit = args.limit or None
+
+    def legacy(term):
+        query = LEGACY_QUERY + (f" LIMIT {limit}" if limit else "")
+        return db.execute_query(query, (f'%{term}%', f'%{term}%'), fetch=True)
+
+    print(f"\n📊 {total:,} products, limit {limit or 'none'}, "
+          f"pg_trgm {'on' if ProductSearchService.trigram_enabled else 'off'}, "
+          f"median of {args.repeat} runs (ms)")
+    print(f"{'search':>22} {'legacy':>9} {'rows':>7} {'search':>9} {'rows':>7} {'cached':>9}")
+    ProductSearchService.invalidate()
+    for label, term in SEARCHES:
+        legacy_ms, legacy_rows = timed(lambda: legacy(term), args.repeat)
+        search_ms, search_rows = timed(
+            lambda: ProductSearchService.search(term, limit=limit), args.repeat
+        )
+        ProductSearchService.search_payload(term, limit=limit)
+        cached_ms, _ = timed(lambda: ProductSearchService.search_payload(term, limit=limit), args.repeat)
+        print(f"{label + ' ' + repr(term):>22} {legacy_ms:>9.2f} {len(legacy_rows):>7,} "
+              f"{search_ms:>9.2f} {len(search_rows):>7,} {cached_ms:>9.2f}")
+
+    if not args.keep:
+        print("\n🧹 Removing synthetic products...")
+        cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--limit', type=int, default=50, help='rows per search (0 = all matches)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help='keep the seeded products for reruns')
+    run(parser.parse_args())
@@ -0,0 +1,134 @@
+"""
+Benchmark: ResponseCache memory store
+Compares the legacy dict cache (full expiry scan on every call, O(n) min()
+eviction, one global lock) with MemoryCacheBackend (O(1) LRU, lazy expiry
+heap, lock striping) at 1k / 10k / 100k keys.
+
+Usage (from repo root, no database needed):
+    python backend/benchmarks/response_cache_benchmark.py
+    python backend/benchmarks/response_cache_benchmark.py --sizes 1000 10000 --ops 5000 --threads 8
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+import threading
+import time
+
+# Add repo root and backend to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+sys.path.insert(0, BACKEND_DIR)
+
+from backend.utils.cache_backends import MemoryCacheBackend
+
+
+class LegacyResponseCache:
+    """Frozen copy of the original ResponseCache storage, for comparison only."""
+
+    def __init__(self, max_items=1000):
+        self.max_items = max_items
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _purge_expired(self, now):
+        expired = [k for k, v in self._data.items() if v['expires_at'] <= now]
+        for key in expired:
+            self._data.pop(key, None)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            item = self._data.get(key)
+            if not item:
+                return None
+            return copy.deepcopy(item['value'])
+
+    def set(self, key, value, ttl_seconds=30):
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+
+            if len(self._data) >= self.max_items:
+                oldest_key = min(self._data, key=lambda k: self._data[k]['created_at'])
+                self._data.pop(oldest_key, None)
+
+            self._data[key] = {
+                'value': copy.deepcopy(value),
+                'created_at': now,
+                'expires_at': now + ttl_seconds,
+            }
+
+
+PAYLOAD = {'success': True, 'count': 1, 'products': [{'id': 1, 'name': 'Milk', 'price': 28.0}]}
+
+
+def prefill(cache, size):
+    """Fill to capacity. The legacy store is filled directly - set() would be O(n^2)."""
+    if isinstance(cache, LegacyResponseCache):
+        now = time.time()
+        for i in range(size):
+            cache._data[f'products:list:{i}'] = {
+                'value': copy.deepcopy(PAYLOAD),
+                'created_at': now + i * 1e-6,
+                'expires_at': now + 300,
+            }
+    else:
+        for i in range(size):
+            cache.set(f'products:list:{i}', PAYLOAD, ttl_seconds=300)
+
+
+def time_ops(fn, ops):
+    started = time.perf_counter()
+    for i in range(ops):
+        fn(i)
+    return (time.perf_counter() - started) / ops * 1e6
+
+
+def bench(cache_cls, size, ops, threads):
+    cache = cache_cls(max_items=size)
+    prefill(cache, size)
+    rng = random.Random(42)
+    hit_keys = [f'products:list:{rng.randrange(size)}' for _ in range(ops)]
+
+    get_us = time_ops(lambda i: cache.get(hit_keys[i]), ops)
+    # Every set is a new key at capacity, forcing an eviction
+    set_us = time_ops(lambda i: cache.set(f'products:new:{i}', PAYLOAD, ttl_seconds=300), ops)
+
+    def reader():
+        for key in hit_keys:
+            cache.get(key)
+
+    workers = [threading.Thread(target=reader) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    concurrent_rate = threads * ops / (time.perf_counter() - started)
+
+    return get_us, set_us, concurrent_rate
+
+
+def main(args):
+    print(f"📊 ResponseCache memory store ({args.ops} ops per measurement, {args.threads} reader threads)")
+    print(f"{'keys':>8} {'store':>8} {'get µs':>10} {'set+evict µs':>14} {'concurrent gets/s':>18}")
+    for size in args.sizes:
+        results = {}
+        for label, cache_cls in (('legacy', LegacyResponseCache), ('new', MemoryCacheBackend)):
+            results[label] = bench(cache_cls, size, args.ops, args.threads)
+            get_us, set_us, rate = results[label]
+            print(f"{size:>8} {label:>8} {get_us:>10.2f} {set_us:>14.2f} {rate:>18,.0f}")
+        speedup = results['legacy'][0] / results['new'][0]
+        print(f"{'':>8} {'':>8} get speedup x{speedup:.1f}, "
+              f"set speedup x{results['legacy'][1] / results['new'][1]:.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--ops', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=4)
+    main(parser.parse_args())
@@ -0,0 +1,113 @@
+"""
+Benchmark: Concurrent Stock Reservation
+Hammers one product from many threads and checks that stock never goes
+negative and that exactly `stock` units are sold.
+
+Usage (from repo root, DATABASE_URL pointing at a scratch database):
+    python backend/benchmarks/stock_reservation_benchmark.py --stock 500 --threads 16 --attempts 100
+    python backend/benchmarks/stock_reservation_benchmark.py --naive   # legacy check-then-update, oversells
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+# Add repo root and backend to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+sys.path.insert(0, BACKEND_DIR)
+
+from backend.utils.database import db
+from backend.services.inventory_service import InventoryService, InsufficientStockError
+
+
+def naive_reserve(cursor, items):
+    """Legacy pattern: read stock, then decrement unconditionally"""
+    for item in items:
+        cursor.execute("SELECT stock FROM products WHERE id = %s", (item['product_id'],))
+        if cursor.fetchone()['stock'] < item['quantity']:
+            raise InsufficientStockError([{'product_id': item['product_id'],
+                                           'requested': item['quantity'], 'available': 0}])
+        cursor.execute(
+            "UPDATE products SET stock = stock - %s WHERE id = %s",
+            (item['quantity'], item['product_id'])
+        )
+
+
+def create_product(stock):
+    row = db.execute_query_one("""
+        INSERT INTO products (name, price, stock, status)
+        VALUES ('Benchmark Product', 1.00, %s, 'active')
+        RETURNING id
+    """, (stock,))
+    return row['id']
+
+
+def run(args):
+    product_id = create_product(args.stock)
+    reserve = naive_reserve if args.naive else InventoryService.reserve
+    items = [{'product_id': product_id, 'quantity': args.quantity}]
+
+    latencies = []
+    counts = {'sold': 0, 'rejected': 0, 'errors': 0}
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(args.threads)
+
+    def worker():
+        start_barrier.wait()
+        for _ in range(args.attempts):
+            started = time.perf_counter()
+            outcome = 'sold'
+            try:
+                with db.get_cursor() as cursor:
+                    reserve(cursor, items)
+            except InsufficientStockError:
+                outcome = 'rejected'
+            except Exception:
+                outcome = 'errors'
+            elapsed = time.perf_counter() - started
+            with lock:
+                counts[outcome] += 1
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    wall_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall_start
+
+    final_stock = db.execute_query_one(
+        "SELECT stock FROM products WHERE id = %s", (product_id,)
+    )['stock']
+    db.execute_query("DELETE FROM products WHERE id = %s", (product_id,))
+
+    latencies.sort()
+    sold_units = counts['sold'] * args.quantity
+    print(f"\n📊 {'naive check-then-update' if args.naive else 'conditional UPDATE'}")
+    print(f"   threads={args.threads} attempts/thread={args.attempts} initial stock={args.stock}")
+    print(f"   sold={counts['sold']} rejected={counts['rejected']} errors={counts['errors']}")
+    print(f"   units sold={sold_units} final stock={final_stock}")
+    print(f"   throughput={len(latencies) / wall:.0f} req/s")
+    print(f"   p50={statistics.median(latencies) * 1000:.2f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}ms")
+
+    if final_stock < 0 or sold_units > args.stock:
+        print("❌ OVERSOLD")
+        return 1
+    print("✅ No overselling")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--stock', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=16,
+                        help='keep at or below DB_POOL_MAX')
+    parser.add_argument('--attempts', type=int, default=100)
+    parser.add_argument('--quantity', type=int, default=1)
+    parser.add_argument('--naive', action='store_true')
+    sys.exit(run(parser.parse_args()))
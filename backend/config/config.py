@@ -26,14 +26,73 @@ class Config:
     DB_USER = os.getenv('DB_USER', 'postgres')
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'mk0492')
     DATABASE_URL = os.getenv('DATABASE_URL') or f'postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')  # optional read replica; unset = primary only
+    DB_REPLICA_AUTO_ROUTE = os.getenv('DB_REPLICA_AUTO_ROUTE', 'false').lower() == 'true'  # plain SELECT helpers too
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', 5))  # further behind: read the primary
+    DB_REPLICA_LAG_CHECK_SECONDS = float(os.getenv('DB_REPLICA_LAG_CHECK_SECONDS', 2))
     DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 2))
     DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 20))
     DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))  # seconds a checkout waits for a free connection
+    DB_SLOW_QUERY_MS = int(os.getenv('DB_SLOW_QUERY_MS', 500))  # logged by the query profiler
+    DB_EXPLAIN_SAMPLE_RATE = float(os.getenv('DB_EXPLAIN_SAMPLE_RATE', 0.1))  # share of slow queries EXPLAINed
+    DB_EXPLAIN_INTERVAL_SECONDS = int(os.getenv('DB_EXPLAIN_INTERVAL_SECONDS', 300))  # per statement
+    DB_N_PLUS_ONE_THRESHOLD = int(os.getenv('DB_N_PLUS_ONE_THRESHOLD', 10))  # same statement, one request
+    # Hot queries are PREPAREd once per connection; turn off behind a transaction-mode pooler
+    DB_PREPARED_STATEMENTS = os.getenv('DB_PREPARED_STATEMENTS', 'true').lower() == 'true'
+    # One pooled connection per request, single statements in autocommit
+    DB_REQUEST_SCOPED = os.getenv('DB_REQUEST_SCOPED', 'true').lower() == 'true'
+    
+    # Inventory Configuration
+    STOCK_HOLD_MINUTES = int(os.getenv('STOCK_HOLD_MINUTES', 10))
+    STOCK_HOLD_SWEEP_SECONDS = int(os.getenv('STOCK_HOLD_SWEEP_SECONDS', 60))
+
+    # Response Cache Configuration
+    # 'sqlite' shares one store between all workers on the node; 'memory' is per-process
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'sqlite')
+    RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH')  # default: private per-user dir in temp dir
+    RESPONSE_CACHE_MAX_ITEMS = int(os.getenv('RESPONSE_CACHE_MAX_ITEMS', 1000))
+    IDENTITY_CACHE_PATH = os.getenv('IDENTITY_CACHE_PATH')  # default: private per-user dir in temp dir
+    IDENTITY_CACHE_MAX_ITEMS = int(os.getenv('IDENTITY_CACHE_MAX_ITEMS', 50000))  # phone -> user id
+    IDENTITY_CACHE_SECONDS = int(os.getenv('IDENTITY_CACHE_SECONDS', 300))  # phone -> user id
+    CATALOG_SNAPSHOT_SECONDS = int(os.getenv('CATALOG_SNAPSHOT_SECONDS', 30))  # stock refresh; admin writes rebuild at once
+    RELATED_PRODUCTS_REFRESH_SECONDS = int(os.getenv('RELATED_PRODUCTS_REFRESH_SECONDS', 300))  # co-purchase catch-up
+    REVIEW_CACHE_SECONDS = int(os.getenv('REVIEW_CACHE_SECONDS', 300))  # review pages, dropped on review writes
+    RATING_CACHE_PATH = os.getenv('RATING_CACHE_PATH')  # default: private per-user dir in temp dir
+    RATING_CACHE_MAX_ITEMS = int(os.getenv('RATING_CACHE_MAX_ITEMS', 20000))  # one rating summary per product
+    RATING_CACHE_SECONDS = int(os.getenv('RATING_CACHE_SECONDS', 600))  # dropped on review writes
+    SEARCH_CACHE_PATH = os.getenv('SEARCH_CACHE_PATH')  # default: private per-user dir in temp dir
+    SEARCH_CACHE_MAX_ITEMS = int(os.getenv('SEARCH_CACHE_MAX_ITEMS', 5000))
+    SEARCH_CACHE_SECONDS = int(os.getenv('SEARCH_CACHE_SECONDS', 60))  # dropped on product/category writes
+
+    # Analytics Configuration
+    SALES_ROLLUP_CATCHUP_SECONDS = int(os.getenv('SALES_ROLLUP_CATCHUP_SECONDS', 300))
+    SALES_SERIES_CACHE_SECONDS = int(os.getenv('SALES_SERIES_CACHE_SECONDS', 3600))  # dropped on every order write
+
+    # Rate Limit Configuration
+    # 'sqlite' shares counters between all workers on the node; 'memory' is per-process;
+    # 'database' keeps them in PostgreSQL (durable, shared across nodes)
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'sqlite')
+    RATE_LIMIT_PATH = os.getenv('RATE_LIMIT_PATH')  # default: private per-user dir in temp dir
+    RATE_LIMIT_FALLBACK = os.getenv('RATE_LIMIT_FALLBACK', '')  # e.g. 'database'; empty = fail open
+    RATE_LIMIT_SWEEP_SECONDS = int(os.getenv('RATE_LIMIT_SWEEP_SECONDS', 60))
+
+    # Report Export Configuration
+    REPORT_STREAM_ITERSIZE = int(os.getenv('REPORT_STREAM_ITERSIZE', 2000))  # rows per server-side fetch
+    REPORT_PREVIEW_ROWS = int(os.getenv('REPORT_PREVIEW_ROWS', 100))
+    REPORT_PDF_MAX_ROWS = int(os.getenv('REPORT_PDF_MAX_ROWS', 2000))
+    REPORT_JOB_DIR = os.getenv('REPORT_JOB_DIR')  # default: report_jobs/ in the private per-user dir
+    REPORT_JOB_WORKERS = int(os.getenv('REPORT_JOB_WORKERS', 2))  # threads per process
+    REPORT_JOB_TTL_SECONDS = int(os.getenv('REPORT_JOB_TTL_SECONDS', 900))
+    REPORT_JOB_STALE_SECONDS = int(os.getenv('REPORT_JOB_STALE_SECONDS', 600))
     
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY') or 'your-jwt-secret-key-here'
     JWT_ALGORITHM = 'HS256'
     JWT_EXPIRATION_HOURS = 24
+    AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))  # verified tokens per process
+    AUTH_USER_CACHE_SECONDS = int(os.getenv('AUTH_USER_CACHE_SECONDS', 30))  # user id/role/status, per process
+    AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 10000))  # users per process
     
     # Twilio Configuration
     TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
@@ -1,41 +1,64 @@
 """
-Migration Script: Update Rate Limit Tables for Email Support
-Drops and recreates otp_rate_limits table with identifier field instead of phone
+Migration Script: Move Rate Limits to rate_limit_counters
+Rate limits are counted in a pluggable store (node-wide SQLite by default,
+PostgreSQL rate_limit_counters when RATE_LIMIT_BACKEND / RATE_LIMIT_FALLBACK
+is 'database'). The old per-purpose tables are no longer read or written:
+- otp_rate_limits (daily OTP counts per phone/email)
+- api_rate_limits (per IP and endpoint windows)
+This script creates rate_limit_counters and drops those two tables. Their
+rows are short-lived counters, so at most the current day's OTP counts
+are lost. RateLimiter.reset_daily_limits() is gone as well: counters
+expire on their own and the app sweeps them in the background, so the
+cron job that called it can be removed.
+
+Usage (from repo root):
+    python backend/migrate_rate_limits.py
+    python backend/migrate_rate_limits.py --keep-old-tables
 """
+import argparse
 import sys
 import os
 
-# Add backend to path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Add repo root and backend to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+sys.path.insert(0, BACKEND_DIR)
 
 from backend.utils.database import db
 from backend.utils.rate_limiter import RateLimiter
 
-def migrate():
-    """Run migration to update rate limit tables"""
-    print("🔄 Starting migration: Update rate limit tables for email support")
-    
+OLD_TABLES = ('otp_rate_limits', 'api_rate_limits')
+
+def migrate(keep_old_tables=False):
+    """Run migration to the shared rate limit counter table"""
+    print("🔄 Starting migration: rate limits -> rate_limit_counters")
+
     try:
-        # Drop existing table
-        print("📦 Dropping old otp_rate_limits table...")
-        drop_query = "DROP TABLE IF EXISTS otp_rate_limits CASCADE;"
-        db.execute_query(drop_query)
-        print("✅ Old table dropped")
-        
-        # Recreate with new schema
-        print("🆕 Creating new otp_rate_limits table with identifier field...")
+        print("🆕 Creating rate_limit_counters table...")
         RateLimiter.init_rate_limit_tables()
-        print("✅ New table created")
-        
+        print("✅ Table ready")
+
+        if keep_old_tables:
+            print(f"ℹ️  Keeping {', '.join(OLD_TABLES)} (unused by the app, safe to drop later)")
+        else:
+            for table in OLD_TABLES:
+                print(f"📦 Dropping old {table} table...")
+                db.execute_query(f"DROP TABLE IF EXISTS {table} CASCADE;")
+            print("✅ Old tables dropped")
+
         print("\n🎉 Migration completed successfully!")
-        print("📧 Rate limiter now supports both phone numbers and email addresses")
-        
+        print("⏰ Remove any cron job calling RateLimiter.reset_daily_limits() - counters now expire on their own")
+
     except Exception as e:
         print(f"\n❌ Migration failed: {e}")
         return False
-    
+
     return True
 
 if __name__ == "__main__":
-    success = migrate()
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--keep-old-tables', action='store_true',
+                        help='leave otp_rate_limits / api_rate_limits in place')
+    args = parser.parse_args()
+    success = migrate(args.keep_old_tables)
     sys.exit(0 if success else 1)
@@ -0,0 +1,30 @@
+"""
+Maintenance Script: Rebuild Review Stats
+Recomputes product_review_stats from product_reviews, for reviews written
+outside the app (imports, manual SQL). Review writes hold off until it
+commits; the app itself only seeds an empty table on startup.
+"""
+import sys
+import os
+
+# Add repo root and backend to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+sys.path.insert(0, BACKEND_DIR)
+
+from backend.services.review_service import ReviewService
+
+def rebuild():
+    """Rebuild every product's rating aggregate"""
+    print("🔄 Rebuilding product_review_stats from product_reviews...")
+    
+    if not ReviewService.rebuild_stats():
+        print("\n❌ Rebuild failed or another rebuild is running")
+        return False
+    
+    print("\n🎉 Review stats rebuilt")
+    return True
+
+if __name__ == "__main__":
+    success = rebuild()
+    sys.exit(0 if success else 1)
@@ -1,12 +1,16 @@
 """
 Analytics Routes for Admin Dashboard
 Provides real-time statistics and insights from the database
+Order/revenue aggregates are read from the daily sales rollups
+(see SalesRollupService), not from full scans of orders / order_items
 """
 from flask import Blueprint, jsonify, request
 from datetime import datetime, timedelta
 from psycopg2.extras import RealDictCursor
 from backend.utils.database import db
 from backend.utils.auth_middleware import admin_required
+from backend.services.analytics_metrics_service import MetricsEngine, WindowedMetric
+from backend.services.sales_series_service import SalesSeriesService, InvalidSeriesError
 
 analytics_bp = Blueprint('analytics', __name__)  # Removed url_prefix (set in app.py)
 
@@ -21,16 +25,19 @@ def get_dashboard_stats(admin_user):
     - Top products
     """
     try:
-        with db.get_connection() as conn:
+        with db.get_connection(read_only=True) as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
-            # 1. Total Orders
-            cursor.execute('SELECT COUNT(*) as count FROM orders')
-            total_orders = cursor.fetchone()['count']
-            
-            # 2. Total Revenue (fixed: total_amount -> total)
-            cursor.execute('SELECT COALESCE(SUM(total), 0) as revenue FROM orders WHERE status != \'cancelled\'')
-            total_revenue = float(cursor.fetchone()['revenue'])
+            # 1-2. Total Orders / Revenue (all-time, from daily rollup)
+            cursor.execute('''
+                SELECT 
+                    COALESCE(SUM(order_count), 0) as count,
+                    COALESCE(SUM(revenue) FILTER (WHERE status != 'cancelled'), 0) as revenue
+                FROM sales_daily_status
+            ''')
+            row = cursor.fetchone()
+            total_orders = int(row['count'])
+            total_revenue = float(row['revenue'])
             
             # 3. Total Users (fixed: role 'user' -> 'customer')
             cursor.execute('SELECT COUNT(*) as count FROM users WHERE role = \'customer\'')
@@ -42,11 +49,12 @@ def get_dashboard_stats(admin_user):
             
             # 5. Orders by Status
             cursor.execute('''
-                SELECT status, COUNT(*) as count 
-                FROM orders 
+                SELECT status, SUM(order_count) as count 
+                FROM sales_daily_status 
                 GROUP BY status
+                HAVING SUM(order_count) > 0
             ''')
-            orders_by_status = {row['status']: row['count'] for row in cursor.fetchall()}
+            orders_by_status = {row['status']: int(row['count']) for row in cursor.fetchall()}
             
             # 6. Recent Orders (last 10) - Fixed column names
             cursor.execute('''
@@ -80,13 +88,20 @@ def get_dashboard_stats(admin_user):
                     p.name,
                     p.price,
                     p.image_url,
-                    COUNT(oi.id) as order_count,
-                    SUM(oi.quantity) as total_sold,
-                    SUM(oi.total_price) as revenue
+                    COALESCE(s.order_count, 0) as order_count,
+                    s.total_sold,
+                    s.revenue
                 FROM products p
-                LEFT JOIN order_items oi ON p.id = oi.product_id
-                GROUP BY p.id, p.name, p.price, p.image_url
-                ORDER BY order_count DESC, total_sold DESC
+                LEFT JOIN (
+                    SELECT 
+                        product_id,
+                        SUM(line_count) as order_count,
+                        SUM(units_sold) as total_sold,
+                        SUM(revenue) as revenue
+                    FROM sales_daily_product
+                    GROUP BY product_id
+                ) s ON s.product_id = p.id
+                ORDER BY order_count DESC, total_sold DESC NULLS LAST
                 LIMIT 5
             ''')
             top_products = []
@@ -96,8 +111,8 @@ def get_dashboard_stats(admin_user):
                     'name': row['name'],
                     'price': float(row['price']),
                     'imageUrl': row['image_url'],
-                    'orderCount': row['order_count'] or 0,
-                    'totalSold': row['total_sold'] or 0,
+                    'orderCount': int(row['order_count'] or 0),
+                    'totalSold': int(row['total_sold'] or 0),
                     'revenue': float(row['revenue'] or 0)
                 })
             
@@ -105,77 +120,68 @@ def get_dashboard_stats(admin_user):
             cursor.execute('''
                 SELECT 
                     c.name as category_name,
-                    COUNT(DISTINCT oi.order_id) as order_count,
-                    SUM(oi.quantity) as items_sold,
-                    SUM(oi.total_price) as revenue
-                FROM order_items oi
-                JOIN products p ON oi.product_id = p.id
-                JOIN categories c ON p.category_id = c.id
-                JOIN orders o ON oi.order_id = o.id
-                WHERE o.status != 'cancelled'
+                    SUM(s.order_count) as order_count,
+                    SUM(s.units_sold) as items_sold,
+                    SUM(s.revenue) as revenue
+                FROM sales_daily_category s
+                JOIN categories c ON s.category_id = c.id
+                WHERE s.status != 'cancelled'
                 GROUP BY c.id, c.name
+                HAVING SUM(s.order_count) > 0
                 ORDER BY revenue DESC
             ''')
             category_sales = []
             for row in cursor.fetchall():
                 category_sales.append({
                     'category': row['category_name'],
-                    'orderCount': row['order_count'] or 0,
-                    'itemsSold': row['items_sold'] or 0,
+                    'orderCount': int(row['order_count'] or 0),
+                    'itemsSold': int(row['items_sold'] or 0),
                     'revenue': float(row['revenue'] or 0)
                 })
             
             # 9. Revenue Trend (last 7 days) - Fixed column name
             cursor.execute('''
                 SELECT 
-                    DATE(created_at) as date,
-                    COUNT(*) as order_count,
-                    SUM(total) as revenue
-                FROM orders
-                WHERE created_at >= CURRENT_DATE - INTERVAL '7 days'
+                    day as date,
+                    SUM(order_count) as order_count,
+                    SUM(revenue) as revenue
+                FROM sales_daily_status
+                WHERE day >= CURRENT_DATE - 7
                 AND status != 'cancelled'
-                GROUP BY DATE(created_at)
+                GROUP BY day
+                HAVING SUM(order_count) > 0
                 ORDER BY date
             ''')
             revenue_trend = []
             for row in cursor.fetchall():
                 revenue_trend.append({
                     'date': str(row['date']),
-                    'orderCount': row['order_count'],
+                    'orderCount': int(row['order_count']),
                     'revenue': float(row['revenue'] or 0)
                 })
             
-            # 10. Today's Stats - Fixed column name
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) as orders_today,
-                    COALESCE(SUM(total), 0) as revenue_today
-                FROM orders
-                WHERE DATE(created_at) = CURRENT_DATE
-                ''')
-            today_stats = cursor.fetchone()
-            
-            # 11. This Month's Stats - Fixed column name and SQL syntax
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) as orders_this_month,
-                    COALESCE(SUM(total), 0) as revenue_this_month
-                FROM orders
-                WHERE DATE_TRUNC('month', created_at) = DATE_TRUNC('month', CURRENT_DATE)
-                AND status != 'cancelled'
-            ''')
-            month_stats = cursor.fetchone()
-            
-            # 12. Last Month's Stats (for growth calculation) - Fixed
+            # 10-12. Today's, This Month's and Last Month's Stats (for growth calculation)
+            # in one pass over the last two months of daily rollup rows
             cursor.execute('''
                 SELECT 
-                    COUNT(*) as orders_last_month,
-                    COALESCE(SUM(total), 0) as revenue_last_month
-                FROM orders
-                WHERE DATE_TRUNC('month', created_at) = DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
-                AND status != 'cancelled'
+                    COALESCE(SUM(order_count) FILTER (WHERE day = CURRENT_DATE), 0)::bigint as orders_today,
+                    COALESCE(SUM(revenue) FILTER (WHERE day = CURRENT_DATE), 0) as revenue_today,
+                    COALESCE(SUM(order_count) FILTER (
+                        WHERE day >= DATE_TRUNC('month', CURRENT_DATE) AND status != 'cancelled'
+                    ), 0)::bigint as orders_this_month,
+                    COALESCE(SUM(revenue) FILTER (
+                        WHERE day >= DATE_TRUNC('month', CURRENT_DATE) AND status != 'cancelled'
+                    ), 0) as revenue_this_month,
+                    COALESCE(SUM(order_count) FILTER (
+                        WHERE day < DATE_TRUNC('month', CURRENT_DATE) AND status != 'cancelled'
+                    ), 0)::bigint as orders_last_month,
+                    COALESCE(SUM(revenue) FILTER (
+                        WHERE day < DATE_TRUNC('month', CURRENT_DATE) AND status != 'cancelled'
+                    ), 0) as revenue_last_month
+                FROM sales_daily_status
+                WHERE day >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
             ''')
-            last_month_stats = cursor.fetchone()
+            today_stats = month_stats = last_month_stats = cursor.fetchone()
         
         # Calculate growth percentages
         orders_growth = 0
@@ -204,11 +210,11 @@ def get_dashboard_stats(admin_user):
                 'categorySales': category_sales,
                 'revenueTrend': revenue_trend,
                 'today': {
-                    'orders': today_stats['orders_today'],
+                    'orders': int(today_stats['orders_today']),
                     'revenue': float(today_stats['revenue_today'])
                 },
                 'thisMonth': {
-                    'orders': month_stats['orders_this_month'],
+                    'orders': int(month_stats['orders_this_month']),
                     'revenue': float(month_stats['revenue_this_month']),
                     'ordersGrowth': round(orders_growth, 1),
                     'revenueGrowth': round(revenue_growth, 1)
@@ -224,129 +230,45 @@ def get_dashboard_stats(admin_user):
         }), 500
 
 
+# Chart period -> (range, bucket) of the sales time series
+REVENUE_CHART_PERIODS = {
+    '7d': ('7d', '1d'),     # daily
+    '30d': ('30d', '5d'),   # 6 five-day ranges
+    '90d': ('90d', '10d'),  # 9 ten-day ranges
+    '1y': ('12m', '1m'),    # monthly
+}
+
 @analytics_bp.route('/revenue-chart', methods=['GET'])
 @admin_required
 def get_revenue_chart_data(admin_user):
     """
     Get revenue chart data for specified period
     Query params: period (7d, 30d, 90d, 1y)
+    Days/ranges/months without orders are included with zero values
     """
     try:
         period = request.args.get('period', '7d')
+        range_value, bucket = REVENUE_CHART_PERIODS.get(period, REVENUE_CHART_PERIODS['7d'])
+        resolved = SalesSeriesService.resolve(range_value, bucket)
+        bucket_unit = resolved[3]
         
-        # Map period to days
-        period_map = {
-            '7d': 7,
-            '30d': 30,
-            '90d': 90,
-            '1y': 365
-        }
-        days = period_map.get(period, 7)
-        
-        with db.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # For 7 days, show daily data
-            if period == '7d':
-                cursor.execute(f'''
-                    SELECT 
-                        DATE(created_at) as date,
-                        COUNT(*) as order_count,
-                        SUM(total) as revenue
-                    FROM orders
-                    WHERE created_at >= CURRENT_DATE - INTERVAL '{days} days'
-                    AND status != 'cancelled'
-                    GROUP BY DATE(created_at)
-                    ORDER BY date
-                ''')
-                
-                chart_data = []
-                for row in cursor.fetchall():
-                    chart_data.append({
-                        'date': str(row['date']),
-                        'orderCount': row['order_count'],
-                        'revenue': float(row['revenue'] or 0)
-                    })
-            
-            # For 30 days, group into 5-day ranges (6 groups)
-            elif period == '30d':
-                cursor.execute(f'''
-                    SELECT 
-                        FLOOR((CURRENT_DATE - DATE(created_at)) / 5) as range_group,
-                        MIN(DATE(created_at)) as start_date,
-                        MAX(DATE(created_at)) as end_date,
-                        COUNT(*) as order_count,
-                        SUM(total) as revenue
-                    FROM orders
-                    WHERE created_at >= CURRENT_DATE - INTERVAL '30 days'
-                    AND status != 'cancelled'
-                    GROUP BY range_group
-                    ORDER BY range_group DESC
-                ''')
-                
-                chart_data = []
-                for row in cursor.fetchall():
-                    # Format date range label
-                    start = row['start_date']
-                    end = row['end_date']
-                    date_label = f"{start.strftime('%d %b')}-{end.strftime('%d %b')}" if start != end else start.strftime('%d %b')
-                    
-                    chart_data.append({
-                        'date': date_label,
-                        'orderCount': row['order_count'],
-                        'revenue': float(row['revenue'] or 0)
-                    })
-            
-            # For 90 days, group into 10-day ranges (9 groups)
-            elif period == '90d':
-                cursor.execute(f'''
-                    SELECT 
-                        FLOOR((CURRENT_DATE - DATE(created_at)) / 10) as range_group,
-                        MIN(DATE(created_at)) as start_date,
-                        MAX(DATE(created_at)) as end_date,
-                        COUNT(*) as order_count,
-                        SUM(total) as revenue
-                    FROM orders
-                    WHERE created_at >= CURRENT_DATE - INTERVAL '90 days'
-                    AND status != 'cancelled'
-                    GROUP BY range_group
-                    ORDER BY range_group DESC
-                ''')
-                
-                chart_data = []
-                for row in cursor.fetchall():
-                    start = row['start_date']
-                    end = row['end_date']
-                    date_label = f"{start.strftime('%d %b')}-{end.strftime('%d %b')}" if start != end else start.strftime('%d %b')
-                    
-                    chart_data.append({
-                        'date': date_label,
-                        'orderCount': row['order_count'],
-                        'revenue': float(row['revenue'] or 0)
-                    })
-            
-            # For 1 year, group by month
+        chart_data = []
+        for point in SalesSeriesService.series(*resolved):
+            start = datetime.strptime(point['start'], '%Y-%m-%d')
+            end = datetime.strptime(point['end'], '%Y-%m-%d')
+            if bucket_unit == 'month':
+                date_label = start.strftime('%b %Y')
+            elif bucket == '1d':
+                date_label = point['start']
             else:
-                cursor.execute(f'''
-                    SELECT 
-                        TO_CHAR(DATE(created_at), 'Mon YYYY') as month_label,
-                        DATE_TRUNC('month', created_at) as month_date,
-                        COUNT(*) as order_count,
-                        SUM(total) as revenue
-                    FROM orders
-                    WHERE created_at >= CURRENT_DATE - INTERVAL '365 days'
-                    AND status != 'cancelled'
-                    GROUP BY month_label, month_date
-                    ORDER BY month_date
-                ''')
-                
-                chart_data = []
-                for row in cursor.fetchall():
-                    chart_data.append({
-                        'date': row['month_label'],
-                        'orderCount': row['order_count'],
-                        'revenue': float(row['revenue'] or 0)
-                    })
+                # Format date range label
+                date_label = f"{start.strftime('%d %b')}-{end.strftime('%d %b')}" if start != end else start.strftime('%d %b')
+            
+            chart_data.append({
+                'date': date_label,
+                'orderCount': point['orderCount'],
+                'revenue': point['revenue']
+            })
         
         return jsonify({
             'success': True,
@@ -360,15 +282,54 @@ def get_revenue_chart_data(admin_user):
         }), 500
 
 
+@analytics_bp.route('/time-series', methods=['GET'])
+@admin_required
+def get_time_series(admin_user):
+    """
+    Gap-filled order count / revenue series (cancelled orders excluded)
+    Query params:
+    - range: 30d, 12w, 6m, 1y ... ending today (default 30d)
+    - start / end: YYYY-MM-DD (optional, override range / today)
+    - bucket: 1d, 5d, 1w, 1m, 3m, 1y ... (default 1d)
+    """
+    try:
+        start_date, end_date, bucket_size, bucket_unit = SalesSeriesService.resolve(
+            request.args.get('range', '30d'),
+            request.args.get('bucket', '1d'),
+            start=request.args.get('start'),
+            end=request.args.get('end')
+        )
+    except InvalidSeriesError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    try:
+        series = SalesSeriesService.series(start_date, end_date, bucket_size, bucket_unit)
+        return jsonify({
+            'success': True,
+            'data': {
+                'start': start_date.isoformat(),
+                'end': end_date.isoformat(),
+                'bucket': {'size': bucket_size, 'unit': bucket_unit},
+                'series': series
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to fetch time series: {str(e)}'
+        }), 500
+
+
 @analytics_bp.route('/product-performance', methods=['GET'])
 @admin_required
 def get_product_performance(admin_user):
     """Get detailed product performance metrics"""
     try:
-        with db.get_connection() as conn:
+        with db.get_connection(read_only=True) as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
-            # Fixed: oi.price -> oi.product_price, use total_price
+            # Per-product totals from the daily product rollup (all order statuses)
             cursor.execute('''
                 SELECT 
                     p.id,
@@ -377,15 +338,24 @@ def get_product_performance(admin_user):
                     p.stock,
                     p.image_url,
                     c.name as category_name,
-                    COUNT(DISTINCT oi.order_id) as times_ordered,
-                    SUM(oi.quantity) as units_sold,
-                    SUM(oi.total_price) as total_revenue,
-                    AVG(oi.product_price) as avg_selling_price
+                    s.times_ordered,
+                    s.units_sold,
+                    s.total_revenue,
+                    s.price_sum / NULLIF(s.line_count, 0) as avg_selling_price
                 FROM products p
                 LEFT JOIN categories c ON p.category_id = c.id
-                LEFT JOIN order_items oi ON p.id = oi.product_id
-                GROUP BY p.id, p.name, p.price, p.stock, p.image_url, c.name
-                ORDER BY total_revenue DESC NULLS LAST
+                LEFT JOIN (
+                    SELECT 
+                        product_id,
+                        SUM(order_count) as times_ordered,
+                        SUM(units_sold) as units_sold,
+                        SUM(revenue) as total_revenue,
+                        SUM(price_sum) as price_sum,
+                        SUM(line_count) as line_count
+                    FROM sales_daily_product
+                    GROUP BY product_id
+                ) s ON s.product_id = p.id
+                ORDER BY total_revenue DESC NULLS LAST, p.id
             ''')
             
             products = []
@@ -397,8 +367,8 @@ def get_product_performance(admin_user):
                     'stock': row['stock'],
                     'imageUrl': row['image_url'],
                     'category': row['category_name'],
-                    'timesOrdered': row['times_ordered'] or 0,
-                    'unitsSold': row['units_sold'] or 0,
+                    'timesOrdered': int(row['times_ordered'] or 0),
+                    'unitsSold': int(row['units_sold'] or 0),
                     'totalRevenue': float(row['total_revenue'] or 0),
                     'avgSellingPrice': float(row['avg_selling_price'] or 0)
                 })
@@ -420,24 +390,39 @@ def get_product_performance(admin_user):
 def get_category_performance(admin_user):
     """Get category-wise performance metrics"""
     try:
-        with db.get_connection() as conn:
+        with db.get_connection(read_only=True) as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
+            # product_count: active products that sold in the category (non-cancelled orders)
             cursor.execute('''
                 SELECT 
                     c.id,
                     c.name,
                     c.image_url,
-                    COUNT(DISTINCT p.id) FILTER (WHERE p.status = 'active') as product_count,
-                    COUNT(DISTINCT oi.order_id) as order_count,
-                    SUM(oi.quantity) as units_sold,
-                    SUM(oi.total_price) as revenue
-                FROM order_items oi
-                JOIN products p ON oi.product_id = p.id
-                JOIN categories c ON p.category_id = c.id
-                JOIN orders o ON oi.order_id = o.id
-                WHERE o.status != 'cancelled'
-                GROUP BY c.id, c.name, c.image_url
+                    (
+                        SELECT COUNT(DISTINCT sp.product_id)
+                        FROM sales_daily_product sp
+                        JOIN products p ON p.id = sp.product_id
+                        WHERE p.category_id = c.id
+                        AND p.status = 'active'
+                        AND sp.status != 'cancelled'
+                        AND sp.order_count > 0
+                    ) as product_count,
+                    s.order_count,
+                    s.units_sold,
+                    s.revenue
+                FROM (
+                    SELECT 
+                        category_id,
+                        SUM(order_count) as order_count,
+                        SUM(units_sold) as units_sold,
+                        SUM(revenue) as revenue
+                    FROM sales_daily_category
+                    WHERE status != 'cancelled'
+                    GROUP BY category_id
+                    HAVING SUM(order_count) > 0
+                ) s
+                JOIN categories c ON c.id = s.category_id
                 ORDER BY revenue DESC
             ''')
             
@@ -447,9 +432,9 @@ def get_category_performance(admin_user):
                     'id': row['id'],
                     'name': row['name'],
                     'imageUrl': row['image_url'],
-                    'productCount': row['product_count'] or 0,
-                    'orderCount': row['order_count'] or 0,
-                    'unitsSold': row['units_sold'] or 0,
+                    'productCount': int(row['product_count'] or 0),
+                    'orderCount': int(row['order_count'] or 0),
+                    'unitsSold': int(row['units_sold'] or 0),
                     'revenue': float(row['revenue'] or 0)
                 })
         
@@ -464,127 +449,31 @@ def get_category_performance(admin_user):
             'message': f'Failed to fetch category performance: {str(e)}'
         }), 500
 
+# Dashboard performance widgets, computed together in one pass over recent orders.
+# A new widget only needs an entry here.
+PERFORMANCE_METRICS = [
+    WindowedMetric('todayOrders', 'count', where="status != 'cancelled'", days=0),
+    WindowedMetric('avgOrderValue', 'avg', 'total', where="status != 'cancelled'", days=30, digits=2),
+    # Delivered orders: minutes from placement to actual delivery
+    WindowedMetric(
+        'avgDeliveryTime', 'avg',
+        'EXTRACT(EPOCH FROM (actual_delivery::timestamp - created_at::timestamp)) / 60',
+        where="status = 'delivered' AND actual_delivery IS NOT NULL", days=7
+    ),
+    WindowedMetric('activeUsers', 'count_distinct', 'user_id', where='user_id IS NOT NULL', days=30),
+    # Return rate (cancelled orders percentage)
+    WindowedMetric('returnRate', 'rate', where="status = 'cancelled'", days=30, digits=1),
+]
+performance_metrics_engine = MetricsEngine('orders')
+
 @analytics_bp.route('/performance-metrics', methods=['GET'])
 @admin_required
 def get_performance_metrics(admin_user):
-    """Get real-time performance metrics"""
+    """Get real-time performance metrics (each with its previous-period change)"""
     try:
-        with db.get_connection() as conn:
+        with db.get_connection(read_only=True) as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Today's orders count
-            cursor.execute('''
-                SELECT COUNT(*) as today_orders
-                FROM orders
-                WHERE DATE(created_at) = CURRENT_DATE
-                AND status != 'cancelled'
-            ''')
-            today_orders = cursor.fetchone()['today_orders'] or 0
-            
-            # Yesterday's orders count for comparison
-            cursor.execute('''
-                SELECT COUNT(*) as yesterday_orders
-                FROM orders
-                WHERE DATE(created_at) = CURRENT_DATE - INTERVAL '1 day'
-                AND status != 'cancelled'
-            ''')
-            yesterday_orders = cursor.fetchone()['yesterday_orders'] or 0
-            orders_change = calculate_percentage_change(yesterday_orders, today_orders)
-            
-            # Average order value (last 30 days)
-            cursor.execute('''
-                SELECT AVG(total) as avg_order_value
-                FROM orders
-                WHERE created_at >= CURRENT_DATE - INTERVAL '30 days'
-                AND status != 'cancelled'
-            ''')
-            avg_order_value = float(cursor.fetchone()['avg_order_value'] or 0)
-            
-            # Previous 30 days average for comparison
-            cursor.execute('''
-                SELECT AVG(total) as prev_avg
-                FROM orders
-                WHERE created_at >= CURRENT_DATE - INTERVAL '60 days'
-                AND created_at < CURRENT_DATE - INTERVAL '30 days'
-                AND status != 'cancelled'
-            ''')
-            prev_avg = float(cursor.fetchone()['prev_avg'] or 0)
-            avg_change = calculate_percentage_change(prev_avg, avg_order_value)
-            
-            # Average delivery time (completed orders in last 7 days)
-            # Using actual_delivery and created_at to calculate delivery time
-            cursor.execute('''
-                SELECT AVG(
-                    EXTRACT(EPOCH FROM (
-                        actual_delivery::timestamp - created_at::timestamp
-                    )) / 60
-                ) as avg_delivery_mins
-                FROM orders
-                WHERE status = 'delivered'
-                AND created_at >= CURRENT_DATE - INTERVAL '7 days'
-                AND actual_delivery IS NOT NULL
-            ''')
-            avg_delivery_time = cursor.fetchone()['avg_delivery_mins']
-            avg_delivery_mins = int(avg_delivery_time) if avg_delivery_time else 0
-            
-            # Active users (users with orders in last 30 days)
-            cursor.execute('''
-                SELECT COUNT(DISTINCT user_id) as active_users
-                FROM orders
-                WHERE created_at >= CURRENT_DATE - INTERVAL '30 days'
-                AND user_id IS NOT NULL
-            ''')
-            active_users = cursor.fetchone()['active_users'] or 0
-            
-            # Previous period active users
-            cursor.execute('''
-                SELECT COUNT(DISTINCT user_id) as prev_active
-                FROM orders
-                WHERE created_at >= CURRENT_DATE - INTERVAL '60 days'
-                AND created_at < CURRENT_DATE - INTERVAL '30 days'
-                AND user_id IS NOT NULL
-            ''')
-            prev_active = cursor.fetchone()['prev_active'] or 0
-            active_change = calculate_percentage_change(prev_active, active_users)
-            
-            # Return rate (cancelled orders percentage)
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) FILTER (WHERE status = 'cancelled') as cancelled,
-                    COUNT(*) as total
-                FROM orders
-                WHERE created_at >= CURRENT_DATE - INTERVAL '30 days'
-            ''')
-            row = cursor.fetchone()
-            return_rate = (row['cancelled'] / row['total'] * 100) if row['total'] > 0 else 0
-            
-            metrics = {
-                'todayOrders': {
-                    'value': today_orders,
-                    'change': orders_change,
-                    'trend': 'up' if orders_change >= 0 else 'down'
-                },
-                'avgOrderValue': {
-                    'value': round(avg_order_value, 2),
-                    'change': avg_change,
-                    'trend': 'up' if avg_change >= 0 else 'down'
-                },
-                'avgDeliveryTime': {
-                    'value': avg_delivery_mins,
-                    'change': 0,  # Can be calculated if historical data is stored
-                    'trend': 'neutral'
-                },
-                'activeUsers': {
-                    'value': active_users,
-                    'change': active_change,
-                    'trend': 'up' if active_change >= 0 else 'down'
-                },
-                'returnRate': {
-                    'value': round(return_rate, 1),
-                    'change': 0,  # Can be calculated if historical data is stored
-                    'trend': 'neutral'
-                }
-            }
+            metrics = performance_metrics_engine.run(cursor, PERFORMANCE_METRICS)
         
         return jsonify({
             'success': True,
@@ -597,18 +486,12 @@ def get_performance_metrics(admin_user):
             'message': f'Failed to fetch performance metrics: {str(e)}'
         }), 500
 
-def calculate_percentage_change(old_value, new_value):
-    """Calculate percentage change between two values"""
-    if old_value == 0:
-        return 100 if new_value > 0 else 0
-    return round(((new_value - old_value) / old_value) * 100, 1)
-
 @analytics_bp.route('/users', methods=['GET'])
 @admin_required
 def get_all_users(admin_user):
     """Get all users with their order statistics"""
     try:
-        with db.get_connection() as conn:
+        with db.get_connection(read_only=True) as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
             # Get all users with their order statistics (including admins)
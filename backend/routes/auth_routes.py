@@ -4,7 +4,8 @@ from services.email_service import EmailService
 from backend.utils.otp_manager import OTPManager
 from backend.utils.rate_limiter import RateLimiter
 from backend.utils.input_validator import InputValidator
-from backend.utils.auth_middleware import generate_token
+from backend.utils.auth_middleware import generate_token, invalidate_auth_user
+from backend.services.identity_service import IdentityService
 from backend.utils.csrf_protection import CSRFProtection
 from backend.utils.database import db
 import os
@@ -126,6 +127,7 @@ def verify_otp():
                     WHERE phone = %s
                 """
                 db.execute_query(update_query, (phone_number,))
+                invalidate_auth_user(user_dict['id'])
                 
                 # Fetch updated user data
                 user = db.execute_query_one(user_query, (phone_number,))
@@ -194,6 +196,9 @@ def complete_profile():
         user = db.execute_query_one(insert_query, (clean_phone, clean_name, clean_email))
         
         if user:
+            # Cart / wishlist rows added as a guest now belong to this user
+            IdentityService.register_phone(user['id'], user['phone'])
+            
             # 🔒 SECURITY: Generate JWT token
             user_dict = dict(user)
             token = generate_token(user_dict)
@@ -446,6 +451,7 @@ def verify_email_otp():
                     WHERE email = %s
                 """
                 db.execute_query(update_query, (email,))
+                invalidate_auth_user(user_dict['id'])
                 
                 # Fetch updated user data
                 user = db.execute_query_one(user_query, (email,))
@@ -516,6 +522,9 @@ def complete_profile_email():
         user = db.execute_query_one(insert_query, (clean_name, clean_email, clean_phone))
         
         if user:
+            # Cart / wishlist rows added as a guest now belong to this user
+            IdentityService.register_phone(user['id'], user['phone'])
+            
             # 🔒 SECURITY: Generate JWT token
             user_dict = dict(user)
             token = generate_token(user_dict)
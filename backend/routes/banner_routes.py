@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from backend.utils.database import db
 from backend.utils.auth_middleware import admin_required
 from backend.utils.response_cache import response_cache
+from backend.utils.http_cache import cached_json_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,30 +28,32 @@ def get_all_banners():
         logger.error(f"Error fetching banners: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+ACTIVE_BANNERS_CACHE_KEY = "banners:active:v3"
+
+def build_active_banners_payload():
+    """Query banners that are active and inside their date window"""
+    query = """
+        SELECT * FROM banners 
+        WHERE status = 'active'
+        AND (start_date IS NULL OR start_date <= CURRENT_DATE)
+        AND (end_date IS NULL OR end_date >= CURRENT_DATE)
+        ORDER BY display_order, id
+    """
+    banners = db.execute_query(query, fetch=True)
+
+    return {
+        "success": True,
+        "banners": [dict(banner) for banner in banners],
+        "count": len(banners)
+    }
+
 @banner_bp.route('/active', methods=['GET'])
 def get_active_banners():
     """Get only active banners"""
     try:
-        cache_key = "banners:active:v1"
-        def build_payload():
-            query = """
-                SELECT * FROM banners 
-                WHERE status = 'active'
-                AND (start_date IS NULL OR start_date <= CURRENT_DATE)
-                AND (end_date IS NULL OR end_date >= CURRENT_DATE)
-                ORDER BY display_order, id
-            """
-            banners = db.execute_query(query, fetch=True)
-
-            return {
-                "success": True,
-                "banners": [dict(banner) for banner in banners],
-                "count": len(banners)
-            }
-
-        payload = response_cache.get_or_set(cache_key, build_payload, ttl_seconds=60)
-
-        return jsonify(payload)
+        return cached_json_response(
+            ACTIVE_BANNERS_CACHE_KEY, build_active_banners_payload, ttl_seconds=60
+        )
         
     except Exception as e:
         logger.error(f"Error fetching active banners: {e}")
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from backend.utils.database import db
+from backend.services.identity_service import IdentityService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,11 +14,10 @@ def get_user_cart():
         if not phone:
             return jsonify({"success": False, "error": "Phone number required"}), 400
         
-        # Get user ID
-        user_query = "SELECT id FROM users WHERE phone = %s"
-        user = db.execute_query_one(user_query, (phone,))
+        # Get user ID (cached)
+        user_id = IdentityService.resolve_user_id(phone)
         
-        if not user:
+        if not user_id:
             return jsonify({"success": True, "cart": []})
         
         query = """
@@ -25,11 +25,11 @@ def get_user_cart():
                    p.image_url, p.stock, p.category_name
             FROM cart_items c
             JOIN products p ON c.product_id = p.id
-            WHERE (c.user_id = %s OR c.phone = %s) AND p.status = 'active'
+            WHERE c.user_id = %s AND p.status = 'active'
             ORDER BY c.created_at DESC
         """
         
-        cart_items = db.execute_query(query, (user['id'], phone), fetch=True)
+        cart_items = db.execute_query(query, (user_id,), fetch=True, prepared=True)
         
         # Calculate totals - convert Decimal to float to avoid type errors
         from decimal import Decimal
@@ -65,14 +65,13 @@ def add_to_cart():
         if data['quantity'] <= 0:
             return jsonify({"success": False, "error": "Quantity must be positive"}), 400
         
-        # Get user ID
-        user_query = "SELECT id FROM users WHERE phone = %s"
-        user = db.execute_query_one(user_query, (data['phone'],))
-        user_id = user['id'] if user else None
+        # Get user ID (cached); guests' rows are keyed by phone
+        user_id = IdentityService.resolve_user_id(data['phone'])
+        owner, owner_params = IdentityService.owner_filter('c', user_id, data['phone'])
         
         # Check if product exists and is available
         product_query = "SELECT stock FROM products WHERE id = %s AND status = 'active'"
-        product = db.execute_query_one(product_query, (data['product_id'],))
+        product = db.execute_query_one(product_query, (data['product_id'],), prepared=True)
         
         if not product:
             return jsonify({"success": False, "error": "Product not found or unavailable"}), 404
@@ -81,33 +80,42 @@ def add_to_cart():
             return jsonify({"success": False, "error": f"Only {product['stock']} items available"}), 400
         
         # Check if item already in cart
-        existing_item_query = """
-            SELECT id, quantity FROM cart_items 
-            WHERE product_id = %s AND (user_id = %s OR phone = %s)
+        existing_item_query = f"""
+            SELECT c.id, c.quantity FROM cart_items c
+            WHERE c.product_id = %s AND {owner}
         """
-        existing_item = db.execute_query_one(existing_item_query, (data['product_id'], user_id, data['phone']))
+        existing_item = db.execute_query_one(existing_item_query, (data['product_id'],) + owner_params, prepared=True)
         
         if existing_item:
-            # Update existing item
-            new_quantity = existing_item['quantity'] + data['quantity']
-            if new_quantity > product['stock']:
-                return jsonify({"success": False, "error": f"Total quantity exceeds stock ({product['stock']} available)"}), 400
-            
+            # Update existing item - the stock check and the write are one statement
             update_query = """
-                UPDATE cart_items 
-                SET quantity = %s, updated_at = CURRENT_TIMESTAMP
-                WHERE id = %s
-                RETURNING *
+                UPDATE cart_items c
+                SET quantity = c.quantity + %s, updated_at = CURRENT_TIMESTAMP
+                FROM products p
+                WHERE c.id = %s
+                AND p.id = c.product_id
+                AND p.stock >= c.quantity + %s
+                RETURNING c.*
             """
-            result = db.execute_query(update_query, (new_quantity, existing_item['id']), fetch=True)
+            result = db.execute_query(update_query, (data['quantity'], existing_item['id'], data['quantity']), fetch=True)
+            if not result:
+                return jsonify({"success": False, "error": f"Total quantity exceeds stock ({product['stock']} available)"}), 400
         else:
-            # Add new item
+            # Add new item only while the product still has enough stock
             insert_query = """
                 INSERT INTO cart_items (user_id, phone, product_id, quantity)
-                VALUES (%s, %s, %s, %s)
+                SELECT %s, %s, p.id, %s
+                FROM products p
+                WHERE p.id = %s AND p.status = 'active' AND p.stock >= %s
                 RETURNING *
             """
-            result = db.execute_query(insert_query, (user_id, data['phone'], data['product_id'], data['quantity']), fetch=True)
+            result = db.execute_query(
+                insert_query,
+                (user_id, data['phone'], data['quantity'], data['product_id'], data['quantity']),
+                fetch=True
+            )
+            if not result:
+                return jsonify({"success": False, "error": f"Only {product['stock']} items available"}), 400
         
         if result:
             return jsonify({
@@ -135,19 +143,18 @@ def update_cart_item():
         if data['quantity'] < 0:
             return jsonify({"success": False, "error": "Quantity cannot be negative"}), 400
         
-        # Get user ID
-        user_query = "SELECT id FROM users WHERE phone = %s"
-        user = db.execute_query_one(user_query, (data['phone'],))
-        user_id = user['id'] if user else None
+        # Get user ID (cached); guests' rows are keyed by phone
+        user_id = IdentityService.resolve_user_id(data['phone'])
+        owner, owner_params = IdentityService.owner_filter('c', user_id, data['phone'])
         
         if data['quantity'] == 0:
             # Remove item from cart
-            delete_query = """
-                DELETE FROM cart_items 
-                WHERE product_id = %s AND (user_id = %s OR phone = %s)
+            delete_query = f"""
+                DELETE FROM cart_items c
+                WHERE c.product_id = %s AND {owner}
                 RETURNING *
             """
-            result = db.execute_query(delete_query, (data['product_id'], user_id, data['phone']), fetch=True)
+            result = db.execute_query(delete_query, (data['product_id'],) + owner_params, fetch=True)
             
             if result:
                 return jsonify({
@@ -157,7 +164,7 @@ def update_cart_item():
         else:
             # Check stock availability
             product_query = "SELECT stock FROM products WHERE id = %s AND status = 'active'"
-            product = db.execute_query_one(product_query, (data['product_id'],))
+            product = db.execute_query_one(product_query, (data['product_id'],), prepared=True)
             
             if not product:
                 return jsonify({"success": False, "error": "Product not found"}), 404
@@ -165,14 +172,21 @@ def update_cart_item():
             if product['stock'] < data['quantity']:
                 return jsonify({"success": False, "error": f"Only {product['stock']} items available"}), 400
             
-            # Update quantity
-            update_query = """
-                UPDATE cart_items 
+            # Update quantity - guarded by stock in the same statement
+            update_query = f"""
+                UPDATE cart_items c
                 SET quantity = %s, updated_at = CURRENT_TIMESTAMP
-                WHERE product_id = %s AND (user_id = %s OR phone = %s)
-                RETURNING *
+                FROM products p
+                WHERE c.product_id = %s AND {owner}
+                AND p.id = c.product_id
+                AND p.stock >= %s
+                RETURNING c.*
             """
-            result = db.execute_query(update_query, (data['quantity'], data['product_id'], user_id, data['phone']), fetch=True)
+            result = db.execute_query(
+                update_query,
+                (data['quantity'], data['product_id']) + owner_params + (data['quantity'],),
+                fetch=True
+            )
             
             if result:
                 return jsonify({
@@ -197,17 +211,16 @@ def remove_from_cart():
         if not all(field in data for field in required_fields):
             return jsonify({"success": False, "error": "Phone and product_id are required"}), 400
         
-        # Get user ID
-        user_query = "SELECT id FROM users WHERE phone = %s"
-        user = db.execute_query_one(user_query, (data['phone'],))
-        user_id = user['id'] if user else None
+        # Get user ID (cached); guests' rows are keyed by phone
+        user_id = IdentityService.resolve_user_id(data['phone'])
+        owner, owner_params = IdentityService.owner_filter('c', user_id, data['phone'])
         
-        query = """
-            DELETE FROM cart_items 
-            WHERE product_id = %s AND (user_id = %s OR phone = %s)
+        query = f"""
+            DELETE FROM cart_items c
+            WHERE c.product_id = %s AND {owner}
             RETURNING *
         """
-        result = db.execute_query(query, (data['product_id'], user_id, data['phone']), fetch=True)
+        result = db.execute_query(query, (data['product_id'],) + owner_params, fetch=True)
         
         if result:
             return jsonify({
@@ -229,13 +242,12 @@ def clear_cart():
         if not phone:
             return jsonify({"success": False, "error": "Phone number required"}), 400
         
-        # Get user ID
-        user_query = "SELECT id FROM users WHERE phone = %s"
-        user = db.execute_query_one(user_query, (phone,))
-        user_id = user['id'] if user else None
+        # Get user ID (cached); guests' rows are keyed by phone
+        user_id = IdentityService.resolve_user_id(phone)
+        owner, owner_params = IdentityService.owner_filter('c', user_id, phone)
         
-        query = "DELETE FROM cart_items WHERE user_id = %s OR phone = %s"
-        db.execute_query(query, (user_id, phone))
+        query = f"DELETE FROM cart_items c WHERE {owner}"
+        db.execute_query(query, owner_params)
         
         return jsonify({
             "success": True,
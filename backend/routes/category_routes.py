@@ -2,7 +2,10 @@ from flask import Blueprint, request, jsonify
 from backend.utils.database import db
 from backend.utils.auth_middleware import admin_required
 from backend.utils.input_validator import InputValidator
-from backend.utils.response_cache import response_cache
+from backend.config.config import Config
+from backend.services.catalog_service import CatalogService
+from backend.services.product_search_service import ProductSearchService
+from backend.utils.http_cache import cached_json_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,35 +15,21 @@ category_bp = Blueprint('categories', __name__)
 def get_all_categories():
     """Get all categories with product count (user view - only non-empty categories)"""
     try:
-        cache_key = "categories:active:v1"
-        def build_payload():
-            # Get categories with count of in-stock products
-            query = """
-                SELECT 
-                    c.*,
-                    COUNT(p.id) as products_count
-                FROM categories c
-                LEFT JOIN products p ON c.id = p.category_id 
-                    AND p.status = 'active' 
-                    AND p.stock > 0
-                WHERE c.status = 'active'
-                GROUP BY c.id
-                ORDER BY c.position, c.id
-            """
-            categories = db.execute_query(query, fetch=True)
-
-            # Filter out categories with no products
-            categories_with_products = [dict(cat) for cat in categories if cat['products_count'] > 0]
+        catalog = CatalogService.snapshot()
 
+        def build_payload():
+            # In-stock product counts; categories with no products are left out
+            categories = list(catalog.listed_categories)
             return {
                 "success": True,
-                "categories": categories_with_products,
-                "count": len(categories_with_products)
+                "categories": categories,
+                "count": len(categories)
             }
 
-        payload = response_cache.get_or_set(cache_key, build_payload, ttl_seconds=45)
-
-        return jsonify(payload)
+        return cached_json_response(
+            "categories", build_payload,
+            ttl_seconds=Config.CATALOG_SNAPSHOT_SECONDS, cache=catalog
+        )
         
     except Exception as e:
         logger.error(f"Error fetching categories: {e}")
@@ -84,15 +73,14 @@ def get_all_categories_admin(current_user):
 def get_category_by_id(category_id):
     """Get a specific category by ID"""
     try:
-        query = "SELECT * FROM categories WHERE id = %s AND status = 'active'"
-        category = db.execute_query_one(query, (category_id,))
+        category = CatalogService.snapshot().category_by_id.get(category_id)
         
-        if not category:
+        if category is None:
             return jsonify({"success": False, "error": "Category not found"}), 404
         
         return jsonify({
             "success": True,
-            "category": dict(category)
+            "category": category
         })
         
     except Exception as e:
@@ -130,8 +118,8 @@ def create_category(current_user):
         result = db.execute_query(query, params, fetch=True)
         
         if result:
-            response_cache.invalidate("categories:")
-            response_cache.invalidate("products:")
+            CatalogService.invalidate()
+            ProductSearchService.invalidate()
             logger.info(f"✅ Admin {current_user['id']} created category: {name}")
             
             return jsonify({
@@ -187,8 +175,8 @@ def update_category(current_user, category_id):
         result = db.execute_query(query, params, fetch=True)
         
         if result:
-            response_cache.invalidate("categories:")
-            response_cache.invalidate("products:")
+            CatalogService.invalidate()
+            ProductSearchService.invalidate()
             return jsonify({
                 "success": True,
                 "category": dict(result[0]),
@@ -226,8 +214,8 @@ def delete_category(category_id):
         result = db.execute_query(query, (category_id,), fetch=True)
         
         if result:
-            response_cache.invalidate("categories:")
-            response_cache.invalidate("products:")
+            CatalogService.invalidate()
+            ProductSearchService.invalidate()
             return jsonify({
                 "success": True,
                 "message": "Category deleted successfully"
@@ -7,6 +7,7 @@ from datetime import datetime, date
 from backend.utils.database import db
 from backend.utils.auth_middleware import admin_required
 from backend.utils.response_cache import response_cache
+from backend.utils.http_cache import cached_json_response
 
 offer_bp = Blueprint('offers', __name__)
 
@@ -23,7 +24,8 @@ def _has_applicable_products_column():
                   AND table_name = 'offers'
                   AND column_name = 'applicable_products'
             ) AS exists
-            """
+            """,
+            prepared=True
         )
         return bool(row and row.get('exists'))
     except Exception:
@@ -60,37 +62,40 @@ def get_all_offers():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+ACTIVE_OFFERS_CACHE_KEY = "offers:active:v3"
+
+def build_active_offers_payload():
+    """Query offers customers can currently use"""
+    today = date.today().isoformat()
+    query = """
+        SELECT id, title, description, code, discount_type, discount_value,
+               min_order_value, max_discount_amount, image_url,
+               start_date, end_date, offer_type
+        FROM offers
+        WHERE status = 'active'
+          AND start_date <= %s
+          AND end_date >= %s
+          AND used_count < usage_limit
+        ORDER BY id ASC
+    """
+    offers = db.execute_query(query, (today, today), fetch=True)
+
+    # Convert date objects to strings
+    for offer in offers:
+        if offer.get('start_date'):
+            offer['start_date'] = offer['start_date'].isoformat()
+        if offer.get('end_date'):
+            offer['end_date'] = offer['end_date'].isoformat()
+
+    return offers
+
 @offer_bp.route('/active', methods=['GET'])
 def get_active_offers():
     """Get all active offers for customers"""
     try:
-        cache_key = "offers:active:v1"
-        def build_payload():
-            today = date.today().isoformat()
-            query = """
-                SELECT id, title, description, code, discount_type, discount_value,
-                       min_order_value, max_discount_amount, image_url,
-                       start_date, end_date, offer_type
-                FROM offers
-                WHERE status = 'active'
-                  AND start_date <= %s
-                  AND end_date >= %s
-                  AND used_count < usage_limit
-                ORDER BY id ASC
-            """
-            offers = db.execute_query(query, (today, today), fetch=True)
-
-            # Convert date objects to strings
-            for offer in offers:
-                if offer.get('start_date'):
-                    offer['start_date'] = offer['start_date'].isoformat()
-                if offer.get('end_date'):
-                    offer['end_date'] = offer['end_date'].isoformat()
-
-            return offers
-
-        offers = response_cache.get_or_set(cache_key, build_payload, ttl_seconds=45)
-        return jsonify(offers), 200
+        return cached_json_response(
+            ACTIVE_OFFERS_CACHE_KEY, build_active_offers_payload, ttl_seconds=45
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -109,7 +114,7 @@ def get_offer(offer_id):
             FROM offers
             WHERE id = %s
         """
-        offers = db.execute_query(query, (offer_id,), fetch=True)
+        offers = db.execute_query(query, (offer_id,), fetch=True, prepared=True)
         
         if not offers:
             return jsonify({'error': 'Offer not found'}), 404
@@ -141,7 +146,7 @@ def validate_offer(code):
             FROM offers
             WHERE code = %s
         """
-        offers = db.execute_query(query, (code.upper(),), fetch=True)
+        offers = db.execute_query(query, (code.upper(),), fetch=True, prepared=True)
         
         if not offers:
             return jsonify({'valid': False, 'message': 'Invalid offer code'}), 400
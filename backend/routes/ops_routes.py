@@ -0,0 +1,62 @@
+"""
+Operations Routes for Admin
+Per-worker runtime metrics used to size deployments and find slow code:
+GET /db-pool - pool occupancy, checkout waits and timeouts, time from
+checkout to first query, slow query counts and round trips per request
+(compare in_use / peak_in_use / waits against DB_POOL_MIN / DB_POOL_MAX)
+GET /endpoints - per-endpoint latency, statements and DB time histograms,
+slowest statement and detected N+1 patterns (?sort=db|latency|statements|requests|slowest&limit=)
+GET /slow-queries - recent statements over DB_SLOW_QUERY_MS, with sampled EXPLAIN plans
+"""
+from flask import Blueprint, jsonify, request
+import os
+import time
+from backend.utils.auth_middleware import admin_required
+from backend.utils.database import get_db_stats, get_pool_stats
+from backend.utils.query_profiler import SORT_KEYS, get_endpoint_profiles, get_slow_queries
+
+ops_bp = Blueprint('ops', __name__)
+
+@ops_bp.route('/db-pool', methods=['GET'])
+@admin_required
+def get_db_pool_metrics(current_user):
+    """Database pool metrics for the worker that served the request (Admin only)"""
+    return jsonify({
+        "success": True,
+        "worker_pid": os.getpid(),
+        "pool": get_pool_stats(),
+        "requests": get_db_stats(),
+        "timestamp": time.strftime('%Y-%m-%d %H:%M:%S')
+    })
+
+@ops_bp.route('/endpoints', methods=['GET'])
+@admin_required
+def get_endpoint_metrics(current_user):
+    """Per-endpoint request / database profiles for this worker (Admin only)"""
+    sort = request.args.get('sort', 'db')
+    if sort not in SORT_KEYS:
+        return jsonify({"success": False, "error": f"sort must be one of: {', '.join(SORT_KEYS)}"}), 400
+    limit = request.args.get('limit', type=int)
+
+    endpoints = get_endpoint_profiles(sort, limit)
+    return jsonify({
+        "success": True,
+        "worker_pid": os.getpid(),
+        "sort": sort,
+        "endpoints": endpoints,
+        "count": len(endpoints),
+        "timestamp": time.strftime('%Y-%m-%d %H:%M:%S')
+    })
+
+@ops_bp.route('/slow-queries', methods=['GET'])
+@admin_required
+def get_slow_query_log(current_user):
+    """Recent slow statements for this worker, newest first (Admin only)"""
+    slow_queries = get_slow_queries()
+    return jsonify({
+        "success": True,
+        "worker_pid": os.getpid(),
+        "slow_queries": slow_queries,
+        "count": len(slow_queries),
+        "timestamp": time.strftime('%Y-%m-%d %H:%M:%S')
+    })
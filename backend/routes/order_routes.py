@@ -3,6 +3,13 @@ from backend.utils.database import db
 from backend.utils.auth_middleware import token_required, admin_required
 from backend.utils.input_validator import InputValidator
 from backend.utils.rate_limiter import RateLimiter
+from backend.services.checkout_service import CheckoutService
+from backend.services.inventory_service import InventoryService, InsufficientStockError
+from backend.services.sales_rollup_service import SalesRollupService
+from backend.services.sales_series_service import SalesSeriesService
+from backend.services.order_list_service import (
+    OrderListService, InvalidCursorError, COUNT_MODES, MAX_PAGE_SIZE
+)
 import logging
 import datetime
 from datetime import timezone, timedelta
@@ -23,80 +30,6 @@ def generate_order_id():
     random_part = secrets.token_hex(3).upper()
     return f"QC{timestamp}{random_part}"
 
-def calculate_order_total(items, delivery_fee=29, handling_fee=5, coupon=None):
-    """
-    🔒 SECURITY: Backend price calculation to prevent manipulation
-    """
-    subtotal = 0
-    order_items = []
-    
-    for item in items:
-        # Get current product price from database
-        product_query = "SELECT id, name, price FROM products WHERE id = %s AND status = 'active'"
-        product = db.execute_query_one(product_query, (item['product_id'],))
-        
-        if not product:
-            return {
-                'success': False,
-                'error': f"Product {item['product_id']} not found or inactive"
-            }
-        
-        # Use database price, NOT client-provided price
-        quantity = int(item['quantity'])
-        item_total = float(product['price']) * quantity
-        subtotal += item_total
-        
-        # Store item data for order_items table
-        order_items.append({
-            'product_id': product['id'],
-            'product_name': product['name'],
-            'product_price': float(product['price']),
-            'quantity': quantity,
-            'total_price': item_total
-        })
-    
-    # Calculate delivery fee (free if >= 99)
-    final_delivery_fee = 0 if subtotal >= 99 else delivery_fee
-    
-    # Apply coupon discount
-    discount = 0
-    if coupon:
-        # Revalidate coupon
-        coupon_query = """
-            SELECT * FROM offers 
-            WHERE code = %s 
-            AND status = 'active'
-            AND start_date <= CURRENT_DATE 
-            AND end_date >= CURRENT_DATE
-        """
-        valid_coupon = db.execute_query_one(coupon_query, (coupon,))
-        
-        if valid_coupon:
-            min_order = float(valid_coupon.get('min_order_amount', 0))
-            
-            if subtotal >= min_order:
-                if valid_coupon['discount_type'] == 'percentage':
-                    discount = (subtotal * float(valid_coupon['discount_value'])) / 100
-                    max_discount = valid_coupon.get('max_discount_amount')
-                    if max_discount:
-                        discount = min(discount, float(max_discount))
-                elif valid_coupon['discount_type'] == 'fixed':
-                    discount = min(float(valid_coupon['discount_value']), subtotal)
-                elif valid_coupon['discount_type'] == 'free_delivery':
-                    final_delivery_fee = 0
-    
-    total = subtotal - discount + final_delivery_fee + handling_fee
-    
-    return {
-        'success': True,
-        'subtotal': round(subtotal, 2),
-        'discount': round(discount, 2),
-        'delivery_fee': round(final_delivery_fee, 2),
-        'handling_fee': round(handling_fee, 2),
-        'total': round(total, 2),
-        'items': order_items
-    }
-
 @order_bp.route('/', methods=['GET'])
 @token_required
 def get_user_orders(current_user):
@@ -249,33 +182,18 @@ def create_order(current_user):
         if not items:
             return jsonify({"success": False, "error": "Order must contain at least one item"}), 400
         
+        try:
+            for item in items:
+                if int(item['product_id']) <= 0 or int(item['quantity']) <= 0:
+                    raise ValueError
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"success": False, "error": "Each item needs a valid product_id and a positive quantity"}), 400
+        
         # Calculate order total using backend validation
         delivery_fee = float(data.get('delivery_fee', 20.00))
         handling_fee = float(data.get('handling_fee', 0.00))
         coupon_code = data.get('coupon_code')
         
-        total_calculation = calculate_order_total(items, delivery_fee, handling_fee, coupon_code)
-        
-        if not total_calculation['success']:
-            return jsonify({"success": False, "error": total_calculation['error']}), 400
-        
-        # 🔒 SECURITY: Verify client-sent total matches backend calculation (prevent manipulation)
-        client_total = float(data.get('total', 0))
-        backend_total = total_calculation['total']
-        
-        # Allow small floating point differences (0.01)
-        if abs(client_total - backend_total) > 0.01:
-            logger.warning(f"❌ Price manipulation detected! User {user_id} sent total={client_total}, actual={backend_total}")
-            return jsonify({
-                "success": False, 
-                "error": "Price mismatch detected. Please refresh and try again."
-            }), 400
-        
-        subtotal = total_calculation['subtotal']
-        total = backend_total
-        discount = total_calculation.get('discount', 0)
-        order_items = total_calculation['items']
-        
         order_id = generate_order_id()
         
         # Get current timestamp in IST (India Standard Time)
@@ -283,64 +201,33 @@ def create_order(current_user):
         
         print(f"🕐 Creating order at IST time: {current_time_ist}")
         
-        # Create order with explicit timestamp
-        order_query = """
-            INSERT INTO orders (id, user_id, phone, user_name, total, subtotal, delivery_fee,
-                              status, payment_status, payment_method, delivery_address, created_at, order_date)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, 'pending', %s, %s, %s, %s, %s)
-            RETURNING *
-        """
-        
-        order_params = (
-            order_id, user_id, phone, user_name, total, subtotal, delivery_fee,
-            data.get('payment_status', 'pending'),
-            data.get('payment_method', 'cash'),
-            data.get('delivery_address', ''),
-            current_time_ist,  # created_at with IST time
-            current_time_ist.date()  # order_date
+        # Price, insert items, decrement stock, redeem coupon, add timeline
+        # and clear the cart in a single transaction
+        result = CheckoutService.place_order(
+            order_id,
+            {'id': user_id, 'phone': phone, 'name': user_name},
+            items,
+            delivery_address=data.get('delivery_address', ''),
+            created_at=current_time_ist,
+            delivery_fee=delivery_fee,
+            handling_fee=handling_fee,
+            coupon_code=coupon_code,
+            client_total=float(data.get('total', 0)),
+            payment_status=data.get('payment_status', 'pending'),
+            payment_method=data.get('payment_method', 'cash'),
+            reservation_token=data.get('reservation_token')
         )
         
-        order_result = db.execute_query(order_query, order_params, fetch=True)
-        
-        if not order_result:
-            return jsonify({"success": False, "error": "Failed to create order"}), 500
-        
-        # Get the order data - it's a list of RealDictRow objects
-        created_order = order_result[0]
-        
-        # Insert order items and update stock
-        for item in order_items:
-            item_query = """
-                INSERT INTO order_items (order_id, product_id, product_name, product_price, quantity, total_price)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            db.execute_query(item_query, (
-                order_id, item['product_id'], item['product_name'],
-                item['product_price'], item['quantity'], item['total_price']
-            ))
-            
-            # 🔒 SECURITY: Update product stock (prevent overselling)
-            db.execute_query(
-                "UPDATE products SET stock = stock - %s WHERE id = %s",
-                (item['quantity'], item['product_id'])
-            )
-        
-        # Mark coupon as used if applicable
-        if coupon_code and discount > 0:
-            db.execute_query(
-                "UPDATE offers SET used_count = used_count + 1 WHERE code = %s",
-                (coupon_code,)
-            )
-        
-        # Create initial timeline entry with IST timestamp
-        timeline_query = """
-            INSERT INTO order_timeline (order_id, status, completed, timestamp)
-            VALUES (%s, 'Order Placed', true, %s)
-        """
-        db.execute_query(timeline_query, (order_id, current_time_ist))
+        if not result['success']:
+            error_response = {"success": False, "error": result['error']}
+            if 'shortages' in result:
+                error_response['shortages'] = result['shortages']
+            return jsonify(error_response), result['status_code']
         
-        # Clear user's cart after successful order
-        db.execute_query("DELETE FROM cart_items WHERE user_id = %s", (user_id,))
+        created_order = result['order']
+        order_items = result['items']
+        OrderListService.invalidate_counts()
+        SalesSeriesService.invalidate()
         
         logger.info(f"✅ Order {order_id} created successfully for user {user_id}")
         
@@ -372,6 +259,64 @@ def create_order(current_user):
         print(f"Traceback:\n{traceback.format_exc()}")
         return jsonify({"success": False, "error": "Failed to create order"}), 500
 
+@order_bp.route('/reserve', methods=['POST'])
+@token_required
+def reserve_stock(current_user):
+    """
+    🔒 SECURED: Hold stock for the basket while the user completes checkout
+    Returns a reservation_token to pass to /create before the hold expires
+    """
+    try:
+        data = request.get_json() or {}
+        items = data.get('items', [])
+        
+        if not items:
+            return jsonify({"success": False, "error": "At least one item is required"}), 400
+        
+        try:
+            for item in items:
+                if int(item['product_id']) <= 0 or int(item['quantity']) <= 0:
+                    raise ValueError
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"success": False, "error": "Each item needs a valid product_id and a positive quantity"}), 400
+        
+        hold = InventoryService.create_hold(current_user['id'], items)
+        
+        return jsonify({
+            "success": True,
+            "reservation_token": hold['hold_token'],
+            "expires_at": hold['expires_at'],
+            "items": hold['items']
+        }), 201
+        
+    except InsufficientStockError as e:
+        return jsonify({
+            "success": False,
+            "error": "Some items are out of stock",
+            "shortages": e.shortages
+        }), 409
+    except Exception as e:
+        logger.error(f"❌ Error reserving stock: {e}")
+        return jsonify({"success": False, "error": "Failed to reserve stock"}), 500
+
+@order_bp.route('/reserve/<reservation_token>', methods=['DELETE'])
+@token_required
+def release_reservation(current_user, reservation_token):
+    """
+    🔒 SECURED: Release a stock hold when checkout is abandoned
+    """
+    try:
+        released = InventoryService.release_hold(reservation_token, current_user['id'])
+        
+        if not released:
+            return jsonify({"success": False, "error": "Reservation not found or already used"}), 404
+        
+        return jsonify({"success": True, "message": "Reservation released"})
+        
+    except Exception as e:
+        logger.error(f"❌ Error releasing reservation: {e}")
+        return jsonify({"success": False, "error": "Failed to release reservation"}), 500
+
 @order_bp.route('/<order_id>/status', methods=['PUT'])
 @admin_required
 def update_order_status(admin_user, order_id):
@@ -395,34 +340,38 @@ def update_order_status(admin_user, order_id):
         if 'notes' in data and data['notes']:
             notes = InputValidator.sanitize_string(data['notes'], max_length=500)
         
-        # Update order status
-        update_query = """
-            UPDATE orders 
-            SET status = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-            RETURNING *
-        """
-        
-        result = db.execute_query(update_query, (new_status, order_id), fetch=True)
-        
-        if not result:
-            return jsonify({"success": False, "error": "Order not found"}), 404
-        
-        # Get IST timestamp for timeline
-        current_time_ist = get_ist_time()
+        # Status, timeline and sales rollups change in one transaction
+        with db.get_cursor() as cursor:
+            cursor.execute("""
+                UPDATE orders 
+                SET status = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+                RETURNING *
+            """, (new_status, order_id))
+            updated_order = cursor.fetchone()
+            
+            if not updated_order:
+                return jsonify({"success": False, "error": "Order not found"}), 404
+            
+            # Get IST timestamp for timeline
+            current_time_ist = get_ist_time()
+            
+            # Add timeline entry with IST timestamp
+            cursor.execute("""
+                INSERT INTO order_timeline (order_id, status, completed, notes, timestamp)
+                VALUES (%s, %s, true, %s, %s)
+            """, (order_id, new_status, notes, current_time_ist))
+            
+            SalesRollupService.apply_orders_safely(cursor, [order_id])
         
-        # Add timeline entry with IST timestamp
-        timeline_query = """
-            INSERT INTO order_timeline (order_id, status, completed, notes, timestamp)
-            VALUES (%s, %s, true, %s, %s)
-        """
-        db.execute_query(timeline_query, (order_id, new_status, notes, current_time_ist))
+        OrderListService.invalidate_counts()
+        SalesSeriesService.invalidate()
         
         logger.info(f"✅ Admin {admin_user['id']} updated order {order_id} to {new_status}")
         
         return jsonify({
             "success": True,
-            "order": dict(result[0]),
+            "order": dict(updated_order),
             "message": f"Order status updated to {new_status}"
         })
         
@@ -435,84 +384,31 @@ def update_order_status(admin_user, order_id):
 def get_all_orders_admin(admin_user):
     """
     🔒 SECURED: Get all orders for admin dashboard
+    Keyset paginated: pass `next_cursor` from the previous page as `cursor`.
+    `count` = exact (default) | approx | cached | none
     """
     try:
         status_filter = request.args.get('status')
-        limit = request.args.get('limit', 1000, type=int)  # Increased default limit to 1000
-        offset = request.args.get('offset', 0, type=int)
-        
-        # Base query - Fixed to handle orders without items
-        query = """
-            SELECT o.*, 
-                   (SELECT COUNT(*) FROM order_items WHERE order_id = o.id) as items_count,
-                   COALESCE(
-                       (SELECT JSON_AGG(
-                           JSON_BUILD_OBJECT(
-                               'product_name', oi.product_name,
-                               'quantity', oi.quantity,
-                               'price', oi.product_price,
-                               'total', oi.total_price,
-                               'product_id', oi.product_id
-                           )
-                       )
-                       FROM order_items oi
-                       WHERE oi.order_id = o.id),
-                       '[]'::json
-                   ) as items,
-                   COALESCE(
-                       (SELECT JSON_AGG(
-                           JSON_BUILD_OBJECT(
-                               'status', ot.status,
-                               'timestamp', ot.timestamp,
-                               'completed', ot.completed,
-                               'notes', ot.notes
-                           ) ORDER BY ot.timestamp
-                       )
-                       FROM order_timeline ot
-                       WHERE ot.order_id = o.id),
-                       '[]'::json
-                   ) as timeline
-            FROM orders o
-        """
-        
-        params = []
-        
-        # Add status filter if provided
-        if status_filter:
-            query += " WHERE o.status = %s"
-            params.append(status_filter)
-        
-        query += """
-            ORDER BY o.created_at DESC
-            LIMIT %s OFFSET %s
-        """
-        params.extend([limit, offset])
-        
-        orders = db.execute_query(query, tuple(params), fetch=True)
-        
-        # Get total count
-        count_query = "SELECT COUNT(*) as total FROM orders"
-        if status_filter:
-            count_query += " WHERE status = %s"
-            count_result = db.execute_query_one(count_query, (status_filter,))
-        else:
-            count_result = db.execute_query_one(count_query)
-        
-        total = count_result['total'] if count_result else 0
-        
-        orders_list = []
-        if orders:
-            for order in orders:
-                order_dict = dict(order)
-                # Parse items if it's a JSON string
-                if isinstance(order_dict.get('items'), str):
-                    import json
-                    order_dict['items'] = json.loads(order_dict['items'])
-                # Parse timeline if it's a JSON string
-                if isinstance(order_dict.get('timeline'), str):
-                    import json
-                    order_dict['timeline'] = json.loads(order_dict['timeline'])
-                orders_list.append(order_dict)
+        limit = request.args.get('limit', MAX_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        cursor = request.args.get('cursor')
+        offset = request.args.get('offset', 0, type=int)  # legacy paging, prefer cursor
+        count_mode = request.args.get('count', 'exact')
+
+        if count_mode not in COUNT_MODES:
+            return jsonify({
+                "success": False,
+                "error": f"count must be one of: {', '.join(COUNT_MODES)}"
+            }), 400
+
+        try:
+            orders_list, next_cursor = OrderListService.fetch_page(
+                status=status_filter, limit=limit, cursor=cursor, offset=offset
+            )
+        except InvalidCursorError:
+            return jsonify({"success": False, "error": "Invalid cursor"}), 400
+
+        total = OrderListService.count(status_filter, count_mode)
         
         logger.info(f"✅ Admin {admin_user['id']} fetched {len(orders_list)} orders")
         
@@ -520,8 +416,11 @@ def get_all_orders_admin(admin_user):
             "success": True,
             "orders": orders_list,
             "total": total,
+            "total_is_estimate": count_mode == 'approx',
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         })
         
     except Exception as e:
@@ -2,12 +2,34 @@ from flask import Blueprint, request, jsonify
 from backend.utils.database import db
 from backend.utils.auth_middleware import admin_required, optional_auth
 from backend.utils.input_validator import InputValidator
-from backend.utils.response_cache import response_cache
+from backend.config.config import Config
+from backend.utils.http_cache import cached_json_response
+from backend.services.catalog_service import CatalogService
+from backend.services.product_search_service import ProductSearchService
+from backend.services.related_products_service import RelatedProductsService
 import logging
 
 logger = logging.getLogger(__name__)
 product_bp = Blueprint('products', __name__)
 
+def product_list_response(category=None, limit=None, include_out_of_stock=False,
+                          min_price=None, max_price=None):
+    """Encoded product listing, memoized on the current catalog snapshot"""
+    catalog = CatalogService.snapshot()
+
+    def build_payload():
+        products = catalog.list_products(category, limit, include_out_of_stock, min_price, max_price)
+        return {
+            "success": True,
+            "products": products,
+            "count": len(products)
+        }
+
+    cache_key = f"list:{category or ''}:{limit or ''}:{include_out_of_stock}:{min_price}:{max_price}"
+    return cached_json_response(
+        cache_key, build_payload, ttl_seconds=Config.CATALOG_SNAPSHOT_SECONDS, cache=catalog
+    )
+
 @product_bp.route('/', methods=['GET'])
 def get_all_products():
     """Get all products with optional filtering"""
@@ -15,53 +37,15 @@ def get_all_products():
         category = request.args.get('category')
         search = request.args.get('search')
         limit = request.args.get('limit', type=int)
+        min_price = request.args.get('min_price', type=float)
+        max_price = request.args.get('max_price', type=float)
         include_out_of_stock = request.args.get('include_out_of_stock', 'false').lower() == 'true'
 
-        cache_key = (
-            f"products:list:v2:category={category or ''}:search={search or ''}:"
-            f"limit={limit or ''}:include_oos={include_out_of_stock}"
-        )
-        def build_payload():
-            query = """
-                SELECT p.*, c.name as category_name 
-                FROM products p 
-                LEFT JOIN categories c ON p.category_id = c.id 
-                WHERE p.status = 'active'
-            """
-            params = []
-
-            # By default, exclude out-of-stock products for customers
-            if not include_out_of_stock:
-                query_nonlocal = query + " AND p.stock > 0"
-            else:
-                query_nonlocal = query
-
-            if category:
-                query_nonlocal += " AND (p.category_name = %s OR c.name = %s)"
-                params.extend([category, category])
-
-            if search:
-                query_nonlocal += " AND (p.name ILIKE %s OR p.description ILIKE %s)"
-                search_term = f"%{search}%"
-                params.extend([search_term, search_term])
+        if search and search.strip():
+            # Search results live in their own bounded cache
+            return jsonify(ProductSearchService.search_payload(search, category, limit, include_out_of_stock))
 
-            query_nonlocal += " ORDER BY p.id"
-
-            if limit:
-                query_nonlocal += " LIMIT %s"
-                params.append(limit)
-
-            products = db.execute_query(query_nonlocal, params, fetch=True)
-
-            return {
-                "success": True,
-                "products": [dict(product) for product in products],
-                "count": len(products)
-            }
-
-        payload = response_cache.get_or_set(cache_key, build_payload, ttl_seconds=30)
-
-        return jsonify(payload)
+        return product_list_response(category, limit, include_out_of_stock, min_price, max_price)
         
     except Exception as e:
         logger.error(f"Error fetching products: {e}")
@@ -71,30 +55,15 @@ def get_all_products():
 def get_product_by_id(product_id):
     """Get a specific product by ID"""
     try:
-        cache_key = f"products:by-id:{product_id}"
-        def build_payload():
-            query = """
-                SELECT p.*, c.name as category_name 
-                FROM products p 
-                LEFT JOIN categories c ON p.category_id = c.id 
-                WHERE p.id = %s AND p.status = 'active'
-            """
-            product = db.execute_query_one(query, (product_id,))
+        product = CatalogService.snapshot().by_id.get(product_id)
 
-            if not product:
-                return None
-
-            return {
-                "success": True,
-                "product": dict(product)
-            }
-
-        payload = response_cache.get_or_set(cache_key, build_payload, ttl_seconds=60)
-
-        if payload is None:
+        if product is None:
             return jsonify({"success": False, "error": "Product not found"}), 404
 
-        return jsonify(payload)
+        return jsonify({
+            "success": True,
+            "product": product
+        })
         
     except Exception as e:
         logger.error(f"Error fetching product {product_id}: {e}")
@@ -104,27 +73,21 @@ def get_product_by_id(product_id):
 def get_products_by_category(category_name):
     """Get products by category name"""
     try:
-        cache_key = f"products:category:{category_name}"
-        def build_payload():
-            query = """
-                SELECT p.*, c.name as category_name 
-                FROM products p 
-                LEFT JOIN categories c ON p.category_id = c.id 
-                WHERE (p.category_name = %s OR c.name = %s) AND p.status = 'active'
-                ORDER BY p.id
-            """
-            products = db.execute_query(query, (category_name, category_name), fetch=True)
+        catalog = CatalogService.snapshot()
 
+        def build_payload():
+            products = catalog.list_products(category_name, include_out_of_stock=True)
             return {
                 "success": True,
-                "products": [dict(product) for product in products],
+                "products": products,
                 "category": category_name,
                 "count": len(products)
             }
 
-        payload = response_cache.get_or_set(cache_key, build_payload, ttl_seconds=30)
-
-        return jsonify(payload)
+        return cached_json_response(
+            f"category:{category_name}", build_payload,
+            ttl_seconds=Config.CATALOG_SNAPSHOT_SECONDS, cache=catalog
+        )
         
     except Exception as e:
         logger.error(f"Error fetching products for category {category_name}: {e}")
@@ -203,15 +166,16 @@ def create_product(current_user):
         result = db.execute_query(query, params, fetch=True)
         
         if result:
-            response_cache.invalidate("products:")
-            response_cache.invalidate("categories:")
-
             # Update category product count
             if category_id:
                 db.execute_query(
                     "UPDATE categories SET products_count = products_count + 1 WHERE id = %s",
                     (category_id,)
                 )
+
+            # After the count update, so a rebuild can't pick up the old count
+            CatalogService.invalidate()
+            ProductSearchService.invalidate()
             
             logger.info(f"✅ Admin {current_user['id']} created product: {name}")
             
@@ -314,8 +278,8 @@ def update_product(current_user, product_id):
         result = db.execute_query(query, params, fetch=True)
         
         if result:
-            response_cache.invalidate("products:")
-            response_cache.invalidate("categories:")
+            CatalogService.invalidate()
+            ProductSearchService.invalidate()
             logger.info(f"✅ Admin {current_user['id']} updated product {product_id}")
             
             return jsonify({
@@ -350,8 +314,6 @@ def delete_product(current_user, product_id):
         result = db.execute_query(query, (product_id,), fetch=True)
         
         if result:
-            response_cache.invalidate("products:")
-            response_cache.invalidate("categories:")
             category_id = result[0]['category_id']
             
             # Update category product count
@@ -366,6 +328,8 @@ def delete_product(current_user, product_id):
                     (category_id, category_id)
                 )
             
+            CatalogService.invalidate()
+            ProductSearchService.invalidate()
             logger.info(f"✅ Admin {current_user['id']} deleted product {product_id}")
             
             return jsonify({
@@ -385,32 +349,14 @@ def get_related_products(product_id):
     try:
         limit = request.args.get('limit', default=4, type=int)
         
-        # First get the current product's category
-        current_product_query = """
-            SELECT category_id FROM products 
-            WHERE id = %s AND status = 'active'
-        """
-        current_product = db.execute_query_one(current_product_query, (product_id,))
+        related_products = RelatedProductsService.related(CatalogService.snapshot(), product_id, limit)
         
-        if not current_product:
+        if related_products is None:
             return jsonify({"success": False, "error": "Product not found"}), 404
         
-        category_id = dict(current_product)['category_id']
-        
-        # Get related products from the same category, excluding the current product
-        query = """
-            SELECT p.*, c.name as category_name 
-            FROM products p 
-            LEFT JOIN categories c ON p.category_id = c.id 
-            WHERE p.category_id = %s AND p.id != %s AND p.status = 'active'
-            ORDER BY RANDOM()
-            LIMIT %s
-        """
-        related_products = db.execute_query(query, (category_id, product_id, limit), fetch=True)
-        
         return jsonify({
             "success": True,
-            "products": [dict(product) for product in related_products],
+            "products": related_products,
             "count": len(related_products)
         })
         
@@ -1,24 +1,18 @@
 """
 Report Generation Routes for Admin
-Provides efficient export functionality in PDF and Excel formats
-Uses optimized queries with proper indexing
+Provides streaming export functionality in PDF, Excel and CSV formats
+Rows are read through a server-side cursor (see ReportExporter), so
+exports use constant memory regardless of how many rows match.
+Large exports can also run as background jobs (see ReportJobService):
+POST /<report>/jobs, poll GET /jobs/<job_id>, then GET /jobs/<job_id>/download
 """
 from flask import Blueprint, jsonify, request, send_file
 from datetime import datetime, timedelta
-from io import BytesIO
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image
-from reportlab.pdfgen import canvas
-from psycopg2.extras import RealDictCursor
-from backend.utils.database import db
 from backend.utils.auth_middleware import admin_required
-from decimal import Decimal
+from backend.config.config import Config
+from backend.services.report_export_service import ReportExporter, ReportDefinition
+from backend.services.report_job_service import ReportJobService
 
 report_bp = Blueprint('reports', __name__)
 
@@ -28,10 +22,11 @@ def get_selected_fields(request_fields, all_fields):
     """Parse and validate selected fields from request"""
     if not request_fields:
         return all_fields
-    
+
     requested = request_fields.split(',')
     # Only return fields that exist in all_fields
-    return [f for f in requested if f in all_fields]
+    selected = [f for f in requested if f in all_fields]
+    return selected or all_fields
 
 def is_preview_request():
     """Check if this is a preview request"""
@@ -44,7 +39,7 @@ def format_currency(amount):
 def get_date_range(range_type):
     """Get start and end date based on range type"""
     today = datetime.now().date()
-    
+
     if range_type == 'today':
         return today, today
     elif range_type == 'week':
@@ -56,1170 +51,746 @@ def get_date_range(range_type):
     else:
         return None, None
 
-def create_excel_workbook(title):
-    """Create a new Excel workbook with styling"""
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = title[:31]  # Excel sheet name limit
-    
-    # Header styling
-    header_fill = PatternFill(start_color='FFE01B', end_color='FFE01B', fill_type='solid')
-    header_font = Font(bold=True, size=12)
-    header_alignment = Alignment(horizontal='center', vertical='center')
-    
-    return wb, ws, header_fill, header_font, header_alignment
-
-def apply_excel_styling(ws, headers, header_fill, header_font, header_alignment):
-    """Apply consistent styling to Excel worksheet"""
-    # Set headers
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Auto-adjust column widths
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column].width = adjusted_width
+def pdf_column_widths(num_cols, total_inches=7.0):
+    """Distribute the printable width evenly across columns"""
+    return [total_inches / num_cols * inch] * num_cols
+
+def report_response(report):
+    """Preview JSON or a streamed download for a report built from the query string"""
+    if is_preview_request():
+        return jsonify(ReportExporter.preview(report))
+    return ReportExporter.response(report, request.args.get('format', 'excel'))
 
 # ============= PRODUCTS REPORT =============
 
+PRODUCT_FIELD_LABELS = {
+    'product_id': 'ID',
+    'name': 'Name',
+    'category': 'Category',
+    'price': 'Price',
+    'stock': 'Stock',
+    'status': 'Status',
+    'description': 'Description',
+    'image_url': 'Image URL',
+    'created_at': 'Created Date'
+}
+
+def products_report(args):
+    """Products report for filters: category_id, stock_status, fields"""
+    category_id = args.get('category_id', 'all')
+    stock_status = args.get('stock_status', 'all')  # all, in_stock, out_of_stock, low_stock
+
+    # Define field mapping
+    fields_to_select = get_selected_fields(args.get('fields', ''), list(PRODUCT_FIELD_LABELS))
+
+    # Build optimized query with proper indexing
+    query = '''
+        SELECT
+            p.id as product_id,
+            p.name,
+            c.name as category,
+            p.price,
+            p.stock,
+            p.status,
+            p.description,
+            p.image_url,
+            p.created_at
+        FROM products p
+        LEFT JOIN categories c ON p.category_id = c.id
+        WHERE 1=1
+    '''
+
+    params = []
+
+    # Apply filters
+    if category_id != 'all':
+        query += ' AND p.category_id = %s'
+        params.append(int(category_id))
+
+    if stock_status == 'in_stock':
+        query += ' AND p.stock > 10'
+    elif stock_status == 'out_of_stock':
+        query += ' AND p.stock = 0'
+    elif stock_status == 'low_stock':
+        query += ' AND p.stock > 0 AND p.stock <= 10'
+
+    query += ' ORDER BY p.id'
+
+    def format_row(product):
+        filtered_row = {field: product.get(field) for field in fields_to_select}
+        # Format values
+        if 'price' in filtered_row and filtered_row['price']:
+            filtered_row['price'] = f"₹{float(filtered_row['price'])}"
+        if 'created_at' in filtered_row and filtered_row['created_at']:
+            filtered_row['created_at'] = filtered_row['created_at'].strftime('%Y-%m-%d')
+        return filtered_row
+
+    return ReportDefinition(
+        'products', 'Products Report', query, params, fields_to_select, PRODUCT_FIELD_LABELS, format_row,
+        head=50,
+        summary=lambda products: [('Total Products', products.count)],
+        pdf=lambda products: generate_products_pdf(products, format_row, fields_to_select)
+    )
+
 @report_bp.route('/products', methods=['GET'])
 @admin_required
 def export_products(admin_user):
     """
     Export products report with filters
-    Query params: category_id, stock_status, format (pdf/excel), preview (true/false), fields (comma-separated)
+    Query params: category_id, stock_status, format (pdf/excel/csv), preview (true/false), fields (comma-separated)
     """
     try:
-        category_id = request.args.get('category_id', 'all')
-        stock_status = request.args.get('stock_status', 'all')  # all, in_stock, out_of_stock, low_stock
-        export_format = request.args.get('format', 'excel')
-        preview = is_preview_request()
-        selected_fields = request.args.get('fields', '')
-        
-        # Define field mapping
-        all_fields = ['product_id', 'name', 'category', 'price', 'stock', 'status', 'description', 'image_url', 'created_at']
-        fields_to_select = get_selected_fields(selected_fields, all_fields) if selected_fields else all_fields
-        
-        with db.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Build optimized query with proper indexing
-            query = '''
-                SELECT 
-                    p.id as product_id,
-                    p.name,
-                    c.name as category,
-                    p.price,
-                    p.stock,
-                    p.status,
-                    p.description,
-                    p.image_url,
-                    p.created_at
-                FROM products p
-                LEFT JOIN categories c ON p.category_id = c.id
-                WHERE 1=1
-            '''
-            
-            params = []
-            
-            # Apply filters
-            if category_id != 'all':
-                query += ' AND p.category_id = %s'
-                params.append(int(category_id))
-            
-            if stock_status == 'in_stock':
-                query += ' AND p.stock > 10'
-            elif stock_status == 'out_of_stock':
-                query += ' AND p.stock = 0'
-            elif stock_status == 'low_stock':
-                query += ' AND p.stock > 0 AND p.stock <= 10'
-            
-            query += ' ORDER BY p.id'
-            
-            cursor.execute(query, params)
-            products = cursor.fetchall()
-            
-            # Filter data by selected fields
-            filtered_data = []
-            for product in products:
-                filtered_row = {field: product.get(field) for field in fields_to_select}
-                # Format values
-                if 'price' in filtered_row and filtered_row['price']:
-                    filtered_row['price'] = f"₹{float(filtered_row['price'])}"
-                if 'created_at' in filtered_row and filtered_row['created_at']:
-                    filtered_row['created_at'] = filtered_row['created_at'].strftime('%Y-%m-%d')
-                filtered_data.append(filtered_row)
-            
-            # If preview, return JSON
-            if preview:
-                return jsonify({
-                    'success': True,
-                    'data': filtered_data,  # Return all data for preview
-                    'total': len(filtered_data),
-                    'fields': fields_to_select
-                })
-            
-            # Generate report based on format
-            if export_format == 'excel':
-                return generate_products_excel(filtered_data, fields_to_select)
-            else:
-                return generate_products_pdf(filtered_data, fields_to_select)
-                
+        return report_response(products_report(request.args))
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def generate_products_excel(products, selected_fields):
-    """Generate Excel file for products"""
-    wb, ws, header_fill, header_font, header_alignment = create_excel_workbook('Products Report')
-    
-    # Field labels mapping
-    field_labels = {
-        'product_id': 'ID',
-        'name': 'Name',
-        'category': 'Category',
-        'price': 'Price',
-        'stock': 'Stock',
-        'status': 'Status',
-        'description': 'Description',
-        'image_url': 'Image URL',
-        'created_at': 'Created Date'
-    }
-    
-    # Headers based on selected fields
-    headers = [field_labels.get(f, f) for f in selected_fields]
-    
-    apply_excel_styling(ws, headers, header_fill, header_font, header_alignment)
-    
-    # Data rows
-    for row_num, product in enumerate(products, 2):
-        for col_num, field in enumerate(selected_fields, 1):
-            value = product.get(field, 'N/A')
-            ws.cell(row=row_num, column=col_num, value=str(value) if value is not None else 'N/A')
-    
-    # Add summary sheet
-    summary_ws = wb.create_sheet('Summary')
-    summary_ws['A1'] = 'Total Products'
-    summary_ws['B1'] = len(products)
-    
-    # Save to bytes
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f"products_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
+def generate_products_pdf(products, format_row, selected_fields):
+    """PDF content for products (first 50 rows, totals from the full stream)"""
+    elements = ReportExporter.pdf_title("Products Report")
 
-def generate_products_pdf(products, selected_fields):
-    """Generate PDF file for products"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#000000'), spaceAfter=30)
-    
-    # Title
-    title = Paragraph("Products Report", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Field labels mapping
-    field_labels = {
-        'product_id': 'ID',
-        'name': 'Name',
-        'category': 'Category',
-        'price': 'Price',
-        'stock': 'Stock',
-        'status': 'Status',
-        'description': 'Description',
-        'image_url': 'Image URL',
-        'created_at': 'Created Date'
-    }
-    
     # Products table (first 50 products for PDF)
-    table_data = [[field_labels.get(f, f) for f in selected_fields]]
-    for product in products[:50]:
-        row = [str(product.get(f, 'N/A'))[:30] for f in selected_fields]  # Truncate long values
-        table_data.append(row)
-    
-    # Calculate column widths dynamically
-    num_cols = len(selected_fields)
-    col_width = 7.0 / num_cols  # Distribute 7 inches across columns
-    col_widths = [col_width * inch] * num_cols
-    
-    products_table = Table(table_data, colWidths=col_widths)
-    products_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FFE01B')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-    elements.append(products_table)
-    
-    if len(products) > 50:
-        note = Paragraph(f"<i>Note: Showing first 50 of {len(products)} products. Download Excel for complete data.</i>", styles['Normal'])
-        elements.append(Spacer(1, 0.2*inch))
-        elements.append(note)
-    
-    # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
-    
-    filename = f"products_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    
-    return send_file(
-        buffer,
-        mimetype='application/pdf',
-        as_attachment=True,
-        download_name=filename
+    rows = []
+    for product in products.head:
+        formatted = format_row(product)
+        rows.append([str(formatted.get(f, 'N/A'))[:30] for f in selected_fields])  # Truncate long values
+
+    elements += ReportExporter.pdf_tables(
+        [PRODUCT_FIELD_LABELS[f] for f in selected_fields], rows,
+        pdf_column_widths(len(selected_fields))
     )
 
+    if products.count > 50:
+        elements += ReportExporter.pdf_note(
+            f"Note: Showing first 50 of {products.count} products. Download Excel for complete data."
+        )
+
+    return elements
+
 # ============= ORDERS REPORT =============
 
+ORDER_FIELD_LABELS = {
+    'order_id': 'Order ID',
+    'customer_name': 'Customer',
+    'phone': 'Phone',
+    'total_amount': 'Total',
+    'status': 'Status',
+    'order_date': 'Date',
+    'address': 'Address',
+    'items_count': 'Items',
+    'payment_method': 'Payment'
+}
+
+def orders_report(args):
+    """Orders report for filters: status, date_range, date_from, date_to, fields"""
+    status = args.get('status', 'all')
+    date_range = args.get('date_range', 'all')
+    date_from = args.get('date_from')
+    date_to = args.get('date_to')
+
+    # Define field mapping
+    fields_to_select = get_selected_fields(args.get('fields', ''), list(ORDER_FIELD_LABELS))
+
+    # Optimized query with JOIN
+    query = '''
+        SELECT
+            o.id as order_id,
+            o.user_name as customer_name,
+            o.phone,
+            o.total as total_amount,
+            o.status,
+            o.created_at as order_date,
+            o.delivery_address as address,
+            (SELECT COUNT(*) FROM order_items oi WHERE oi.order_id = o.id) as items_count,
+            o.payment_method
+        FROM orders o
+        WHERE 1=1
+    '''
+
+    params = []
+
+    # Apply status filter
+    if status != 'all':
+        query += ' AND o.status = %s'
+        params.append(status)
+
+    # Apply date range filter
+    if date_range != 'all' and date_range != 'custom':
+        start_date, end_date = get_date_range(date_range)
+        if start_date and end_date:
+            query += ' AND o.order_date BETWEEN %s AND %s'
+            params.extend([start_date, end_date])
+    elif date_range == 'custom' and date_from and date_to:
+        query += ' AND o.order_date BETWEEN %s AND %s'
+        params.extend([date_from, date_to])
+
+    query += ' ORDER BY o.created_at DESC'
+
+    def format_row(order):
+        filtered_row = {field: order.get(field) for field in fields_to_select}
+        # Format values
+        if 'total_amount' in filtered_row and filtered_row['total_amount']:
+            filtered_row['total_amount'] = f"₹{float(filtered_row['total_amount'])}"
+        if 'order_date' in filtered_row and filtered_row['order_date']:
+            filtered_row['order_date'] = filtered_row['order_date'].strftime('%Y-%m-%d %H:%M')
+        return filtered_row
+
+    return ReportDefinition(
+        'orders', 'Orders Report', query, params, fields_to_select, ORDER_FIELD_LABELS, format_row,
+        head=50,
+        summary=lambda orders: [('Total Orders', orders.count)],
+        pdf=lambda orders: generate_orders_pdf(orders, format_row, fields_to_select)
+    )
+
 @report_bp.route('/orders', methods=['GET'])
 @admin_required
 def export_orders(admin_user):
     """
     Export orders report with filters
-    Query params: status, date_range, date_from, date_to, format, preview (true/false), fields (comma-separated)
+    Query params: status, date_range, date_from, date_to, format (pdf/excel/csv), preview (true/false), fields (comma-separated)
     """
     try:
-        status = request.args.get('status', 'all')
-        date_range = request.args.get('date_range', 'all')
-        date_from = request.args.get('date_from')
-        date_to = request.args.get('date_to')
-        export_format = request.args.get('format', 'excel')
-        preview = is_preview_request()
-        selected_fields = request.args.get('fields', '')
-        
-        # Define field mapping
-        all_fields = ['order_id', 'customer_name', 'phone', 'total_amount', 'status', 'order_date', 'address', 'items_count', 'payment_method']
-        fields_to_select = get_selected_fields(selected_fields, all_fields) if selected_fields else all_fields
-        
-        with db.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Optimized query with JOIN
-            query = '''
-                SELECT 
-                    o.id as order_id,
-                    o.user_name as customer_name,
-                    o.phone,
-                    o.total as total_amount,
-                    o.status,
-                    o.created_at as order_date,
-                    o.delivery_address as address,
-                    (SELECT COUNT(*) FROM order_items oi WHERE oi.order_id = o.id) as items_count,
-                    o.payment_method
-                FROM orders o
-                WHERE 1=1
-            '''
-            
-            params = []
-            
-            # Apply status filter
-            if status != 'all':
-                query += ' AND o.status = %s'
-                params.append(status)
-            
-            # Apply date range filter
-            if date_range != 'all' and date_range != 'custom':
-                start_date, end_date = get_date_range(date_range)
-                if start_date and end_date:
-                    query += ' AND o.order_date BETWEEN %s AND %s'
-                    params.extend([start_date, end_date])
-            elif date_range == 'custom' and date_from and date_to:
-                query += ' AND o.order_date BETWEEN %s AND %s'
-                params.extend([date_from, date_to])
-            
-            query += ' ORDER BY o.created_at DESC'
-            
-            cursor.execute(query, params)
-            orders = cursor.fetchall()
-            
-            # Filter data by selected fields
-            filtered_data = []
-            for order in orders:
-                filtered_row = {field: order.get(field) for field in fields_to_select}
-                # Format values
-                if 'total_amount' in filtered_row and filtered_row['total_amount']:
-                    filtered_row['total_amount'] = f"₹{float(filtered_row['total_amount'])}"
-                if 'order_date' in filtered_row and filtered_row['order_date']:
-                    filtered_row['order_date'] = filtered_row['order_date'].strftime('%Y-%m-%d %H:%M')
-                filtered_data.append(filtered_row)
-            
-            # If preview, return JSON
-            if preview:
-                return jsonify({
-                    'success': True,
-                    'data': filtered_data,  # Return all data for preview
-                    'total': len(filtered_data),
-                    'fields': fields_to_select
-                })
-            
-            # Generate report
-            if export_format == 'excel':
-                return generate_orders_excel(filtered_data, fields_to_select)
-            else:
-                return generate_orders_pdf(filtered_data, fields_to_select)
-                
+        return report_response(orders_report(request.args))
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def generate_orders_excel(orders, selected_fields):
-    """Generate Excel file for orders"""
-    wb, ws, header_fill, header_font, header_alignment = create_excel_workbook('Orders Report')
-    
-    # Field labels mapping
-    field_labels = {
-        'order_id': 'Order ID',
-        'customer_name': 'Customer',
-        'phone': 'Phone',
-        'total_amount': 'Total',
-        'status': 'Status',
-        'order_date': 'Date',
-        'address': 'Address',
-        'items_count': 'Items',
-        'payment_method': 'Payment'
-    }
-    
-    headers = [field_labels.get(f, f) for f in selected_fields]
-    
-    apply_excel_styling(ws, headers, header_fill, header_font, header_alignment)
-    
-    # Data rows
-    for row_num, order in enumerate(orders, 2):
-        for col_num, field in enumerate(selected_fields, 1):
-            value = order.get(field, 'N/A')
-            ws.cell(row=row_num, column=col_num, value=str(value) if value is not None else 'N/A')
-    
-    # Summary sheet
-    summary_ws = wb.create_sheet('Summary')
-    summary_ws['A1'] = 'Total Orders'
-    summary_ws['B1'] = len(orders)
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f"orders_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
+def generate_orders_pdf(orders, format_row, selected_fields):
+    """PDF content for orders (first 50 rows, totals from the full stream)"""
+    elements = ReportExporter.pdf_title("Orders Report")
 
-def generate_orders_pdf(orders, selected_fields):
-    """Generate PDF file for orders"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#000000'), spaceAfter=30)
-    
-    title = Paragraph("Orders Report", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Field labels mapping
-    field_labels = {
-        'order_id': 'Order ID',
-        'customer_name': 'Customer',
-        'phone': 'Phone',
-        'total_amount': 'Total',
-        'status': 'Status',
-        'order_date': 'Date',
-        'address': 'Address',
-        'items_count': 'Items',
-        'payment_method': 'Payment'
-    }
-    
     # Orders table (first 50 for PDF)
-    table_data = [[field_labels.get(f, f) for f in selected_fields]]
-    for order in orders[:50]:
-        row = [str(order.get(f, 'N/A'))[:30] for f in selected_fields]
-        table_data.append(row)
-    
-    # Calculate column widths
-    num_cols = len(selected_fields)
-    col_width = 7.0 / num_cols
-    col_widths = [col_width * inch] * num_cols
-    
-    orders_table = Table(table_data, colWidths=col_widths)
-    orders_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FFE01B')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-    elements.append(orders_table)
-    
-    if len(orders) > 50:
-        note = Paragraph(f"<i>Note: Showing first 50 of {len(orders)} orders. Download Excel for complete data.</i>", styles['Normal'])
-        elements.append(Spacer(1, 0.2*inch))
-        elements.append(note)
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    filename = f"orders_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    
-    return send_file(
-        buffer,
-        mimetype='application/pdf',
-        as_attachment=True,
-        download_name=filename
+    rows = []
+    for order in orders.head:
+        formatted = format_row(order)
+        rows.append([str(formatted.get(f, 'N/A'))[:30] for f in selected_fields])
+
+    elements += ReportExporter.pdf_tables(
+        [ORDER_FIELD_LABELS[f] for f in selected_fields], rows,
+        pdf_column_widths(len(selected_fields))
     )
 
-# Continue with other report endpoints in next file...
+    if orders.count > 50:
+        elements += ReportExporter.pdf_note(
+            f"Note: Showing first 50 of {orders.count} orders. Download Excel for complete data."
+        )
+
+    return elements
+
 # ============= USERS REPORT =============
 
+USER_FIELD_LABELS = {
+    'user_id': 'ID',
+    'name': 'Name',
+    'email': 'Email',
+    'phone': 'Phone',
+    'role': 'Role',
+    'status': 'Status',
+    'created_at': 'Registration Date',
+    'last_login': 'Last Login',
+    'login_count': 'Login Count',
+    'total_orders': 'Total Orders',
+    'total_spent': 'Total Spent',
+    'last_order_date': 'Last Order Date'
+}
+
+def users_report(args):
+    """Users report for filters: role, status, fields"""
+    role = args.get('role', 'all')
+    status = args.get('status', 'all')
+
+    # Define all available fields
+    fields_to_select = get_selected_fields(args.get('fields', ''), list(USER_FIELD_LABELS))
+
+    query = '''
+        SELECT
+            u.id as user_id,
+            u.name,
+            u.phone,
+            u.email,
+            u.role,
+            u.status,
+            u.created_at,
+            u.last_login,
+            u.login_count,
+            COALESCE(order_stats.total_orders, 0) as total_orders,
+            COALESCE(order_stats.total_spent, 0) as total_spent,
+            order_stats.last_order_date
+        FROM users u
+        LEFT JOIN (
+            SELECT
+                user_id,
+                COUNT(*) as total_orders,
+                SUM(total) as total_spent,
+                MAX(created_at) as last_order_date
+            FROM orders
+            WHERE status != 'cancelled'
+            GROUP BY user_id
+        ) order_stats ON u.id = order_stats.user_id
+        WHERE 1=1
+    '''
+
+    params = []
+
+    if role != 'all':
+        query += ' AND u.role = %s'
+        params.append(role)
+
+    if status != 'all':
+        query += ' AND u.status = %s'
+        params.append(status)
+
+    query += ' ORDER BY u.created_at DESC'
+
+    def format_row(user):
+        filtered_user = {}
+        for field in fields_to_select:
+            value = user.get(field)
+            # Format datetime fields
+            if field in ['created_at', 'last_login', 'last_order_date'] and value:
+                filtered_user[field] = value.strftime('%Y-%m-%d %H:%M:%S') if hasattr(value, 'strftime') else str(value)
+            else:
+                filtered_user[field] = value
+        return filtered_user
+
+    return ReportDefinition(
+        'users', 'Users Report', query, params, fields_to_select, USER_FIELD_LABELS, format_row,
+        money_fields=('total_spent',),
+        metrics={
+            'active': lambda u: u['status'] == 'active',
+            'revenue': lambda u: float(u['total_spent']),
+        },
+        head=40,
+        summary=lambda users: [
+            ('Total Users', users.count),
+            ('Active Users', users.totals['active']),
+            ('Total Revenue', format_currency(users.totals['revenue'])),
+        ],
+        pdf=generate_users_pdf
+    )
 
 @report_bp.route('/users', methods=['GET'])
 @admin_required
 def export_users(admin_user):
     """
     Export users report with filters
-    Query params: role, status, format, preview, fields
+    Query params: role, status, format (pdf/excel/csv), preview, fields
     """
     try:
-        preview = is_preview_request()
-        role = request.args.get('role', 'all')
-        status = request.args.get('status', 'all')
-        export_format = request.args.get('format', 'excel')
-        selected_fields = request.args.get('fields', '')
-        
-        # Define all available fields
-        all_fields = ['user_id', 'name', 'email', 'phone', 'role', 'status', 'created_at', 
-                      'last_login', 'login_count', 'total_orders', 'total_spent', 'last_order_date']
-        fields_to_select = get_selected_fields(selected_fields, all_fields)
-        
-        with db.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = '''
-                SELECT 
-                    u.id as user_id,
-                    u.name,
-                    u.phone,
-                    u.email,
-                    u.role,
-                    u.status,
-                    u.created_at,
-                    u.last_login,
-                    u.login_count,
-                    COALESCE(order_stats.total_orders, 0) as total_orders,
-                    COALESCE(order_stats.total_spent, 0) as total_spent,
-                    order_stats.last_order_date
-                FROM users u
-                LEFT JOIN (
-                    SELECT 
-                        user_id,
-                        COUNT(*) as total_orders,
-                        SUM(total) as total_spent,
-                        MAX(created_at) as last_order_date
-                    FROM orders
-                    WHERE status != 'cancelled'
-                    GROUP BY user_id
-                ) order_stats ON u.id = order_stats.user_id
-                WHERE 1=1
-            '''
-            
-            params = []
-            
-            if role != 'all':
-                query += ' AND u.role = %s'
-                params.append(role)
-            
-            if status != 'all':
-                query += ' AND u.status = %s'
-                params.append(status)
-            
-            query += ' ORDER BY u.created_at DESC'
-            
-            cursor.execute(query, params)
-            users_raw = cursor.fetchall()
-            
-            # Filter by selected fields
-            filtered_data = []
-            for user in users_raw:
-                filtered_user = {}
-                for field in fields_to_select:
-                    value = user.get(field)
-                    # Format datetime fields
-                    if field in ['created_at', 'last_login', 'last_order_date'] and value:
-                        filtered_user[field] = value.strftime('%Y-%m-%d %H:%M:%S') if hasattr(value, 'strftime') else str(value)
-                    else:
-                        filtered_user[field] = value
-                filtered_data.append(filtered_user)
-            
-            if preview:
-                return jsonify({
-                    'success': True,
-                    'data': filtered_data,  # Return all data for preview
-                    'total': len(filtered_data)
-                })
-            
-            if export_format == 'excel':
-                return generate_users_excel(users_raw, fields_to_select)
-            else:
-                return generate_users_pdf(users_raw, fields_to_select)
-                
+        return report_response(users_report(request.args))
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def generate_users_excel(users, selected_fields=None):
-    """Generate Excel for users"""
-    if selected_fields is None:
-        selected_fields = ['user_id', 'name', 'email', 'phone', 'role', 'status', 'created_at', 
-                          'last_login', 'login_count', 'total_orders', 'total_spent', 'last_order_date']
-    
-    wb, ws, header_fill, header_font, header_alignment = create_excel_workbook('Users Report')
-    
-    headers = ['ID', 'Name', 'Phone', 'Email', 'Role', 'Status', 'Registration Date', 
-               'Last Login', 'Login Count', 'Total Orders', 'Total Spent', 'Last Order Date']
-    
-    apply_excel_styling(ws, headers, header_fill, header_font, header_alignment)
-    
-    for row_num, user in enumerate(users, 2):
-        ws.cell(row=row_num, column=1, value=user['id'])
-        ws.cell(row=row_num, column=2, value=user['name'])
-        ws.cell(row=row_num, column=3, value=user['phone'])
-        ws.cell(row=row_num, column=4, value=user['email'] or 'N/A')
-        ws.cell(row=row_num, column=5, value=user['role'])
-        ws.cell(row=row_num, column=6, value=user['status'])
-        ws.cell(row=row_num, column=7, value=user['created_at'].strftime('%Y-%m-%d') if user['created_at'] else 'N/A')
-        ws.cell(row=row_num, column=8, value=user['last_login'].strftime('%Y-%m-%d %H:%M') if user['last_login'] else 'Never')
-        ws.cell(row=row_num, column=9, value=user['login_count'])
-        ws.cell(row=row_num, column=10, value=user['total_orders'])
-        ws.cell(row=row_num, column=11, value=f"₹{float(user['total_spent'])}")
-        ws.cell(row=row_num, column=12, value=user['last_order_date'].strftime('%Y-%m-%d') if user['last_order_date'] else 'N/A')
-    
-    # Summary
-    summary_ws = wb.create_sheet('Summary')
-    summary_ws['A1'] = 'Total Users'
-    summary_ws['B1'] = len(users)
-    summary_ws['A2'] = 'Active Users'
-    summary_ws['B2'] = sum(1 for u in users if u['status'] == 'active')
-    summary_ws['A3'] = 'Total Revenue'
-    total_revenue = sum(float(u['total_spent']) for u in users)
-    summary_ws['B3'] = f"₹{total_revenue:,.2f}"
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f"users_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
-
 def generate_users_pdf(users):
-    """Generate PDF for users"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#000000'), spaceAfter=30)
-    
-    title = Paragraph("Users Report", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.2*inch))
-    
+    """PDF content for users (summary over every row, first 40 users listed)"""
+    elements = ReportExporter.pdf_title("Users Report")
+
     # Summary
-    total_revenue = sum(float(u['total_spent']) for u in users)
-    active_users = sum(1 for u in users if u['status'] == 'active')
-    
-    summary_data = [
-        ['Total Users:', str(len(users))],
-        ['Active Users:', str(active_users)],
-        ['Total Revenue:', format_currency(total_revenue)],
-    ]
-    summary_table = Table(summary_data, colWidths=[2*inch, 2*inch])
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#FFE01B')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-    ]))
-    elements.append(summary_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
+    elements += ReportExporter.pdf_summary_table([
+        ('Total Users:', users.count),
+        ('Active Users:', users.totals['active']),
+        ('Total Revenue:', format_currency(users.totals['revenue'])),
+    ])
+
     # Users table
-    table_data = [['Name', 'Phone', 'Role', 'Orders', 'Spent']]
-    for user in users[:40]:
-        table_data.append([
-            user['name'][:25],
+    rows = [
+        [
+            (user['name'] or '')[:25],
             user['phone'],
             user['role'],
             str(user['total_orders']),
             format_currency(user['total_spent'])
-        ])
-    
-    users_table = Table(table_data, colWidths=[2.2*inch, 1.5*inch, 1*inch, 0.8*inch, 1.5*inch])
-    users_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FFE01B')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-    elements.append(users_table)
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    filename = f"users_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    
-    return send_file(
-        buffer,
-        mimetype='application/pdf',
-        as_attachment=True,
-        download_name=filename
+        ]
+        for user in users.head
+    ]
+    elements += ReportExporter.pdf_tables(
+        ['Name', 'Phone', 'Role', 'Orders', 'Spent'], rows,
+        [2.2*inch, 1.5*inch, 1*inch, 0.8*inch, 1.5*inch]
     )
 
+    return elements
+
 # ============= INVENTORY REPORT =============
 
+INVENTORY_FIELD_LABELS = {
+    'product_id': 'ID',
+    'name': 'Product Name',
+    'category': 'Category',
+    'price': 'Price',
+    'stock': 'Stock',
+    'stock_value': 'Stock Value',
+    'status': 'Status'
+}
+
+def inventory_report(args):
+    """Inventory report for: fields"""
+    # Define all available fields
+    fields_to_select = get_selected_fields(args.get('fields', ''), list(INVENTORY_FIELD_LABELS))
+
+    query = '''
+        SELECT
+            p.id as product_id,
+            p.name,
+            c.name as category,
+            p.price,
+            p.stock,
+            (p.price * p.stock) as stock_value,
+            CASE
+                WHEN p.stock = 0 THEN 'Out of Stock'
+                WHEN p.stock <= 10 THEN 'Low Stock'
+                WHEN p.stock > 100 THEN 'Overstocked'
+                ELSE 'In Stock'
+            END as status
+        FROM products p
+        LEFT JOIN categories c ON p.category_id = c.id
+        ORDER BY p.stock ASC
+    '''
+
+    def format_row(product):
+        filtered_product = {}
+        for field in fields_to_select:
+            value = product.get(field)
+            # Format decimal/numeric fields
+            if field in ['price', 'stock_value'] and value:
+                filtered_product[field] = float(value)
+            else:
+                filtered_product[field] = value
+        return filtered_product
+
+    return ReportDefinition(
+        'inventory', 'Inventory Report', query, [], fields_to_select, INVENTORY_FIELD_LABELS, format_row,
+        money_fields=('price', 'stock_value'),
+        metrics={
+            'stock_value': lambda p: float(p['stock_value']),
+            'out_of_stock': lambda p: p['stock'] == 0,
+            'low_stock': lambda p: 0 < p['stock'] <= 10,
+            'in_stock': lambda p: 10 < p['stock'] <= 100,
+            'overstocked': lambda p: p['stock'] > 100,
+        },
+        # Rows arrive ordered by stock, so low-stock products come first
+        head=20,
+        head_filter=lambda p: 0 <= p['stock'] <= 10,
+        summary=lambda products: [
+            ('Total Products', products.count),
+            ('Total Stock Value', format_currency(products.totals['stock_value'])),
+            ('Out of Stock', products.totals['out_of_stock']),
+            ('Low Stock', products.totals['low_stock']),
+            ('In Stock', products.totals['in_stock']),
+            ('Overstocked', products.totals['overstocked']),
+        ],
+        pdf=generate_inventory_pdf
+    )
+
 @report_bp.route('/inventory', methods=['GET'])
 @admin_required
 def export_inventory(admin_user):
     """Export inventory report with preview support"""
     try:
-        preview = is_preview_request()
-        export_format = request.args.get('format', 'excel')
-        selected_fields = request.args.get('fields', '')
-        
-        # Define all available fields
-        all_fields = ['product_id', 'name', 'category', 'price', 'stock', 'stock_value', 'status']
-        fields_to_select = get_selected_fields(selected_fields, all_fields)
-        
-        with db.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = '''
-                SELECT 
-                    p.id as product_id,
-                    p.name,
-                    c.name as category,
-                    p.price,
-                    p.stock,
-                    (p.price * p.stock) as stock_value,
-                    CASE 
-                        WHEN p.stock = 0 THEN 'Out of Stock'
-                        WHEN p.stock <= 10 THEN 'Low Stock'
-                        WHEN p.stock > 100 THEN 'Overstocked'
-                        ELSE 'In Stock'
-                    END as status
-                FROM products p
-                LEFT JOIN categories c ON p.category_id = c.id
-                ORDER BY p.stock ASC
-            '''
-            
-            cursor.execute(query)
-            products_raw = cursor.fetchall()
-            
-            # Filter by selected fields
-            filtered_data = []
-            for product in products_raw:
-                filtered_product = {}
-                for field in fields_to_select:
-                    value = product.get(field)
-                    # Format decimal/numeric fields
-                    if field in ['price', 'stock_value'] and value:
-                        filtered_product[field] = float(value)
-                    else:
-                        filtered_product[field] = value
-                filtered_data.append(filtered_product)
-            
-            if preview:
-                return jsonify({
-                    'success': True,
-                    'data': filtered_data,  # Return all data for preview
-                    'total': len(filtered_data)
-                })
-            
-            if export_format == 'excel':
-                return generate_inventory_excel(products_raw, fields_to_select)
-            else:
-                return generate_inventory_pdf(products_raw, fields_to_select)
-                
+        return report_response(inventory_report(request.args))
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def generate_inventory_excel(products, selected_fields=None):
-    """Generate Excel for inventory"""
-    wb, ws, header_fill, header_font, header_alignment = create_excel_workbook('Inventory Report')
-    
-    headers = ['ID', 'Product Name', 'Category', 'Price', 'Stock', 'Stock Value', 'Status']
-    apply_excel_styling(ws, headers, header_fill, header_font, header_alignment)
-    
-    for row_num, product in enumerate(products, 2):
-        ws.cell(row=row_num, column=1, value=product['id'])
-        ws.cell(row=row_num, column=2, value=product['name'])
-        ws.cell(row=row_num, column=3, value=product['category'] or 'N/A')
-        ws.cell(row=row_num, column=4, value=f"₹{float(product['price'])}")
-        ws.cell(row=row_num, column=5, value=product['stock'])
-        ws.cell(row=row_num, column=6, value=f"₹{float(product['stock_value'])}")
-        ws.cell(row=row_num, column=7, value=product['stock_status'])
-    
-    # Summary
-    summary_ws = wb.create_sheet('Summary')
-    summary_ws['A1'] = 'Total Products'
-    summary_ws['B1'] = len(products)
-    summary_ws['A2'] = 'Total Stock Value'
-    total_value = sum(float(p['stock_value']) for p in products)
-    summary_ws['B2'] = f"₹{total_value:,.2f}"
-    summary_ws['A3'] = 'Out of Stock'
-    summary_ws['B3'] = sum(1 for p in products if p['stock'] == 0)
-    summary_ws['A4'] = 'Low Stock'
-    summary_ws['B4'] = sum(1 for p in products if 0 < p['stock'] <= 10)
-    summary_ws['A5'] = 'In Stock'
-    summary_ws['B5'] = sum(1 for p in products if 10 < p['stock'] <= 100)
-    summary_ws['A6'] = 'Overstocked'
-    summary_ws['B6'] = sum(1 for p in products if p['stock'] > 100)
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f"inventory_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
-
 def generate_inventory_pdf(products):
-    """Generate PDF for inventory"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#000000'), spaceAfter=30)
-    
-    title = Paragraph("Inventory Report", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.2*inch))
-    
+    """PDF content for inventory (summary over every row, low-stock alert list)"""
+    elements = ReportExporter.pdf_title("Inventory Report")
+
     # Summary
-    total_value = sum(float(p['stock_value']) for p in products)
-    out_of_stock = sum(1 for p in products if p['stock'] == 0)
-    low_stock = sum(1 for p in products if 0 < p['stock'] <= 10)
-    
-    summary_data = [
-        ['Total Products:', str(len(products))],
-        ['Total Stock Value:', format_currency(total_value)],
-        ['Out of Stock:', str(out_of_stock)],
-        ['Low Stock:', str(low_stock)],
-    ]
-    summary_table = Table(summary_data, colWidths=[2*inch, 2*inch])
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#FFE01B')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-    ]))
-    elements.append(summary_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
+    elements += ReportExporter.pdf_summary_table([
+        ('Total Products:', products.count),
+        ('Total Stock Value:', format_currency(products.totals['stock_value'])),
+        ('Out of Stock:', products.totals['out_of_stock']),
+        ('Low Stock:', products.totals['low_stock']),
+    ])
+
     # Low stock products
-    low_stock_products = [p for p in products if 0 <= p['stock'] <= 10]
-    if low_stock_products:
-        heading = Paragraph("<b>Low Stock Alert (≤10 items)</b>", styles['Heading2'])
-        elements.append(heading)
-        elements.append(Spacer(1, 0.1*inch))
-        
-        table_data = [['Product', 'Category', 'Stock', 'Value']]
-        for product in low_stock_products[:20]:
-            table_data.append([
+    if products.head:
+        elements.append(ReportExporter.pdf_heading("Low Stock Alert (≤10 items)"))
+
+        rows = [
+            [
                 product['name'][:35],
                 (product['category'] or 'N/A')[:20],
                 str(product['stock']),
                 format_currency(product['stock_value'])
-            ])
-        
-        inventory_table = Table(table_data, colWidths=[2.5*inch, 1.8*inch, 0.8*inch, 1.2*inch])
-        inventory_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FFE01B')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        elements.append(inventory_table)
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    filename = f"inventory_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    
-    return send_file(
-        buffer,
-        mimetype='application/pdf',
-        as_attachment=True,
-        download_name=filename
-    )
+            ]
+            for product in products.head
+        ]
+        elements += ReportExporter.pdf_tables(
+            ['Product', 'Category', 'Stock', 'Value'], rows,
+            [2.5*inch, 1.8*inch, 0.8*inch, 1.2*inch]
+        )
+
+    return elements
 
 # ============= CATEGORIES REPORT =============
 
+CATEGORY_FIELD_LABELS = {
+    'category_id': 'ID',
+    'name': 'Category Name',
+    'products_count': 'Product Count',
+    'status': 'Status',
+    'total_revenue': 'Total Revenue',
+    'total_orders': 'Total Orders'
+}
+
+def categories_report(args):
+    """Categories report for: fields"""
+    # Define all available fields
+    fields_to_select = get_selected_fields(args.get('fields', ''), list(CATEGORY_FIELD_LABELS))
+
+    query = '''
+        SELECT
+            c.id as category_id,
+            c.name,
+            COALESCE(prod_count.products_count, 0) as products_count,
+            c.status,
+            COALESCE(cat_revenue.total_revenue, 0) as total_revenue,
+            COALESCE(cat_revenue.total_orders, 0) as total_orders
+        FROM categories c
+        LEFT JOIN (
+            SELECT
+                category_id,
+                COUNT(*) as products_count
+            FROM products
+            GROUP BY category_id
+        ) prod_count ON c.id = prod_count.category_id
+        LEFT JOIN (
+            SELECT
+                p.category_id,
+                SUM(oi.total_price) as total_revenue,
+                COUNT(DISTINCT oi.order_id) as total_orders
+            FROM order_items oi
+            JOIN products p ON oi.product_id = p.id
+            JOIN orders o ON oi.order_id = o.id
+            WHERE o.status != 'cancelled'
+            GROUP BY p.category_id
+        ) cat_revenue ON c.id = cat_revenue.category_id
+        ORDER BY c.name
+    '''
+
+    def format_row(category):
+        filtered_category = {}
+        for field in fields_to_select:
+            value = category.get(field)
+            # Handle numeric fields - convert None to 0
+            if field in ['products_count', 'total_orders']:
+                filtered_category[field] = int(value) if value is not None else 0
+            elif field in ['total_revenue']:
+                filtered_category[field] = float(value) if value is not None else 0.0
+            else:
+                filtered_category[field] = value
+        return filtered_category
+
+    return ReportDefinition(
+        'categories', 'Categories Report', query, [], fields_to_select, CATEGORY_FIELD_LABELS, format_row,
+        money_fields=('total_revenue',),
+        head=Config.REPORT_PDF_MAX_ROWS,
+        pdf=generate_categories_pdf
+    )
+
 @report_bp.route('/categories', methods=['GET'])
 @admin_required
 def export_categories(admin_user):
     """Export categories report with preview support"""
     try:
-        preview = is_preview_request()
-        export_format = request.args.get('format', 'excel')
-        selected_fields = request.args.get('fields', '')
-        
-        # Define all available fields
-        all_fields = ['category_id', 'name', 'products_count', 'status', 'total_revenue', 'total_orders']
-        fields_to_select = get_selected_fields(selected_fields, all_fields)
-        
-        with db.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = '''
-                SELECT 
-                    c.id as category_id,
-                    c.name,
-                    COALESCE(prod_count.products_count, 0) as products_count,
-                    c.status,
-                    COALESCE(cat_revenue.total_revenue, 0) as total_revenue,
-                    COALESCE(cat_revenue.total_orders, 0) as total_orders
-                FROM categories c
-                LEFT JOIN (
-                    SELECT 
-                        category_id,
-                        COUNT(*) as products_count
-                    FROM products
-                    GROUP BY category_id
-                ) prod_count ON c.id = prod_count.category_id
-                LEFT JOIN (
-                    SELECT 
-                        p.category_id,
-                        SUM(oi.total_price) as total_revenue,
-                        COUNT(DISTINCT oi.order_id) as total_orders
-                    FROM order_items oi
-                    JOIN products p ON oi.product_id = p.id
-                    JOIN orders o ON oi.order_id = o.id
-                    WHERE o.status != 'cancelled'
-                    GROUP BY p.category_id
-                ) cat_revenue ON c.id = cat_revenue.category_id
-                ORDER BY c.name
-            '''
-            
-            cursor.execute(query)
-            categories_raw = cursor.fetchall()
-            
-            # Filter by selected fields
-            filtered_data = []
-            for category in categories_raw:
-                filtered_category = {}
-                for field in fields_to_select:
-                    value = category.get(field)
-                    # Handle numeric fields - convert None to 0
-                    if field in ['products_count', 'total_orders']:
-                        filtered_category[field] = int(value) if value is not None else 0
-                    elif field in ['total_revenue']:
-                        filtered_category[field] = float(value) if value is not None else 0.0
-                    else:
-                        filtered_category[field] = value
-                filtered_data.append(filtered_category)
-            
-            if preview:
-                return jsonify({
-                    'success': True,
-                    'data': filtered_data,  # Return all data for preview
-                    'total': len(filtered_data)
-                })
-            
-            if export_format == 'excel':
-                return generate_categories_excel(categories_raw, fields_to_select)
-            else:
-                return generate_categories_pdf(categories_raw, fields_to_select)
-                
+        return report_response(categories_report(request.args))
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def generate_categories_excel(categories, selected_fields=None):
-    """Generate Excel for categories"""
-    wb, ws, header_fill, header_font, header_alignment = create_excel_workbook('Categories Report')
-    
-    headers = ['ID', 'Category Name', 'Product Count', 'Status', 'Total Revenue', 'Total Orders']
-    apply_excel_styling(ws, headers, header_fill, header_font, header_alignment)
-    
-    for row_num, category in enumerate(categories, 2):
-        ws.cell(row=row_num, column=1, value=category['id'])
-        ws.cell(row=row_num, column=2, value=category['name'])
-        ws.cell(row=row_num, column=3, value=category['products_count'])
-        ws.cell(row=row_num, column=4, value=category['status'])
-        ws.cell(row=row_num, column=5, value=f"₹{float(category['total_revenue'])}")
-        ws.cell(row=row_num, column=6, value=category['total_orders'])
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f"categories_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
-
 def generate_categories_pdf(categories):
-    """Generate PDF for categories"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#000000'), spaceAfter=30)
-    
-    title = Paragraph("Categories Report", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.2*inch))
-    
+    """PDF content for categories"""
+    elements = ReportExporter.pdf_title("Categories Report")
+
     # Categories table
-    table_data = [['Category', 'Products', 'Revenue', 'Orders']]
-    for category in categories:
-        table_data.append([
+    rows = [
+        [
             category['name'],
             str(category['products_count']),
             format_currency(category['total_revenue']),
             str(category['total_orders'])
-        ])
-    
-    categories_table = Table(table_data, colWidths=[2.5*inch, 1*inch, 1.5*inch, 1*inch])
-    categories_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FFE01B')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-    elements.append(categories_table)
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    filename = f"categories_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    
-    return send_file(
-        buffer,
-        mimetype='application/pdf',
-        as_attachment=True,
-        download_name=filename
+        ]
+        for category in categories.head
+    ]
+    elements += ReportExporter.pdf_tables(
+        ['Category', 'Products', 'Revenue', 'Orders'], rows,
+        [2.5*inch, 1*inch, 1.5*inch, 1*inch],
+        header_font_size=10, body_font_size=9
     )
 
+    if categories.count > len(categories.head):
+        elements += ReportExporter.pdf_note(
+            f"Note: Showing first {len(categories.head)} of {categories.count} categories. Download Excel for complete data."
+        )
+
+    return elements
+
 # ============= OFFERS REPORT =============
 
+OFFER_FIELD_LABELS = {
+    'offer_id': 'ID',
+    'title': 'Title',
+    'code': 'Code',
+    'discount_type': 'Type',
+    'discount_value': 'Discount Value',
+    'min_order_value': 'Min Order',
+    'start_date': 'Start Date',
+    'end_date': 'End Date',
+    'usage_limit': 'Usage Limit',
+    'used_count': 'Used Count',
+    'status': 'Status',
+    'offer_type': 'Offer Type'
+}
+
+def format_offer_discount(offer):
+    """Fixed discounts in rupees, everything else as a percentage"""
+    if offer['discount_type'] == 'fixed':
+        return f"₹{float(offer['discount_value'])}"
+    return f"{float(offer['discount_value'])}%"
+
+def offers_report(args):
+    """Offers report for: fields"""
+    # Define all available fields
+    fields_to_select = get_selected_fields(args.get('fields', ''), list(OFFER_FIELD_LABELS))
+
+    query = '''
+        SELECT
+            id as offer_id,
+            title,
+            code,
+            discount_type,
+            discount_value,
+            min_order_value,
+            start_date,
+            end_date,
+            usage_limit,
+            used_count,
+            status,
+            applicable_categories,
+            offer_type
+        FROM offers
+        ORDER BY start_date DESC
+    '''
+
+    def format_row(offer):
+        filtered_offer = {}
+        for field in fields_to_select:
+            value = offer.get(field)
+            # Format datetime fields
+            if field in ['start_date', 'end_date'] and value:
+                filtered_offer[field] = value.strftime('%Y-%m-%d') if hasattr(value, 'strftime') else str(value)
+            # Format numeric fields
+            elif field in ['discount_value', 'min_order_value'] and value:
+                filtered_offer[field] = float(value)
+            else:
+                filtered_offer[field] = value
+        return filtered_offer
+
+    def format_file_row(offer):
+        filtered_offer = format_row(offer)
+        if 'discount_value' in filtered_offer and offer['discount_value'] is not None:
+            filtered_offer['discount_value'] = format_offer_discount(offer)
+        return filtered_offer
+
+    return ReportDefinition(
+        'offers', 'Offers Report', query, [], fields_to_select, OFFER_FIELD_LABELS, format_row,
+        file_row=format_file_row,
+        money_fields=('min_order_value',),
+        head=Config.REPORT_PDF_MAX_ROWS,
+        pdf=generate_offers_pdf
+    )
+
 @report_bp.route('/offers', methods=['GET'])
-@admin_required  
+@admin_required
 def export_offers(admin_user):
     """Export offers report with preview support"""
     try:
-        preview = is_preview_request()
-        export_format = request.args.get('format', 'excel')
-        selected_fields = request.args.get('fields', '')
-        
-        # Define all available fields
-        all_fields = ['offer_id', 'title', 'code', 'discount_type', 'discount_value', 'min_order_value',
-                      'start_date', 'end_date', 'usage_limit', 'used_count', 'status', 'offer_type']
-        fields_to_select = get_selected_fields(selected_fields, all_fields)
-        
-        with db.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = '''
-                SELECT 
-                    id as offer_id,
-                    title,
-                    code,
-                    discount_type,
-                    discount_value,
-                    min_order_value,
-                    start_date,
-                    end_date,
-                    usage_limit,
-                    used_count,
-                    status,
-                    applicable_categories,
-                    offer_type
-                FROM offers
-                ORDER BY start_date DESC
-            '''
-            
-            cursor.execute(query)
-            offers_raw = cursor.fetchall()
-            
-            # Filter by selected fields
-            filtered_data = []
-            for offer in offers_raw:
-                filtered_offer = {}
-                for field in fields_to_select:
-                    value = offer.get(field)
-                    # Format datetime fields
-                    if field in ['start_date', 'end_date'] and value:
-                        filtered_offer[field] = value.strftime('%Y-%m-%d') if hasattr(value, 'strftime') else str(value)
-                    # Format numeric fields
-                    elif field in ['discount_value', 'min_order_value'] and value:
-                        filtered_offer[field] = float(value)
-                    else:
-                        filtered_offer[field] = value
-                filtered_data.append(filtered_offer)
-            
-            if preview:
-                return jsonify({
-                    'success': True,
-                    'data': filtered_data,  # Return all data for preview
-                    'total': len(filtered_data)
-                })
-            
-            if export_format == 'excel':
-                return generate_offers_excel(offers_raw, fields_to_select)
-            else:
-                return generate_offers_pdf(offers_raw, fields_to_select)
-                
+        return report_response(offers_report(request.args))
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def generate_offers_excel(offers, selected_fields=None):
-    """Generate Excel for offers"""
-    wb, ws, header_fill, header_font, header_alignment = create_excel_workbook('Offers Report')
-    
-    headers = ['ID', 'Title', 'Code', 'Type', 'Discount Value', 'Min Order', 
-               'Start Date', 'End Date', 'Usage Limit', 'Used Count', 'Status', 'Offer Type']
-    apply_excel_styling(ws, headers, header_fill, header_font, header_alignment)
-    
-    for row_num, offer in enumerate(offers, 2):
-        ws.cell(row=row_num, column=1, value=offer['id'])
-        ws.cell(row=row_num, column=2, value=offer['title'])
-        ws.cell(row=row_num, column=3, value=offer['code'])
-        ws.cell(row=row_num, column=4, value=offer['discount_type'])
-        ws.cell(row=row_num, column=5, value=f"₹{float(offer['discount_value'])}" if offer['discount_type'] == 'fixed' else f"{float(offer['discount_value'])}%")
-        ws.cell(row=row_num, column=6, value=f"₹{float(offer['min_order_value'])}")
-        ws.cell(row=row_num, column=7, value=offer['start_date'].strftime('%Y-%m-%d') if offer['start_date'] else 'N/A')
-        ws.cell(row=row_num, column=8, value=offer['end_date'].strftime('%Y-%m-%d') if offer['end_date'] else 'N/A')
-        ws.cell(row=row_num, column=9, value=offer['usage_limit'])
-        ws.cell(row=row_num, column=10, value=offer['used_count'])
-        ws.cell(row=row_num, column=11, value=offer['status'])
-        ws.cell(row=row_num, column=12, value=offer['offer_type'])
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f"offers_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
-
 def generate_offers_pdf(offers):
-    """Generate PDF for offers"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#000000'), spaceAfter=30)
-    
-    title = Paragraph("Offers Report", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.2*inch))
-    
+    """PDF content for offers"""
+    elements = ReportExporter.pdf_title("Offers Report")
+
     # Offers table
-    table_data = [['Title', 'Code', 'Discount', 'Used', 'Status']]
-    for offer in offers:
-        discount_val = f"₹{float(offer['discount_value'])}" if offer['discount_type'] == 'fixed' else f"{float(offer['discount_value'])}%"
-        table_data.append([
-            offer['title'][:30],
+    rows = [
+        [
+            (offer['title'] or '')[:30],
             offer['code'],
-            discount_val,
+            format_offer_discount(offer),
             f"{offer['used_count']}/{offer['usage_limit']}",
             offer['status']
-        ])
-    
-    offers_table = Table(table_data, colWidths=[2.2*inch, 1.2*inch, 1*inch, 1*inch, 1*inch])
-    offers_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FFE01B')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-    elements.append(offers_table)
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    filename = f"offers_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    
+        ]
+        for offer in offers.head
+    ]
+    elements += ReportExporter.pdf_tables(
+        ['Title', 'Code', 'Discount', 'Used', 'Status'], rows,
+        [2.2*inch, 1.2*inch, 1*inch, 1*inch, 1*inch]
+    )
+
+    if offers.count > len(offers.head):
+        elements += ReportExporter.pdf_note(
+            f"Note: Showing first {len(offers.head)} of {offers.count} offers. Download Excel for complete data."
+        )
+
+    return elements
+
+# ============= BACKGROUND REPORT JOBS =============
+
+REPORT_BUILDERS = {
+    'products': products_report,
+    'orders': orders_report,
+    'users': users_report,
+    'inventory': inventory_report,
+    'categories': categories_report,
+    'offers': offers_report,
+}
+
+@report_bp.route('/<report_name>/jobs', methods=['POST'])
+@admin_required
+def enqueue_report_job(admin_user, report_name):
+    """
+    Queue a report export in the background
+    Body (JSON): the report's usual filters plus format (pdf/excel/csv) and fields
+    Returns the job; an identical recent export is returned as already done
+    """
+    try:
+        builder = REPORT_BUILDERS.get(report_name)
+        if not builder:
+            return jsonify({'success': False, 'error': f'Unknown report: {report_name}'}), 404
+
+        args = request.get_json(silent=True) or {}
+        if isinstance(args.get('fields'), list):
+            args['fields'] = ','.join(args['fields'])
+        report = builder(args)
+        job = ReportJobService.enqueue(report, args.get('format', 'excel'))
+
+        status_code = 200 if job['status'] == 'done' else 202
+        return jsonify({'success': True, 'job': job}), status_code
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@report_bp.route('/jobs/<job_id>', methods=['GET'])
+@admin_required
+def get_report_job(admin_user, job_id):
+    """Poll a report job's status and progress"""
+    job = ReportJobService.get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Report job not found or expired'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@report_bp.route('/jobs/<job_id>/download', methods=['GET'])
+@admin_required
+def download_report_job(admin_user, job_id):
+    """Download the artifact of a finished report job"""
+    job = ReportJobService.get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Report job not found or expired'}), 404
+    if job['status'] != 'done':
+        return jsonify({'success': False, 'error': f"Report is not ready (status: {job['status']})"}), 409
+
     return send_file(
-        buffer,
-        mimetype='application/pdf',
+        ReportJobService.artifact_path(job),
+        mimetype=job['mimetype'],
         as_attachment=True,
-        download_name=filename
+        download_name=job['filename']
     )
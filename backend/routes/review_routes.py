@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from backend.utils.database import db
 from backend.utils.auth_middleware import token_required, admin_required
 from backend.utils.input_validator import InputValidator
+from backend.services.review_service import ReviewService, DEFAULT_PAGE_SIZE, MAX_BULK_RATINGS
 import logging
 
 review_bp = Blueprint('reviews', __name__)
@@ -9,39 +10,12 @@ logger = logging.getLogger(__name__)
 
 @review_bp.route('/product/<int:product_id>', methods=['GET'])
 def get_product_reviews(product_id):
-    """Get all approved reviews for a product"""
+    """Get approved reviews for a product, newest first (paginated)"""
     try:
-        query = """
-            SELECT 
-                r.id, r.product_id, r.user_id, r.user_name, r.rating, 
-                r.comment, r.verified_purchase, r.helpful_count, 
-                r.status, r.created_at,
-                p.name as product_name
-            FROM product_reviews r
-            LEFT JOIN products p ON r.product_id = p.id
-            WHERE r.product_id = %s AND r.status = 'approved'
-            ORDER BY r.created_at DESC
-        """
-        reviews = db.execute_query(query, (product_id,), fetch=True)
+        limit = request.args.get('limit', default=DEFAULT_PAGE_SIZE, type=int)
+        offset = request.args.get('offset', default=0, type=int)
         
-        # Calculate average rating
-        avg_query = """
-            SELECT 
-                AVG(rating)::NUMERIC(3,1) as average_rating,
-                COUNT(*) as total_reviews
-            FROM product_reviews
-            WHERE product_id = %s AND status = 'approved'
-        """
-        stats = db.execute_query_one(avg_query, (product_id,))
-        
-        return jsonify({
-            'success': True,
-            'reviews': reviews,
-            'stats': {
-                'average_rating': float(stats['average_rating']) if stats['average_rating'] else 0,
-                'total_reviews': stats['total_reviews']
-            }
-        }), 200
+        return jsonify(ReviewService.page_payload(product_id, limit, offset)), 200
         
     except Exception as e:
         logger.error(f"Error fetching reviews: {str(e)}")
@@ -106,10 +80,14 @@ def add_review(current_user, product_id):
                       verified_purchase, helpful_count, status, created_at
         """
         
-        new_review = db.execute_query_one(
-            insert_query,
-            (product_id, current_user['id'], current_user['name'], rating, comment, verified_purchase)
-        )
+        with db.get_cursor() as cursor:
+            cursor.execute(
+                insert_query,
+                (product_id, current_user['id'], current_user['name'], rating, comment, verified_purchase)
+            )
+            new_review = cursor.fetchone()
+            ReviewService.apply_change(cursor, None, new_review)
+        ReviewService.invalidate(product_id)
         
         logger.info(f"Review added by user {current_user['id']} for product {product_id}")
         
@@ -162,10 +140,15 @@ def update_review(current_user, review_id):
                       verified_purchase, helpful_count, status, created_at, updated_at
         """
         
-        updated_review = db.execute_query_one(
-            update_query,
-            (rating, comment, review_id, current_user['id'])
-        )
+        with db.get_cursor() as cursor:
+            # Re-read under lock: the aggregate delta must start from the committed row
+            locked_review = ReviewService.lock_review(cursor, review_id, current_user['id'])
+            if not locked_review:
+                return jsonify({'success': False, 'message': 'Review not found or unauthorized'}), 404
+            cursor.execute(update_query, (rating, comment, review_id, current_user['id']))
+            updated_review = cursor.fetchone()
+            ReviewService.apply_change(cursor, locked_review, updated_review)
+        ReviewService.invalidate(review['product_id'])
         
         return jsonify({
             'success': True,
@@ -193,7 +176,10 @@ def delete_review(current_user, review_id):
             return jsonify({'success': False, 'message': 'Review not found or unauthorized'}), 404
         
         # Delete review
-        db.execute_query("DELETE FROM product_reviews WHERE id = %s", (review_id,))
+        with db.get_cursor() as cursor:
+            cursor.execute("DELETE FROM product_reviews WHERE id = %s RETURNING *", (review_id,))
+            ReviewService.apply_change(cursor, cursor.fetchone(), None)
+        ReviewService.invalidate(review['product_id'])
         
         return jsonify({
             'success': True,
@@ -287,7 +273,10 @@ def admin_delete_review(current_user, review_id):
             return jsonify({'success': False, 'message': 'Review not found'}), 404
         
         # Delete review
-        db.execute_query("DELETE FROM product_reviews WHERE id = %s", (review_id,))
+        with db.get_cursor() as cursor:
+            cursor.execute("DELETE FROM product_reviews WHERE id = %s RETURNING *", (review_id,))
+            ReviewService.apply_change(cursor, cursor.fetchone(), None)
+        ReviewService.invalidate(review['product_id'])
         
         logger.info(f"Admin {current_user['id']} deleted review {review_id}")
         
@@ -329,7 +318,14 @@ def update_review_status(current_user, review_id):
             RETURNING id, status, updated_at
         """
         
-        updated_review = db.execute_query_one(update_query, (status, review_id))
+        with db.get_cursor() as cursor:
+            locked_review = ReviewService.lock_review(cursor, review_id)
+            if not locked_review:
+                return jsonify({'success': False, 'message': 'Review not found'}), 404
+            cursor.execute(update_query, (status, review_id))
+            updated_review = cursor.fetchone()
+            ReviewService.apply_change(cursor, locked_review, {**locked_review, 'status': status})
+        ReviewService.invalidate(review['product_id'])
         
         logger.info(f"Admin {current_user['id']} updated review {review_id} status to {status}")
         
@@ -344,42 +340,48 @@ def update_review_status(current_user, review_id):
         return jsonify({'success': False, 'message': 'Failed to update review status'}), 500
 
 
-@review_bp.route('/product/<int:product_id>/stats', methods=['GET'])
-def get_product_review_stats(product_id):
-    """Get detailed review statistics for a product"""
+@review_bp.route('/ratings', methods=['GET'])
+def get_product_ratings():
+    """Rating summaries for a product grid: ?product_ids=1,2,3 (one call for every card)"""
     try:
-        stats_query = """
-            SELECT 
-                COUNT(*) as total_reviews,
-                AVG(rating)::NUMERIC(3,1) as average_rating,
-                COUNT(CASE WHEN rating = 5 THEN 1 END) as five_star,
-                COUNT(CASE WHEN rating = 4 THEN 1 END) as four_star,
-                COUNT(CASE WHEN rating = 3 THEN 1 END) as three_star,
-                COUNT(CASE WHEN rating = 2 THEN 1 END) as two_star,
-                COUNT(CASE WHEN rating = 1 THEN 1 END) as one_star,
-                COUNT(CASE WHEN verified_purchase = true THEN 1 END) as verified_purchases
-            FROM product_reviews
-            WHERE product_id = %s AND status = 'approved'
-        """
+        raw_ids = [value for value in request.args.get('product_ids', '').split(',') if value.strip()]
+        try:
+            product_ids = {int(value) for value in raw_ids}
+        except ValueError:
+            return jsonify({'success': False, 'message': 'product_ids must be comma-separated integers'}), 400
         
-        stats = db.execute_query_one(stats_query, (product_id,))
+        if not product_ids:
+            return jsonify({'success': False, 'message': 'product_ids is required'}), 400
+        if len(product_ids) > MAX_BULK_RATINGS:
+            return jsonify({'success': False, 'message': f'At most {MAX_BULK_RATINGS} product ids per request'}), 400
+        
+        summaries = ReviewService.cached_summaries(product_ids)
         
         return jsonify({
             'success': True,
-            'stats': {
-                'total_reviews': stats['total_reviews'],
-                'average_rating': float(stats['average_rating']) if stats['average_rating'] else 0,
-                'rating_distribution': {
-                    '5': stats['five_star'],
-                    '4': stats['four_star'],
-                    '3': stats['three_star'],
-                    '2': stats['two_star'],
-                    '1': stats['one_star']
-                },
-                'verified_purchases': stats['verified_purchases']
+            'ratings': {
+                str(product_id): {
+                    'average_rating': summary['average_rating'],
+                    'total_reviews': summary['total_reviews']
+                }
+                for product_id, summary in summaries.items()
             }
         }), 200
         
+    except Exception as e:
+        logger.error(f"Error fetching product ratings: {str(e)}")
+        return jsonify({'success': False, 'message': 'Failed to fetch ratings'}), 500
+
+
+@review_bp.route('/product/<int:product_id>/stats', methods=['GET'])
+def get_product_review_stats(product_id):
+    """Get detailed review statistics for a product"""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': ReviewService.cached_summaries([product_id])[product_id]
+        }), 200
+        
     except Exception as e:
         logger.error(f"Error fetching review stats: {str(e)}")
         return jsonify({'success': False, 'message': 'Failed to fetch review statistics'}), 500
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from backend.utils.database import db
+from backend.services.identity_service import IdentityService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -68,6 +69,8 @@ def register_user():
             
             email = data.get('email', f"{data['phone']}@quickcart.com")
             result = db.execute_query(insert_query, (data['name'], data['phone'], email), fetch=True)
+            if result:
+                IdentityService.register_phone(result[0]['id'], data['phone'])
         
         if result:
             user_data = dict(result[0])
@@ -242,7 +245,7 @@ def delete_user_address(address_id):
 @user_bp.route('/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
     """Update user details (admin only)"""
-    from backend.utils.auth_middleware import admin_required
+    from backend.utils.auth_middleware import admin_required, invalidate_auth_user
     
     @admin_required
     def _update_user(admin_user):
@@ -281,6 +284,12 @@ def update_user(user_id):
             updated_user = db.execute_query_one(update_query, tuple(update_values))
             
             if updated_user:
+                # Role / status changes must reach token_required / admin_required at once
+                invalidate_auth_user(user_id)
+                if 'phone' in data:
+                    # The old phone is not known here, so drop every cached phone -> id
+                    IdentityService.invalidate()
+                    IdentityService.register_phone(user_id, updated_user['phone'])
                 return jsonify({
                     "success": True,
                     "message": "User updated successfully",
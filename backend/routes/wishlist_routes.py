@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from backend.utils.database import db
+from backend.services.identity_service import IdentityService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,11 +14,10 @@ def get_user_wishlist():
         if not phone:
             return jsonify({"success": False, "error": "Phone number required"}), 400
         
-        # Get user ID
-        user_query = "SELECT id FROM users WHERE phone = %s"
-        user = db.execute_query_one(user_query, (phone,))
+        # Get user ID (cached)
+        user_id = IdentityService.resolve_user_id(phone)
         
-        if not user:
+        if not user_id:
             return jsonify({"success": True, "wishlist": []})
         
         query = """
@@ -25,11 +25,11 @@ def get_user_wishlist():
                    p.image_url, p.stock, p.category_name, p.description
             FROM wishlist_items w
             JOIN products p ON w.product_id = p.id
-            WHERE (w.user_id = %s OR w.phone = %s) AND p.status = 'active'
+            WHERE w.user_id = %s AND p.status = 'active'
             ORDER BY w.created_at DESC
         """
         
-        wishlist_items = db.execute_query(query, (user['id'], phone), fetch=True)
+        wishlist_items = db.execute_query(query, (user_id,), fetch=True)
         
         return jsonify({
             "success": True,
@@ -51,10 +51,9 @@ def add_to_wishlist():
         if not all(field in data for field in required_fields):
             return jsonify({"success": False, "error": "Phone and product_id are required"}), 400
         
-        # Get user ID
-        user_query = "SELECT id FROM users WHERE phone = %s"
-        user = db.execute_query_one(user_query, (data['phone'],))
-        user_id = user['id'] if user else None
+        # Get user ID (cached); guests' rows are keyed by phone
+        user_id = IdentityService.resolve_user_id(data['phone'])
+        owner, owner_params = IdentityService.owner_filter('w', user_id, data['phone'])
         
         # Check if product exists and is available
         product_query = "SELECT id, name FROM products WHERE id = %s AND status = 'active'"
@@ -64,11 +63,11 @@ def add_to_wishlist():
             return jsonify({"success": False, "error": "Product not found or unavailable"}), 404
         
         # Check if item already in wishlist
-        existing_item_query = """
-            SELECT id FROM wishlist_items 
-            WHERE product_id = %s AND (user_id = %s OR phone = %s)
+        existing_item_query = f"""
+            SELECT w.id FROM wishlist_items w
+            WHERE w.product_id = %s AND {owner}
         """
-        existing_item = db.execute_query_one(existing_item_query, (data['product_id'], user_id, data['phone']))
+        existing_item = db.execute_query_one(existing_item_query, (data['product_id'],) + owner_params)
         
         if existing_item:
             return jsonify({
@@ -109,19 +108,18 @@ def remove_from_wishlist():
         if not all(field in data for field in required_fields):
             return jsonify({"success": False, "error": "Phone and product_id are required"}), 400
         
-        # Get user ID
-        user_query = "SELECT id FROM users WHERE phone = %s"
-        user = db.execute_query_one(user_query, (data['phone'],))
-        user_id = user['id'] if user else None
+        # Get user ID (cached); guests' rows are keyed by phone
+        user_id = IdentityService.resolve_user_id(data['phone'])
+        owner, owner_params = IdentityService.owner_filter('w', user_id, data['phone'])
         
         # Delete from wishlist
-        delete_query = """
-            DELETE FROM wishlist_items 
-            WHERE product_id = %s AND (user_id = %s OR phone = %s)
+        delete_query = f"""
+            DELETE FROM wishlist_items w
+            WHERE w.product_id = %s AND {owner}
             RETURNING id
         """
         
-        result = db.execute_query(delete_query, (data['product_id'], user_id, data['phone']), fetch=True)
+        result = db.execute_query(delete_query, (data['product_id'],) + owner_params, fetch=True)
         
         if result:
             return jsonify({
@@ -145,19 +143,18 @@ def clear_wishlist():
         if not phone:
             return jsonify({"success": False, "error": "Phone number required"}), 400
         
-        # Get user ID
-        user_query = "SELECT id FROM users WHERE phone = %s"
-        user = db.execute_query_one(user_query, (phone,))
-        user_id = user['id'] if user else None
+        # Get user ID (cached); guests' rows are keyed by phone
+        user_id = IdentityService.resolve_user_id(phone)
+        owner, owner_params = IdentityService.owner_filter('w', user_id, phone)
         
         # Delete all wishlist items
-        delete_query = """
-            DELETE FROM wishlist_items 
-            WHERE user_id = %s OR phone = %s
+        delete_query = f"""
+            DELETE FROM wishlist_items w
+            WHERE {owner}
             RETURNING id
         """
         
-        result = db.execute_query(delete_query, (user_id, phone), fetch=True)
+        result = db.execute_query(delete_query, owner_params, fetch=True)
         
         return jsonify({
             "success": True,
@@ -176,18 +173,17 @@ def check_in_wishlist(product_id):
         if not phone:
             return jsonify({"success": False, "error": "Phone number required"}), 400
         
-        # Get user ID
-        user_query = "SELECT id FROM users WHERE phone = %s"
-        user = db.execute_query_one(user_query, (phone,))
-        user_id = user['id'] if user else None
+        # Get user ID (cached); guests' rows are keyed by phone
+        user_id = IdentityService.resolve_user_id(phone)
+        owner, owner_params = IdentityService.owner_filter('w', user_id, phone)
         
         # Check if exists
-        check_query = """
-            SELECT id FROM wishlist_items 
-            WHERE product_id = %s AND (user_id = %s OR phone = %s)
+        check_query = f"""
+            SELECT w.id FROM wishlist_items w
+            WHERE w.product_id = %s AND {owner}
         """
         
-        result = db.execute_query_one(check_query, (product_id, user_id, phone))
+        result = db.execute_query_one(check_query, (product_id,) + owner_params)
         
         return jsonify({
             "success": True,
@@ -0,0 +1,124 @@
+"""
+Analytics Metrics Service for QuickCart
+Single-pass windowed metrics over one table:
+- each WindowedMetric declares an aggregate, an optional row condition
+  and a trailing window (days back from today; 0 = today)
+- every metric is compared with the period of the same length just
+  before its window (today vs yesterday, last 30 days vs the 30 before)
+- MetricsEngine compiles all metrics, current and previous periods, into
+  one SELECT of FILTER (WHERE ...) aggregates over the widest window, so
+  adding a dashboard widget adds a column, not another scan
+"""
+AGGREGATES = ('count', 'sum', 'avg', 'count_distinct', 'rate')
+
+
+def calculate_percentage_change(old_value, new_value):
+    """Calculate percentage change between two values"""
+    if old_value == 0:
+        return 100 if new_value > 0 else 0
+    return round(((new_value - old_value) / old_value) * 100, 1)
+
+
+class WindowedMetric:
+    """
+    One metric over a trailing window.
+    - aggregate: 'count', 'sum', 'avg', 'count_distinct' or 'rate'
+      ('rate' = % of rows in the window matching `where`)
+    - expression: value to aggregate (unused by 'count' / 'rate')
+    - where: SQL condition rows must match (trusted, never user input)
+    - days: window starts `days` days before today (0 = today only)
+    - digits: rounding of the reported value (0 -> int)
+    """
+
+    def __init__(self, name, aggregate, expression=None, where=None, days=30, digits=0):
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{aggregate}'")
+        if aggregate in ('sum', 'avg', 'count_distinct') and not expression:
+            raise ValueError(f"Aggregate '{aggregate}' needs an expression")
+        self.name = name
+        self.aggregate = aggregate
+        self.expression = expression
+        self.where = where
+        self.days = int(days)
+        self.digits = digits
+
+    @property
+    def period_days(self):
+        """Length of the comparison period"""
+        return max(self.days, 1)
+
+    @property
+    def lookback_days(self):
+        """How far back the current and previous periods reach"""
+        return self.days + self.period_days
+
+    def format_value(self, value):
+        value = float(value or 0)
+        return int(value) if self.digits == 0 else round(value, self.digits)
+
+
+class MetricsEngine:
+    """Compile and run a list of WindowedMetrics in a single scan"""
+
+    def __init__(self, table, timestamp_column='created_at'):
+        self.table = table
+        self.timestamp_column = timestamp_column
+
+    def _window_condition(self, metric, previous):
+        ts = self.timestamp_column
+        if not previous:
+            return f"{ts} >= CURRENT_DATE - {metric.days}"
+        return f"{ts} >= CURRENT_DATE - {metric.lookback_days} AND {ts} < CURRENT_DATE - {metric.days}"
+
+    def _aggregate_sql(self, metric, previous):
+        window = self._window_condition(metric, previous)
+        matched = f"{window} AND ({metric.where})" if metric.where else window
+
+        if metric.aggregate == 'count':
+            return f"COUNT(*) FILTER (WHERE {matched})"
+        if metric.aggregate == 'sum':
+            return f"SUM({metric.expression}) FILTER (WHERE {matched})"
+        if metric.aggregate == 'avg':
+            return f"AVG({metric.expression}) FILTER (WHERE {matched})"
+        if metric.aggregate == 'count_distinct':
+            return f"COUNT(DISTINCT {metric.expression}) FILTER (WHERE {matched})"
+        # rate
+        return (
+            f"COUNT(*) FILTER (WHERE {matched}) * 100.0 "
+            f"/ NULLIF(COUNT(*) FILTER (WHERE {window}), 0)"
+        )
+
+    def compile(self, metrics):
+        """SQL for one pass computing every metric's current and previous value"""
+        if not metrics:
+            raise ValueError("No metrics to compile")
+        columns = []
+        for index, metric in enumerate(metrics):
+            columns.append(f"{self._aggregate_sql(metric, False)} AS m{index}_current")
+            columns.append(f"{self._aggregate_sql(metric, True)} AS m{index}_previous")
+        widest = max(metric.lookback_days for metric in metrics)
+        return (
+            "SELECT\n    " + ",\n    ".join(columns) +
+            f"\nFROM {self.table}\nWHERE {self.timestamp_column} >= CURRENT_DATE - {widest}"
+        )
+
+    def run(self, cursor, metrics):
+        """
+        Execute the compiled query on `cursor` (RealDictCursor).
+        Returns {name: {'value', 'previous', 'change', 'trend'}}.
+        """
+        cursor.execute(self.compile(metrics))
+        row = cursor.fetchone()
+
+        results = {}
+        for index, metric in enumerate(metrics):
+            current = float(row[f'm{index}_current'] or 0)
+            previous = float(row[f'm{index}_previous'] or 0)
+            change = calculate_percentage_change(previous, current)
+            results[metric.name] = {
+                'value': metric.format_value(current),
+                'previous': metric.format_value(previous),
+                'change': change,
+                'trend': 'up' if change >= 0 else 'down'
+            }
+        return results
@@ -0,0 +1,240 @@
+"""
+Catalog Service for QuickCart
+In-process, versioned snapshot of the storefront catalog:
+- one snapshot holds every active product and category, loaded in a
+  single read-only transaction, plus secondary indexes by id, category
+  (id and name), stock status and price bucket
+- product / category read endpoints are dictionary lookups on the
+  snapshot; encoded responses are memoized on the snapshot itself, so
+  they die with it instead of multiplying cache keys per filter
+- snapshots are immutable and swapped atomically: a rebuild never
+  changes what an in-flight request is reading
+- admin writes call invalidate(), which bumps the catalog version in the
+  shared version store; every worker rebuilds on its next read.
+  Stock moved by orders shows up within CATALOG_SNAPSHOT_SECONDS (the
+  old product cache TTL), rebuilt by one thread while others keep
+  serving the previous snapshot
+"""
+import logging
+import os
+import threading
+import time
+
+from backend.config.config import Config
+from backend.utils.database import db
+from backend.utils.response_cache import version_cache
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = "catalog:version"
+# Version every worker agrees on while no admin write has been published
+BASELINE_CATALOG_VERSION = "baseline"
+# Outlives any snapshot; a missing key just means the baseline version
+CATALOG_VERSION_TTL_SECONDS = 30 * 24 * 3600
+PRICE_BUCKET_WIDTH = 100
+# Distinct encoded responses kept per snapshot (filter combinations)
+MAX_MEMOIZED_RESPONSES = 256
+
+# Per-process counters, reported by /health
+_stats_lock = threading.Lock()
+_stats = {
+    'rebuilds': 0,
+    'rebuild_ms': 0.0,
+    'version_rebuilds': 0,
+    'failures': 0,
+}
+
+
+def _count(**increments):
+    with _stats_lock:
+        for name, value in increments.items():
+            _stats[name] += value
+
+
+def price_bucket(price):
+    return int(float(price or 0) // PRICE_BUCKET_WIDTH)
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the active catalog. Product and category dicts are
+    shared by every request reading the snapshot and must not be mutated.
+    """
+
+    def __init__(self, version, products, categories):
+        self.version = version
+        self.built_at = time.time()
+        self.products = tuple(products)
+        self.by_id = {product['id']: product for product in self.products}
+        self.in_stock_ids = frozenset(p['id'] for p in self.products if (p['stock'] or 0) > 0)
+
+        by_category = {}
+        by_category_id = {}
+        by_price_bucket = {}
+        for product in self.products:
+            # Listings match either the product's own category_name or the joined name
+            for name in {product.pop('listed_category_name', None), product['category_name']}:
+                if name:
+                    by_category.setdefault(name, []).append(product)
+            if product['category_id'] is not None:
+                by_category_id.setdefault(product['category_id'], []).append(product)
+            by_price_bucket.setdefault(price_bucket(product['price']), set()).add(product['id'])
+
+        self.by_category = {name: tuple(items) for name, items in by_category.items()}
+        self.by_category_id = {cid: tuple(items) for cid, items in by_category_id.items()}
+        self.by_price_bucket = {bucket: frozenset(ids) for bucket, ids in by_price_bucket.items()}
+
+        self.categories = tuple(categories)
+        self.category_by_id = {category['id']: category for category in self.categories}
+        # Storefront category list: in-stock product counts, empty categories hidden
+        listed = []
+        for category in self.categories:
+            count = sum(
+                1 for p in self.by_category_id.get(category['id'], ())
+                if p['id'] in self.in_stock_ids
+            )
+            if count:
+                listed.append({**category, 'products_count': count})
+        self.listed_categories = tuple(listed)
+
+        self._responses = {}
+        self._responses_lock = threading.Lock()
+
+    def _price_ids(self, min_price, max_price):
+        """Ids in the buckets overlapping [min_price, max_price] (exact bounds checked later)"""
+        buckets = self.by_price_bucket
+        low = price_bucket(min_price) if min_price is not None else min(buckets, default=0)
+        high = price_bucket(max_price) if max_price is not None else max(buckets, default=0)
+        ids = set()
+        for bucket in range(low, high + 1):
+            ids |= buckets.get(bucket, frozenset())
+        return ids
+
+    def list_products(self, category=None, limit=None, include_out_of_stock=False,
+                      min_price=None, max_price=None):
+        """Active products ordered by id, filtered like the old listing query"""
+        candidates = self.by_category.get(category, ()) if category else self.products
+        if not include_out_of_stock:
+            candidates = [p for p in candidates if p['id'] in self.in_stock_ids]
+        if min_price is not None or max_price is not None:
+            ids = self._price_ids(min_price, max_price)
+            candidates = [
+                p for p in candidates
+                if p['id'] in ids
+                and (min_price is None or float(p['price']) >= min_price)
+                and (max_price is None or float(p['price']) <= max_price)
+            ]
+        return list(candidates[:limit] if limit else candidates)
+
+    def get_or_set(self, key, producer, ttl_seconds=None):
+        """Memoize an encoded response for the lifetime of this snapshot"""
+        with self._responses_lock:
+            value = self._responses.get(key)
+        if value is not None:
+            return value
+        value = producer()
+        with self._responses_lock:
+            if len(self._responses) < MAX_MEMOIZED_RESPONSES:
+                value = self._responses.setdefault(key, value)
+        return value
+
+
+class CatalogService:
+    """Build, serve and invalidate the per-process catalog snapshot"""
+
+    _snapshot = None
+    _rebuild_lock = threading.Lock()
+
+    @staticmethod
+    def _load(version):
+        with db.get_cursor() as cursor:
+            # Products and categories from the same point in time
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            cursor.execute("""
+                SELECT p.*, c.name as category_name, p.category_name as listed_category_name
+                FROM products p
+                LEFT JOIN categories c ON p.category_id = c.id
+                WHERE p.status = 'active'
+                ORDER BY p.id
+            """)
+            products = [dict(row) for row in cursor.fetchall()]
+            cursor.execute("""
+                SELECT * FROM categories
+                WHERE status = 'active'
+                ORDER BY position, id
+            """)
+            categories = [dict(row) for row in cursor.fetchall()]
+        return CatalogSnapshot(version, products, categories)
+
+    @staticmethod
+    def _current_version():
+        # Only invalidate() publishes versions: if every worker that found
+        # the key missing wrote its own, they would keep reloading each other
+        version = version_cache.get(CATALOG_VERSION_KEY)
+        return version if version is not None else BASELINE_CATALOG_VERSION
+
+    @staticmethod
+    def _new_version():
+        version = f"{time.time_ns()}-{os.getpid()}"
+        version_cache.set(CATALOG_VERSION_KEY, version, ttl_seconds=CATALOG_VERSION_TTL_SECONDS)
+        return version
+
+    @staticmethod
+    def _rebuild(version, version_changed):
+        started = time.perf_counter()
+        snapshot = CatalogService._load(version)
+        CatalogService._snapshot = snapshot
+        _count(
+            rebuilds=1,
+            version_rebuilds=1 if version_changed else 0,
+            rebuild_ms=(time.perf_counter() - started) * 1000
+        )
+        return snapshot
+
+    @staticmethod
+    def snapshot():
+        """Current catalog snapshot, rebuilt when the version changed or it aged out"""
+        snapshot = CatalogService._snapshot
+        version = CatalogService._current_version()
+
+        if snapshot is None or snapshot.version != version:
+            # Admin write (or cold start): readers must not see the old catalog
+            with CatalogService._rebuild_lock:
+                snapshot = CatalogService._snapshot
+                if snapshot is None or snapshot.version != version:
+                    snapshot = CatalogService._rebuild(version, snapshot is not None)
+            return snapshot
+
+        if time.time() - snapshot.built_at >= Config.CATALOG_SNAPSHOT_SECONDS:
+            # Stock refresh: one thread rebuilds, the rest keep serving this snapshot
+            if CatalogService._rebuild_lock.acquire(blocking=False):
+                try:
+                    if CatalogService._snapshot is snapshot:
+                        snapshot = CatalogService._rebuild(version, False)
+                except Exception as e:
+                    _count(failures=1)
+                    logger.error(f"❌ Catalog snapshot refresh failed, serving previous: {e}")
+                finally:
+                    CatalogService._rebuild_lock.release()
+        return snapshot
+
+    @staticmethod
+    def invalidate():
+        """Call after product / category writes: every worker rebuilds on its next read"""
+        CatalogService._new_version()
+
+
+def get_catalog_stats():
+    """Snapshot version, size and rebuild counters for this worker"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['rebuild_ms'] = round(stats['rebuild_ms'], 2)
+    snapshot = CatalogService._snapshot
+    if snapshot is not None:
+        stats.update({
+            'version': snapshot.version,
+            'age_seconds': round(time.time() - snapshot.built_at, 1),
+            'products': len(snapshot.products),
+            'categories': len(snapshot.categories),
+        })
+    return stats
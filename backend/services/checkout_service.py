@@ -0,0 +1,208 @@
+"""
+Checkout Service for QuickCart
+Places an order on one pooled connection inside one transaction:
+- one price lookup for the whole basket (WHERE id = ANY(...))
+- one multi-row INSERT for order_items
+- one conditional, set-based stock UPDATE (see InventoryService)
+- coupon usage, timeline entry and cart clear on the same connection
+- sales rollups updated in the same transaction (see SalesRollupService)
+If any step fails the whole order is rolled back.
+"""
+import logging
+
+from psycopg2.extras import execute_values
+
+from backend.utils.database import db
+from backend.services.inventory_service import InventoryService, InsufficientStockError
+from backend.services.sales_rollup_service import SalesRollupService
+
+logger = logging.getLogger(__name__)
+
+
+class CheckoutService:
+    """Single-transaction order placement"""
+
+    @staticmethod
+    def calculate_order_total(cursor, items, delivery_fee=29, handling_fee=5, coupon=None):
+        """
+        🔒 SECURITY: Backend price calculation to prevent manipulation
+        Prices every line item with a single query on the given cursor.
+        """
+        product_ids = [int(item['product_id']) for item in items]
+
+        cursor.execute(
+            "SELECT id, name, price FROM products WHERE id = ANY(%s) AND status = 'active'",
+            (product_ids,)
+        )
+        products = {row['id']: row for row in cursor.fetchall()}
+
+        subtotal = 0
+        order_items = []
+
+        for item in items:
+            product = products.get(int(item['product_id']))
+
+            if not product:
+                return {
+                    'success': False,
+                    'error': f"Product {item['product_id']} not found or inactive"
+                }
+
+            # Use database price, NOT client-provided price
+            quantity = int(item['quantity'])
+            if quantity <= 0:
+                # A negative line would lower the total and put stock back
+                return {
+                    'success': False,
+                    'error': f"Invalid quantity for product {item['product_id']}"
+                }
+            item_total = float(product['price']) * quantity
+            subtotal += item_total
+
+            order_items.append({
+                'product_id': product['id'],
+                'product_name': product['name'],
+                'product_price': float(product['price']),
+                'quantity': quantity,
+                'total_price': item_total
+            })
+
+        # Calculate delivery fee (free if >= 99)
+        final_delivery_fee = 0 if subtotal >= 99 else delivery_fee
+
+        # Apply coupon discount
+        discount = 0
+        if coupon:
+            # Revalidate coupon
+            cursor.execute("""
+                SELECT * FROM offers
+                WHERE code = %s
+                AND status = 'active'
+                AND start_date <= CURRENT_DATE
+                AND end_date >= CURRENT_DATE
+            """, (coupon,))
+            valid_coupon = cursor.fetchone()
+
+            if valid_coupon:
+                min_order = float(valid_coupon.get('min_order_amount', 0))
+
+                if subtotal >= min_order:
+                    if valid_coupon['discount_type'] == 'percentage':
+                        discount = (subtotal * float(valid_coupon['discount_value'])) / 100
+                        max_discount = valid_coupon.get('max_discount_amount')
+                        if max_discount:
+                            discount = min(discount, float(max_discount))
+                    elif valid_coupon['discount_type'] == 'fixed':
+                        discount = min(float(valid_coupon['discount_value']), subtotal)
+                    elif valid_coupon['discount_type'] == 'free_delivery':
+                        final_delivery_fee = 0
+
+        total = subtotal - discount + final_delivery_fee + handling_fee
+
+        return {
+            'success': True,
+            'subtotal': round(subtotal, 2),
+            'discount': round(discount, 2),
+            'delivery_fee': round(final_delivery_fee, 2),
+            'handling_fee': round(handling_fee, 2),
+            'total': round(total, 2),
+            'items': order_items
+        }
+
+    @staticmethod
+    def place_order(order_id, user, items, delivery_address, created_at,
+                    delivery_fee=20.00, handling_fee=0.00, coupon_code=None,
+                    client_total=0, payment_status='pending', payment_method='cash',
+                    reservation_token=None):
+        """
+        Price, validate and persist an order in one transaction.
+        Returns {'success': True, 'order': row, 'items': [...]} or
+        {'success': False, 'error': message, 'status_code': int}
+        """
+        try:
+            return CheckoutService._place_order(
+                order_id, user, items, delivery_address, created_at,
+                delivery_fee, handling_fee, coupon_code, client_total,
+                payment_status, payment_method, reservation_token
+            )
+        except InsufficientStockError as e:
+            logger.warning(f"❌ Order {order_id} rejected: {e}")
+            return {
+                'success': False,
+                'error': 'Some items are out of stock',
+                'shortages': e.shortages,
+                'status_code': 409
+            }
+
+    @staticmethod
+    def _place_order(order_id, user, items, delivery_address, created_at,
+                     delivery_fee, handling_fee, coupon_code, client_total,
+                     payment_status, payment_method, reservation_token):
+        with db.get_cursor() as cursor:
+            total_calculation = CheckoutService.calculate_order_total(
+                cursor, items, delivery_fee, handling_fee, coupon_code
+            )
+
+            if not total_calculation['success']:
+                return {'success': False, 'error': total_calculation['error'], 'status_code': 400}
+
+            # 🔒 SECURITY: Verify client-sent total matches backend calculation (prevent manipulation)
+            backend_total = total_calculation['total']
+
+            # Allow small floating point differences (0.01)
+            if abs(float(client_total) - backend_total) > 0.01:
+                logger.warning(f"❌ Price manipulation detected! User {user['id']} sent total={client_total}, actual={backend_total}")
+                return {
+                    'success': False,
+                    'error': "Price mismatch detected. Please refresh and try again.",
+                    'status_code': 400
+                }
+
+            order_items = total_calculation['items']
+
+            # 🔒 SECURITY: All-or-nothing conditional stock decrement (prevent overselling)
+            InventoryService.consume_hold(cursor, reservation_token, user['id'], order_items)
+
+            cursor.execute("""
+                INSERT INTO orders (id, user_id, phone, user_name, total, subtotal, delivery_fee,
+                                  status, payment_status, payment_method, delivery_address, created_at, order_date)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, 'pending', %s, %s, %s, %s, %s)
+                RETURNING *
+            """, (
+                order_id, user['id'], user['phone'], user['name'], backend_total,
+                total_calculation['subtotal'], delivery_fee,
+                payment_status, payment_method, delivery_address,
+                created_at,  # created_at with IST time
+                created_at.date()  # order_date
+            ))
+            created_order = cursor.fetchone()
+
+            execute_values(cursor, """
+                INSERT INTO order_items (order_id, product_id, product_name, product_price, quantity, total_price)
+                VALUES %s
+            """, [
+                (order_id, item['product_id'], item['product_name'],
+                 item['product_price'], item['quantity'], item['total_price'])
+                for item in order_items
+            ], page_size=max(len(order_items), 1))
+
+            # Mark coupon as used if applicable
+            if coupon_code and total_calculation['discount'] > 0:
+                cursor.execute(
+                    "UPDATE offers SET used_count = used_count + 1 WHERE code = %s",
+                    (coupon_code,)
+                )
+
+            # Create initial timeline entry with IST timestamp
+            cursor.execute("""
+                INSERT INTO order_timeline (order_id, status, completed, timestamp)
+                VALUES (%s, 'Order Placed', true, %s)
+            """, (order_id, created_at))
+
+            # Clear user's cart after successful order
+            cursor.execute("DELETE FROM cart_items WHERE user_id = %s", (user['id'],))
+
+            # Dashboard aggregates commit together with the order
+            SalesRollupService.apply_orders_safely(cursor, [order_id])
+
+        return {'success': True, 'order': created_order, 'items': order_items}
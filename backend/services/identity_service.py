@@ -0,0 +1,208 @@
+"""
+Identity Service for QuickCart
+Phone -> user id resolution for the phone-keyed cart / wishlist API:
+- resolve_user_id() is served from the shared identity cache (misses,
+  including "no such user", are cached for IDENTITY_CACHE_SECONDS) and
+  dropped when a user registers or changes phone
+- cart / wishlist rows are looked up by one indexed column: user_id for
+  registered users, phone (partial index on user_id IS NULL) for guests
+- guest rows are attached to the user on registration, and
+  backfill_guest_rows() migrates legacy phone-only rows on startup
+"""
+import logging
+
+from backend.config.config import Config
+from backend.utils.database import db
+from backend.utils.response_cache import identity_cache
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_CACHE_PREFIX = "identity:phone:"
+# Cached for phones with no user (None would read as a cache miss)
+NO_USER = 0
+# Any constant works; it only has to be unique among advisory locks in this app
+BACKFILL_LOCK_ID = 7302
+
+
+class IdentityService:
+    """Resolve phone numbers to user ids and keep guest rows attached"""
+
+    @staticmethod
+    def init_identity_indexes():
+        """Create the single-column lookup indexes for cart / wishlist rows"""
+        try:
+            indexes = """
+                CREATE INDEX IF NOT EXISTS idx_cart_user ON cart_items (user_id);
+                CREATE INDEX IF NOT EXISTS idx_wishlist_user ON wishlist_items (user_id);
+
+                CREATE INDEX IF NOT EXISTS idx_cart_guest_phone
+                ON cart_items (phone) WHERE user_id IS NULL;
+
+                CREATE INDEX IF NOT EXISTS idx_wishlist_guest_phone
+                ON wishlist_items (phone) WHERE user_id IS NULL;
+            """
+            db.execute_query(indexes)
+            logger.info("✅ Identity lookup indexes initialized")
+
+        except Exception as e:
+            logger.error(f"❌ Error initializing identity lookup indexes: {e}")
+
+    @staticmethod
+    def resolve_user_id(phone):
+        """User id registered for `phone`, or None for guests"""
+        cache_key = f"{IDENTITY_CACHE_PREFIX}{phone}"
+        user_id = identity_cache.get(cache_key)
+        if user_id is None:
+            user = db.execute_query_one("SELECT id FROM users WHERE phone = %s", (phone,), prepared=True)
+            user_id = user['id'] if user else NO_USER
+            identity_cache.set(cache_key, user_id, ttl_seconds=Config.IDENTITY_CACHE_SECONDS)
+        return user_id or None
+
+    @staticmethod
+    def owner_filter(alias, user_id, phone):
+        """
+        WHERE fragment and params selecting one owner's rows by a single
+        indexed column: `alias.user_id` for users, guest phone otherwise.
+        """
+        if user_id:
+            return f"{alias}.user_id = %s", (user_id,)
+        return f"{alias}.user_id IS NULL AND {alias}.phone = %s", (phone,)
+
+    @staticmethod
+    def invalidate(phone=None):
+        """Drop the cached id for `phone` (or every cached phone)"""
+        if phone is None:
+            identity_cache.invalidate(IDENTITY_CACHE_PREFIX)
+        else:
+            identity_cache.delete(f"{IDENTITY_CACHE_PREFIX}{phone}")
+
+    @staticmethod
+    def _attach_guest_rows(cursor, phone=None):
+        """
+        Give phone-only cart / wishlist rows the id of the user with that
+        phone. Rows for a product the user already has are merged into it
+        (cart quantities are added up). Returns the number of rows moved.
+        """
+        phone_filter = "AND g.phone = %s" if phone else ""
+        params = (phone,) if phone else None
+
+        cursor.execute(f"""
+            CREATE TEMP TABLE guest_rows ON COMMIT DROP AS
+            SELECT 'cart' as kind, g.id, u.id as user_id, g.product_id, g.quantity
+            FROM cart_items g
+            JOIN users u ON u.phone = g.phone
+            WHERE g.user_id IS NULL {phone_filter}
+        """, params)
+        cursor.execute(f"""
+            INSERT INTO guest_rows
+            SELECT 'wishlist', g.id, u.id, g.product_id, 0
+            FROM wishlist_items g
+            JOIN users u ON u.phone = g.phone
+            WHERE g.user_id IS NULL {phone_filter}
+        """, params)
+        cursor.execute("SELECT COUNT(*) as count FROM guest_rows")
+        moved = cursor.fetchone()['count']
+        if not moved:
+            cursor.execute("DROP TABLE guest_rows")
+            return 0
+
+        cursor.execute("""
+            -- Add guest cart quantities to rows the user already has
+            UPDATE cart_items c
+            SET quantity = c.quantity + g.quantity, updated_at = CURRENT_TIMESTAMP
+            FROM (
+                SELECT user_id, product_id, SUM(quantity) as quantity
+                FROM guest_rows WHERE kind = 'cart'
+                GROUP BY user_id, product_id
+            ) g
+            WHERE c.user_id = g.user_id AND c.product_id = g.product_id;
+
+            DELETE FROM cart_items c
+            USING guest_rows g
+            WHERE g.kind = 'cart' AND c.id = g.id
+            AND EXISTS (
+                SELECT 1 FROM cart_items o
+                WHERE o.user_id = g.user_id AND o.product_id = g.product_id
+            );
+
+            DELETE FROM wishlist_items w
+            USING guest_rows g
+            WHERE g.kind = 'wishlist' AND w.id = g.id
+            AND EXISTS (
+                SELECT 1 FROM wishlist_items o
+                WHERE o.user_id = g.user_id AND o.product_id = g.product_id
+            );
+
+            -- Remaining guest rows: keep one per product, holding the total quantity
+            UPDATE cart_items c
+            SET user_id = g.user_id, quantity = g.quantity, updated_at = CURRENT_TIMESTAMP
+            FROM (
+                SELECT MIN(r.id) as id, r.user_id, SUM(r.quantity) as quantity
+                FROM guest_rows r
+                JOIN cart_items c ON c.id = r.id
+                WHERE r.kind = 'cart'
+                GROUP BY r.user_id, r.product_id
+            ) g
+            WHERE c.id = g.id;
+
+            UPDATE wishlist_items w
+            SET user_id = g.user_id
+            FROM (
+                SELECT MIN(r.id) as id, r.user_id
+                FROM guest_rows r
+                JOIN wishlist_items w ON w.id = r.id
+                WHERE r.kind = 'wishlist'
+                GROUP BY r.user_id, r.product_id
+            ) g
+            WHERE w.id = g.id;
+
+            -- Duplicates folded into the kept row above
+            DELETE FROM cart_items c USING guest_rows g
+            WHERE g.kind = 'cart' AND c.id = g.id AND c.user_id IS NULL;
+
+            DELETE FROM wishlist_items w USING guest_rows g
+            WHERE g.kind = 'wishlist' AND w.id = g.id AND w.user_id IS NULL;
+
+            DROP TABLE guest_rows;
+        """)
+        return moved
+
+    @staticmethod
+    def register_phone(user_id, phone):
+        """Call after a user is created (or changes phone): attach its guest rows"""
+        if not phone:
+            return
+        IdentityService.invalidate(phone)
+        try:
+            with db.get_cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (BACKFILL_LOCK_ID,))
+                moved = IdentityService._attach_guest_rows(cursor, phone)
+            if moved:
+                logger.info(f"✅ Attached {moved} guest cart/wishlist row(s) to user {user_id}")
+        except Exception as e:
+            logger.error(f"❌ Failed to attach guest rows for user {user_id}: {e}")
+
+    @staticmethod
+    def backfill_guest_rows():
+        """Migration: set user_id on legacy phone-only rows of registered users"""
+        try:
+            with db.get_cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_xact_lock(%s) as locked", (BACKFILL_LOCK_ID,))
+                if not cursor.fetchone()['locked']:
+                    return 0
+                moved = IdentityService._attach_guest_rows(cursor)
+            if moved:
+                logger.info(f"✅ Backfilled user_id on {moved} legacy cart/wishlist row(s)")
+            return moved
+
+        except Exception as e:
+            logger.error(f"❌ Cart/wishlist user_id backfill failed: {e}")
+            return 0
+
+
+# Initialize indexes and migrate legacy rows on module load
+try:
+    IdentityService.init_identity_indexes()
+    IdentityService.backfill_guest_rows()
+except Exception as e:
+    logger.error(f"Failed to initialize identity service: {e}")
@@ -0,0 +1,247 @@
+"""
+Inventory Service for QuickCart
+Oversell-proof stock reservation:
+- every basket is decremented with one conditional UPDATE (stock >= qty),
+  so concurrent checkouts can never drive stock negative
+- the decrement is all-or-nothing and reports which products are short
+- optional time-limited holds taken when checkout starts and released
+  back to stock when they expire
+Only the product rows in the basket are locked, so a hot product never
+serializes checkouts for the rest of the catalog.
+"""
+import logging
+import secrets
+
+from psycopg2.extras import execute_values
+
+from backend.config.config import Config
+from backend.utils.database import db
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStockError(Exception):
+    """Raised when one or more products in a basket cannot be reserved"""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        names = ', '.join(str(s['product_id']) for s in shortages)
+        super().__init__(f"Insufficient stock for product(s): {names}")
+
+
+class InventoryService:
+    """Atomic stock decrements and checkout holds"""
+
+    @staticmethod
+    def init_reservation_tables():
+        """Initialize stock hold table in database"""
+        try:
+            stock_holds_table = """
+                CREATE TABLE IF NOT EXISTS stock_holds (
+                    id SERIAL PRIMARY KEY,
+                    hold_token VARCHAR(64) NOT NULL,
+                    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+                    product_id INTEGER REFERENCES products(id) ON DELETE CASCADE,
+                    quantity INTEGER NOT NULL CHECK (quantity > 0),
+                    status VARCHAR(20) DEFAULT 'active'
+                        CHECK (status IN ('active', 'consumed', 'released', 'expired')),
+                    expires_at TIMESTAMP NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_stock_holds_token
+                ON stock_holds (hold_token);
+
+                CREATE INDEX IF NOT EXISTS idx_stock_holds_active_expiry
+                ON stock_holds (expires_at) WHERE status = 'active';
+            """
+            db.execute_query(stock_holds_table)
+            logger.info("✅ Stock hold table initialized")
+
+        except Exception as e:
+            logger.error(f"❌ Error initializing stock hold table: {e}")
+
+    @staticmethod
+    def _aggregate(items):
+        """Sum quantities per product, ordered by product id for consistent lock order"""
+        quantities = {}
+        for item in items:
+            product_id = int(item['product_id'])
+            quantities[product_id] = quantities.get(product_id, 0) + int(item['quantity'])
+        return dict(sorted(quantities.items()))
+
+    @staticmethod
+    def reserve(cursor, items):
+        """
+        Decrement stock for every item in one conditional UPDATE.
+        Raises InsufficientStockError (listing every short product) when any
+        product lacks stock; the caller's transaction must then roll back.
+        """
+        quantities = InventoryService._aggregate(items)
+        if not quantities:
+            return
+
+        cursor.execute("""
+            UPDATE products AS p
+            SET stock = p.stock - d.quantity
+            FROM unnest(%s::int[], %s::int[]) AS d(product_id, quantity)
+            WHERE p.id = d.product_id
+            AND p.stock >= d.quantity
+            RETURNING p.id
+        """, (list(quantities.keys()), list(quantities.values())))
+        reserved = {row['id'] for row in cursor.fetchall()}
+
+        if len(reserved) == len(quantities):
+            return
+
+        short_ids = [pid for pid in quantities if pid not in reserved]
+        cursor.execute(
+            "SELECT id, stock FROM products WHERE id = ANY(%s)",
+            (short_ids,)
+        )
+        available = {row['id']: row['stock'] for row in cursor.fetchall()}
+
+        raise InsufficientStockError([
+            {
+                'product_id': pid,
+                'requested': quantities[pid],
+                'available': max(available.get(pid, 0), 0)
+            }
+            for pid in short_ids
+        ])
+
+    @staticmethod
+    def restock(cursor, items):
+        """Return quantities to stock with one set-based UPDATE"""
+        quantities = InventoryService._aggregate(items)
+        if not quantities:
+            return
+
+        cursor.execute("""
+            UPDATE products AS p
+            SET stock = p.stock + d.quantity
+            FROM unnest(%s::int[], %s::int[]) AS d(product_id, quantity)
+            WHERE p.id = d.product_id
+        """, (list(quantities.keys()), list(quantities.values())))
+
+    @staticmethod
+    def create_hold(user_id, items, hold_minutes=None):
+        """
+        Reserve stock for a checkout that has just started.
+        Returns {'hold_token', 'expires_at', 'items'}; raises InsufficientStockError.
+        """
+        hold_minutes = hold_minutes or Config.STOCK_HOLD_MINUTES
+        quantities = InventoryService._aggregate(items)
+        hold_token = secrets.token_urlsafe(24)
+
+        InventoryService.release_expired_holds()
+
+        with db.get_cursor() as cursor:
+            InventoryService.reserve(cursor, items)
+
+            rows = execute_values(cursor, """
+                INSERT INTO stock_holds (hold_token, user_id, product_id, quantity, expires_at)
+                VALUES %s
+                RETURNING expires_at
+            """, [
+                (hold_token, user_id, product_id, quantity, hold_minutes)
+                for product_id, quantity in quantities.items()
+            ], template="(%s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(mins => %s))",
+                page_size=len(quantities), fetch=True)
+
+        return {
+            'hold_token': hold_token,
+            'expires_at': rows[0]['expires_at'].isoformat() if rows else None,
+            'items': [{'product_id': pid, 'quantity': qty} for pid, qty in quantities.items()]
+        }
+
+    @staticmethod
+    def consume_hold(cursor, hold_token, user_id, items):
+        """
+        Convert a hold into an order inside the caller's transaction.
+        Quantities covered by a live hold are already out of stock; anything
+        beyond the hold is reserved now and any unused remainder is restocked.
+        An expired or unknown hold falls back to a plain reservation.
+        """
+        held = {}
+        if hold_token:
+            cursor.execute("""
+                UPDATE stock_holds
+                SET status = 'consumed'
+                WHERE hold_token = %s
+                AND user_id = %s
+                AND status = 'active'
+                AND expires_at > CURRENT_TIMESTAMP
+                RETURNING product_id, quantity
+            """, (hold_token, user_id))
+            for row in cursor.fetchall():
+                held[row['product_id']] = held.get(row['product_id'], 0) + row['quantity']
+
+        wanted = InventoryService._aggregate(items)
+        shortfall = []
+        surplus = []
+        for product_id in sorted(set(wanted) | set(held)):
+            difference = wanted.get(product_id, 0) - held.get(product_id, 0)
+            if difference > 0:
+                shortfall.append({'product_id': product_id, 'quantity': difference})
+            elif difference < 0:
+                surplus.append({'product_id': product_id, 'quantity': -difference})
+
+        InventoryService.reserve(cursor, shortfall)
+        InventoryService.restock(cursor, surplus)
+
+    @staticmethod
+    def release_hold(hold_token, user_id):
+        """Release an active hold early (checkout abandoned). Returns True if released."""
+        with db.get_cursor() as cursor:
+            cursor.execute("""
+                WITH released AS (
+                    UPDATE stock_holds
+                    SET status = 'released'
+                    WHERE hold_token = %s AND user_id = %s AND status = 'active'
+                    RETURNING product_id, quantity
+                ), totals AS (
+                    SELECT product_id, SUM(quantity) AS quantity
+                    FROM released
+                    GROUP BY product_id
+                )
+                UPDATE products AS p
+                SET stock = p.stock + totals.quantity
+                FROM totals
+                WHERE p.id = totals.product_id
+                RETURNING p.id
+            """, (hold_token, user_id))
+            return len(cursor.fetchall()) > 0
+
+    @staticmethod
+    def release_expired_holds():
+        """Return stock from expired holds - safe to run from every worker"""
+        try:
+            with db.get_cursor() as cursor:
+                cursor.execute("""
+                    WITH expired AS (
+                        UPDATE stock_holds
+                        SET status = 'expired'
+                        WHERE status = 'active' AND expires_at <= CURRENT_TIMESTAMP
+                        RETURNING product_id, quantity
+                    ), totals AS (
+                        SELECT product_id, SUM(quantity) AS quantity
+                        FROM expired
+                        GROUP BY product_id
+                    )
+                    UPDATE products AS p
+                    SET stock = p.stock + totals.quantity
+                    FROM totals
+                    WHERE p.id = totals.product_id
+                """)
+                if cursor.rowcount:
+                    logger.info(f"✅ Released expired stock holds for {cursor.rowcount} product(s)")
+        except Exception as e:
+            logger.error(f"❌ Error releasing expired stock holds: {e}")
+
+
+# Initialize tables on module load
+try:
+    InventoryService.init_reservation_tables()
+except Exception as e:
+    logger.error(f"Failed to initialize inventory service: {e}")
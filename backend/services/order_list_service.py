@@ -0,0 +1,207 @@
+"""
+Order List Service for QuickCart
+Admin order listing that stays fast at millions of orders:
+- keyset pagination on (created_at, id) with an opaque next_cursor
+- items and timeline batch-loaded with one query each per page
+- total count can be exact, approximate (planner estimate) or cached
+"""
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime
+
+from backend.utils.database import db
+from backend.utils.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 1000
+COUNT_MODES = ('exact', 'approx', 'cached', 'none')
+COUNT_CACHE_PREFIX = "orders:count:"
+COUNT_CACHE_TTL = 60
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+class OrderListService:
+    """Paginated admin order queries"""
+
+    @staticmethod
+    def init_order_indexes():
+        """Create the indexes keyset pagination walks"""
+        try:
+            indexes = """
+                CREATE INDEX IF NOT EXISTS idx_orders_created_id
+                ON orders (created_at DESC, id DESC);
+
+                CREATE INDEX IF NOT EXISTS idx_orders_status_created_id
+                ON orders (status, created_at DESC, id DESC);
+
+                CREATE INDEX IF NOT EXISTS idx_order_timeline_order
+                ON order_timeline (order_id);
+            """
+            db.execute_query(indexes)
+            logger.info("✅ Order list indexes initialized")
+
+        except Exception as e:
+            logger.error(f"❌ Error initializing order list indexes: {e}")
+
+    @staticmethod
+    def encode_cursor(order):
+        """Opaque cursor pointing just past the given order row"""
+        raw = json.dumps({'c': order['created_at'].isoformat(), 'i': order['id']})
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Return (created_at, id) from a cursor produced by encode_cursor"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            return datetime.fromisoformat(data['c']), str(data['i'])
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as e:
+            raise InvalidCursorError('Invalid cursor') from e
+
+    @staticmethod
+    def fetch_page(status=None, limit=50, cursor=None, offset=None):
+        """
+        Fetch one page of orders, newest first.
+        Returns (orders, next_cursor); next_cursor is None on the last page.
+        `offset` keeps the legacy OFFSET paging working for old clients.
+        """
+        conditions = []
+        params = []
+
+        if status:
+            conditions.append("o.status = %s")
+            params.append(status)
+
+        if cursor:
+            created_at, order_id = OrderListService.decode_cursor(cursor)
+            conditions.append("(o.created_at, o.id) < (%s, %s)")
+            params.extend([created_at, order_id])
+
+        query = "SELECT o.* FROM orders o"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY o.created_at DESC, o.id DESC LIMIT %s"
+        # One extra row tells us whether another page exists
+        params.append(limit + 1)
+
+        if offset and not cursor:
+            query += " OFFSET %s"
+            params.append(offset)
+
+        rows = db.execute_query(query, tuple(params), fetch=True) or []
+        has_more = len(rows) > limit
+        orders = [dict(row) for row in rows[:limit]]
+
+        OrderListService.attach_items_and_timeline(orders)
+
+        next_cursor = OrderListService.encode_cursor(orders[-1]) if has_more and orders else None
+        return orders, next_cursor
+
+    @staticmethod
+    def attach_items_and_timeline(orders):
+        """Load items and timeline for a page of orders with one query each"""
+        if not orders:
+            return
+
+        order_ids = [order['id'] for order in orders]
+
+        items = db.execute_query("""
+            SELECT order_id,
+                   COUNT(*) as items_count,
+                   JSON_AGG(
+                       JSON_BUILD_OBJECT(
+                           'product_name', oi.product_name,
+                           'quantity', oi.quantity,
+                           'price', oi.product_price,
+                           'total', oi.total_price,
+                           'product_id', oi.product_id
+                       )
+                   ) as items
+            FROM order_items oi
+            WHERE oi.order_id = ANY(%s)
+            GROUP BY order_id
+        """, (order_ids,), fetch=True) or []
+        items_by_order = {row['order_id']: row for row in items}
+
+        timelines = db.execute_query("""
+            SELECT order_id,
+                   JSON_AGG(
+                       JSON_BUILD_OBJECT(
+                           'status', ot.status,
+                           'timestamp', ot.timestamp,
+                           'completed', ot.completed,
+                           'notes', ot.notes
+                       ) ORDER BY ot.timestamp
+                   ) as timeline
+            FROM order_timeline ot
+            WHERE ot.order_id = ANY(%s)
+            GROUP BY order_id
+        """, (order_ids,), fetch=True) or []
+        timeline_by_order = {row['order_id']: row['timeline'] for row in timelines}
+
+        for order in orders:
+            order_items = items_by_order.get(order['id'])
+            order['items_count'] = order_items['items_count'] if order_items else 0
+            order['items'] = order_items['items'] if order_items else []
+            order['timeline'] = timeline_by_order.get(order['id'], [])
+
+    @staticmethod
+    def _exact_count(status=None):
+        if status:
+            row = db.execute_query_one("SELECT COUNT(*) as total FROM orders WHERE status = %s", (status,))
+        else:
+            row = db.execute_query_one("SELECT COUNT(*) as total FROM orders")
+        return row['total'] if row else 0
+
+    @staticmethod
+    def _approx_count(status=None):
+        """Planner row estimate - no table scan, accurate to the last ANALYZE"""
+        if status:
+            row = db.execute_query_one(
+                "EXPLAIN (FORMAT JSON) SELECT 1 FROM orders WHERE status = %s", (status,)
+            )
+            plan = row['QUERY PLAN'] if row else None
+            if plan:
+                return int(plan[0]['Plan']['Plan Rows'])
+        else:
+            row = db.execute_query_one(
+                "SELECT reltuples::bigint as estimate FROM pg_class WHERE oid = 'orders'::regclass"
+            )
+            # reltuples is -1 until the table has been vacuumed/analyzed once
+            if row and row['estimate'] >= 0:
+                return row['estimate']
+        return OrderListService._exact_count(status)
+
+    @staticmethod
+    def count(status=None, mode='exact'):
+        """Total orders for the filter; returns None when mode is 'none'"""
+        if mode == 'none':
+            return None
+        if mode == 'approx':
+            return OrderListService._approx_count(status)
+        if mode == 'cached':
+            return response_cache.get_or_set(
+                f"{COUNT_CACHE_PREFIX}{status or 'all'}",
+                lambda: OrderListService._exact_count(status),
+                ttl_seconds=COUNT_CACHE_TTL
+            )
+        return OrderListService._exact_count(status)
+
+    @staticmethod
+    def invalidate_counts():
+        """Drop cached totals after orders are created or change status"""
+        response_cache.invalidate(COUNT_CACHE_PREFIX)
+
+
+# Initialize indexes on module load
+try:
+    OrderListService.init_order_indexes()
+except Exception as e:
+    logger.error(f"Failed to initialize order list service: {e}")
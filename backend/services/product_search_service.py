@@ -0,0 +1,250 @@
+"""
+Product Search Service for QuickCart
+Index-backed product search for GET /api/products?search=:
+- full text: product_search_documents holds a weighted tsvector of each
+  product's name (A) and description (B), kept current by a trigger on
+  products and GIN-indexed; every search word is matched as a prefix, so
+  search-as-you-type works ("choc" finds "Chocolate"). It lives in a side
+  table so the column never shows up in SELECT p.* payloads
+- typo tolerance: when the pg_trgm extension is available, a trigram GIN
+  index on name serves word-similarity ("chocolte") and substring
+  matches; without it, a query with no full-text hit falls back to the
+  old ILIKE scan
+- results are ranked by relevance (ts_rank, plus name similarity with
+  pg_trgm) and cached in their own bounded search_cache, so one-off
+  search strings never evict the hot catalog keys
+"""
+import logging
+import re
+
+from backend.config.config import Config
+from backend.utils.database import db
+from backend.utils.response_cache import search_cache
+
+logger = logging.getLogger(__name__)
+
+TEXT_SEARCH_CONFIG = 'english'
+MAX_SEARCH_LENGTH = 100
+MAX_SEARCH_WORDS = 8
+WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+# Serializes the trigger DDL of workers booting at the same time
+SEARCH_DDL_LOCK_ID = 7305
+
+
+def search_document_sql(row):
+    """Weighted tsvector of a products row (`row` is a table alias or NEW)"""
+    return (
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', COALESCE({row}.name, '')), 'A') || "
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', COALESCE({row}.description, '')), 'B')"
+    )
+
+
+def normalize_search(search):
+    """Lower-case, trimmed, single-spaced search string (also the cache key)"""
+    return ' '.join((search or '').lower().split())[:MAX_SEARCH_LENGTH]
+
+
+def prefix_tsquery(search):
+    """'dark choc' -> 'dark:* & choc:*' (words only, so always a valid tsquery)"""
+    words = WORD_PATTERN.findall(search)[:MAX_SEARCH_WORDS]
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+class ProductSearchService:
+    """Ranked, typo-tolerant product search"""
+
+    # Set by init_search_indexes() once pg_trgm is known to be installed
+    trigram_enabled = False
+
+    @staticmethod
+    def _search_document_function_sql():
+        """Body of the trigger function that keeps product_search_documents current"""
+        return f"""
+                BEGIN
+                    INSERT INTO product_search_documents (product_id, document)
+                    VALUES (NEW.id, {search_document_sql('NEW')})
+                    ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document;
+                    RETURN NULL;
+                END;
+            """
+
+    @staticmethod
+    def _ensure_search_trigger():
+        """Create the trigger function / trigger when missing (no DDL on products otherwise)"""
+        body = ProductSearchService._search_document_function_sql()
+        with db.get_cursor() as cursor:
+            # Workers boot together: one creates, the others wait and find it in place
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (SEARCH_DDL_LOCK_ID,))
+            cursor.execute(
+                "SELECT prosrc FROM pg_proc WHERE proname = 'refresh_product_search_document'"
+            )
+            function = cursor.fetchone()
+            if function is None or function['prosrc'] != body:
+                cursor.execute(f"""
+                    CREATE OR REPLACE FUNCTION refresh_product_search_document() RETURNS TRIGGER
+                    AS $${body}$$ LANGUAGE plpgsql
+                """)
+                logger.info("✅ Product search trigger function updated")
+
+            cursor.execute("""
+                SELECT 1 as present FROM pg_trigger
+                WHERE tgname = 'trg_products_search_document'
+                  AND tgrelid = 'products'::regclass
+            """)
+            if cursor.fetchone() is None:
+                cursor.execute("""
+                    CREATE TRIGGER trg_products_search_document
+                    AFTER INSERT OR UPDATE OF name, description ON products
+                    FOR EACH ROW EXECUTE FUNCTION refresh_product_search_document()
+                """)
+                logger.info("✅ Product search trigger created")
+
+    @staticmethod
+    def init_search_indexes():
+        """Create the search documents (trigger + backfill), and the trigram index when possible"""
+        try:
+            db.execute_query("""
+                CREATE TABLE IF NOT EXISTS product_search_documents (
+                    product_id INTEGER PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+                    document TSVECTOR NOT NULL
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_product_search_documents
+                ON product_search_documents USING GIN (document);
+            """)
+            ProductSearchService._ensure_search_trigger()
+
+            # Products created before the trigger existed. Its own statement, after
+            # the DDL has committed, so it never holds a lock on products; workers
+            # running it at the same time skip each other's rows
+            db.execute_query(f"""
+                INSERT INTO product_search_documents (product_id, document)
+                SELECT p.id, {search_document_sql('p')}
+                FROM products p
+                WHERE NOT EXISTS (SELECT 1 FROM product_search_documents d WHERE d.product_id = p.id)
+                ON CONFLICT (product_id) DO NOTHING
+            """)
+            logger.info("✅ Product search documents initialized")
+        except Exception as e:
+            logger.error(f"❌ Error initializing product search documents: {e}")
+
+        try:
+            db.execute_query("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except Exception as e:
+            # Needs a role allowed to create extensions; search still works without it
+            logger.warning(f"⚠️ pg_trgm not installed ({e}), product search has no typo tolerance")
+
+        try:
+            installed = db.execute_query_one(
+                "SELECT 1 as installed FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            if installed:
+                db.execute_query("""
+                    CREATE INDEX IF NOT EXISTS idx_products_name_trgm
+                    ON products USING GIN (name gin_trgm_ops)
+                """)
+                ProductSearchService.trigram_enabled = True
+                logger.info("✅ Product trigram index initialized")
+        except Exception as e:
+            logger.error(f"❌ Error initializing product trigram index: {e}")
+
+    @staticmethod
+    def _run(source_sql, conditions, params, order_sql, limit):
+        """Product rows from `source_sql` (aliased d, joined to p) matching `conditions`"""
+        conditions = ["p.status = 'active'"] + conditions
+        # By default, exclude out-of-stock products for customers
+        if not params['include_out_of_stock']:
+            conditions.append("p.stock > 0")
+        if params['category']:
+            conditions.append("(p.category_name = %(category)s OR c.name = %(category)s)")
+
+        query = f"""
+            SELECT p.*, c.name as category_name
+            FROM {source_sql}
+            LEFT JOIN categories c ON p.category_id = c.id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {order_sql}
+        """
+        if limit:
+            query += " LIMIT %(limit)s"
+            params['limit'] = limit
+        return db.execute_query(query, params, fetch=True)
+
+    @staticmethod
+    def search(search, category=None, limit=None, include_out_of_stock=False):
+        """Matching active products, best match first"""
+        term = normalize_search(search)
+        tsquery = prefix_tsquery(term)
+        params = {
+            'term': term,
+            'pattern': f'%{term}%',
+            'tsquery': tsquery,
+            'category': category,
+            'include_out_of_stock': include_out_of_stock,
+        }
+        query_sql = f"to_tsquery('{TEXT_SEARCH_CONFIG}', %(tsquery)s)"
+
+        if ProductSearchService.trigram_enabled:
+            # Candidates from both GIN indexes, ranked on text relevance + name similarity
+            source_sql = f"""(
+                SELECT product_id as id FROM product_search_documents
+                WHERE %(tsquery)s <> '' AND document @@ {query_sql}
+                UNION
+                SELECT id FROM products
+                WHERE name ILIKE %(pattern)s OR %(term)s <%% name
+            ) m
+            JOIN products p ON p.id = m.id
+            LEFT JOIN product_search_documents d ON d.product_id = p.id"""
+            order_sql = (
+                f"COALESCE(ts_rank(d.document, {query_sql}), 0) "
+                f"+ word_similarity(%(term)s, p.name) DESC, p.id"
+            )
+            return ProductSearchService._run(source_sql, [], params, order_sql, limit)
+
+        products = []
+        if tsquery:
+            products = ProductSearchService._run(
+                "product_search_documents d JOIN products p ON p.id = d.product_id",
+                [f"d.document @@ {query_sql}"], params,
+                f"ts_rank(d.document, {query_sql}) DESC, p.id", limit
+            )
+        if not products:
+            # Mid-word fragments the full-text index can't see: legacy scan, misses only
+            products = ProductSearchService._run(
+                "products p", ["(p.name ILIKE %(pattern)s OR p.description ILIKE %(pattern)s)"],
+                params, "p.id", limit
+            )
+        return products
+
+    @staticmethod
+    def build_payload(search, category=None, limit=None, include_out_of_stock=False):
+        """Product listing payload for a search"""
+        products = ProductSearchService.search(search, category, limit, include_out_of_stock)
+        return {
+            "success": True,
+            "products": [dict(product) for product in products],
+            "count": len(products)
+        }
+
+    @staticmethod
+    def search_payload(search, category=None, limit=None, include_out_of_stock=False):
+        """Cached product listing payload for a search"""
+        term = normalize_search(search)
+        cache_key = f"search:{category or ''}:{limit or ''}:{include_out_of_stock}:{term}"
+        return search_cache.get_or_set(
+            cache_key,
+            lambda: ProductSearchService.build_payload(term, category, limit, include_out_of_stock),
+            ttl_seconds=Config.SEARCH_CACHE_SECONDS
+        )
+
+    @staticmethod
+    def invalidate():
+        """Drop cached search results after products or categories change"""
+        search_cache.invalidate()
+
+
+# Initialize indexes on module load
+try:
+    ProductSearchService.init_search_indexes()
+except Exception as e:
+    logger.error(f"Failed to initialize product search: {e}")
@@ -0,0 +1,306 @@
+"""
+Related Products Service for QuickCart
+Precomputed "customers also bought" neighbors for the product page:
+- product_co_purchases: for each ordered pair of products, how many
+  orders contained both
+- catch_up() walks orders by a (created_at, id) watermark, so each run
+  reads only orders past it (an index range scan, not every order ever
+  placed). Orders that commit late with an older created_at are picked
+  up within LATE_ORDER_WINDOW_HOURS behind the watermark;
+  co_purchase_orders remembers the orders counted in that window only
+  and is pruned as the watermark moves
+- every worker keeps each product's top neighbors in memory and reloads
+  only the products whose counts changed since its last refresh
+- related() ranks a product's neighbors by co-purchase count (a shared
+  category counts extra) and fills the remaining slots with a random
+  sample of its category from the catalog snapshot - a few picks from a
+  cached pool instead of ORDER BY RANDOM() over the whole category
+"""
+import logging
+import random
+import threading
+from datetime import timedelta
+
+from backend.utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Neighbors kept per product (requests ask for 4 by default)
+MAX_NEIGHBORS = 20
+# A shared category is worth this many co-purchases when ranking
+SAME_CATEGORY_BONUS = 1
+CATCH_UP_BATCH = 500
+# How far behind the watermark late-committing orders are still counted
+LATE_ORDER_WINDOW_HOURS = 24
+# Any constant works; it only has to be unique among advisory locks in this app
+CATCH_UP_LOCK_ID = 7303
+
+
+class RelatedProductsService:
+    """Co-purchase neighbors plus category sampling"""
+
+    # product_id -> ((related_id, order_count), ...), replaced (never mutated) on refresh
+    _neighbors = {}
+    _loaded_until = None
+    _refresh_lock = threading.Lock()
+
+    @staticmethod
+    def init_related_tables():
+        """Initialize co-purchase tables in database"""
+        try:
+            related_tables = """
+                CREATE TABLE IF NOT EXISTS product_co_purchases (
+                    product_id INTEGER NOT NULL,
+                    related_id INTEGER NOT NULL,
+                    order_count BIGINT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (product_id, related_id)
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_product_co_purchases_updated
+                ON product_co_purchases (updated_at);
+
+                CREATE TABLE IF NOT EXISTS co_purchase_orders (
+                    order_id VARCHAR(50) PRIMARY KEY
+                );
+
+                ALTER TABLE co_purchase_orders ADD COLUMN IF NOT EXISTS created_at TIMESTAMP;
+
+                CREATE INDEX IF NOT EXISTS idx_co_purchase_orders_created
+                ON co_purchase_orders (created_at);
+
+                -- Single row: the last order counted, in (created_at, id) order
+                CREATE TABLE IF NOT EXISTS co_purchase_watermark (
+                    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                    created_at TIMESTAMP NOT NULL,
+                    order_id VARCHAR(50) NOT NULL
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_orders_created_id
+                ON orders (created_at DESC, id DESC);
+            """
+            db.execute_query(related_tables)
+            logger.info("✅ Related products tables initialized")
+
+        except Exception as e:
+            logger.error(f"❌ Error initializing related products tables: {e}")
+
+    @staticmethod
+    def _watermark(cursor):
+        """(created_at, order_id) of the last counted order, or None before the first run"""
+        cursor.execute("SELECT created_at, order_id FROM co_purchase_watermark")
+        row = cursor.fetchone()
+        if row is None:
+            # Ledger from before the watermark existed: resume after its newest order
+            cursor.execute("""
+                UPDATE co_purchase_orders c SET created_at = o.created_at
+                FROM orders o
+                WHERE c.created_at IS NULL AND o.id = c.order_id;
+
+                INSERT INTO co_purchase_watermark (created_at, order_id)
+                SELECT created_at, order_id FROM co_purchase_orders
+                WHERE created_at IS NOT NULL
+                ORDER BY created_at DESC, order_id DESC
+                LIMIT 1
+                RETURNING created_at, order_id;
+            """)
+            row = cursor.fetchone()
+        return (row['created_at'], row['order_id']) if row else None
+
+    @staticmethod
+    def _count_orders(cursor, select_orders, params):
+        """
+        Add the pairs of the orders picked by `select_orders` (id, created_at)
+        and record them in the ledger; returns (orders counted, last order)
+        """
+        cursor.execute(f"CREATE TEMP TABLE co_purchase_batch ON COMMIT DROP AS {select_orders}", params)
+        cursor.execute("SELECT COUNT(*) as count FROM co_purchase_batch")
+        counted = cursor.fetchone()['count']
+        last = None
+        if counted:
+            # clock_timestamp(): later batches always sort after rows a reader already saw
+            cursor.execute("""
+                INSERT INTO product_co_purchases (product_id, related_id, order_count, updated_at)
+                SELECT a.product_id, b.product_id, COUNT(DISTINCT a.order_id), clock_timestamp()
+                FROM co_purchase_batch o
+                JOIN order_items a ON a.order_id = o.id
+                JOIN order_items b ON b.order_id = o.id AND b.product_id <> a.product_id
+                WHERE a.product_id IS NOT NULL AND b.product_id IS NOT NULL
+                GROUP BY a.product_id, b.product_id
+                ON CONFLICT (product_id, related_id) DO UPDATE SET
+                    order_count = product_co_purchases.order_count + EXCLUDED.order_count,
+                    updated_at = EXCLUDED.updated_at;
+
+                INSERT INTO co_purchase_orders (order_id, created_at)
+                SELECT id, created_at FROM co_purchase_batch;
+            """)
+            cursor.execute("""
+                SELECT created_at, id FROM co_purchase_batch
+                ORDER BY created_at DESC, id DESC
+                LIMIT 1
+            """)
+            row = cursor.fetchone()
+            last = (row['created_at'], row['id'])
+        cursor.execute("DROP TABLE co_purchase_batch")
+        return counted, last
+
+    @staticmethod
+    def _count_late_orders(cursor, watermark):
+        """Orders at or behind the watermark (within the window) that aren't counted yet"""
+        counted, _ = RelatedProductsService._count_orders(cursor, """
+            SELECT o.id, o.created_at
+            FROM orders o
+            WHERE o.created_at >= %(window_start)s
+            AND (o.created_at, o.id) <= (%(created_at)s, %(order_id)s)
+            AND NOT EXISTS (SELECT 1 FROM co_purchase_orders c WHERE c.order_id = o.id)
+        """, {
+            'window_start': watermark[0] - timedelta(hours=LATE_ORDER_WINDOW_HOURS),
+            'created_at': watermark[0],
+            'order_id': watermark[1],
+        })
+        return counted
+
+    @staticmethod
+    def _count_batch(cursor, watermark, batch_size):
+        """Add the pairs of up to `batch_size` orders past the watermark; returns (counted, new watermark)"""
+        if watermark is None:
+            where, params = "o.created_at IS NOT NULL", {}
+        else:
+            where = "(o.created_at, o.id) > (%(created_at)s, %(order_id)s)"
+            params = {'created_at': watermark[0], 'order_id': watermark[1]}
+        params['batch_size'] = batch_size
+        counted, last = RelatedProductsService._count_orders(cursor, f"""
+            SELECT o.id, o.created_at
+            FROM orders o
+            WHERE {where}
+            ORDER BY o.created_at, o.id
+            LIMIT %(batch_size)s
+        """, params)
+        if last is None:
+            return 0, watermark
+        cursor.execute("""
+            INSERT INTO co_purchase_watermark (id, created_at, order_id)
+            VALUES (TRUE, %s, %s)
+            ON CONFLICT (id) DO UPDATE SET
+                created_at = EXCLUDED.created_at,
+                order_id = EXCLUDED.order_id
+        """, last)
+        return counted, last
+
+    @staticmethod
+    def catch_up():
+        """
+        Periodic job: count the product pairs of orders placed since the last
+        run. Only one worker runs it at a time (advisory lock).
+        """
+        total = 0
+        try:
+            with db.get_cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_xact_lock(%s) as locked", (CATCH_UP_LOCK_ID,))
+                if not cursor.fetchone()['locked']:
+                    return 0
+                watermark = RelatedProductsService._watermark(cursor)
+                if watermark is not None:
+                    total += RelatedProductsService._count_late_orders(cursor, watermark)
+
+            while True:
+                with db.get_cursor() as cursor:
+                    cursor.execute("SELECT pg_try_advisory_xact_lock(%s) as locked", (CATCH_UP_LOCK_ID,))
+                    if not cursor.fetchone()['locked']:
+                        break
+                    counted, watermark = RelatedProductsService._count_batch(
+                        cursor, RelatedProductsService._watermark(cursor), CATCH_UP_BATCH
+                    )
+                total += counted
+                if counted < CATCH_UP_BATCH:
+                    break
+
+            if watermark is not None:
+                # The ledger only has to cover the late-order window
+                db.execute_query(
+                    "DELETE FROM co_purchase_orders WHERE created_at IS NULL OR created_at < %s",
+                    (watermark[0] - timedelta(hours=LATE_ORDER_WINDOW_HOURS),)
+                )
+            if total:
+                logger.info(f"✅ Co-purchase counts caught up {total} order(s)")
+        except Exception as e:
+            logger.error(f"❌ Co-purchase catch-up failed: {e}")
+        return total
+
+    @staticmethod
+    def refresh():
+        """Reload neighbors of products whose co-purchase counts changed"""
+        with RelatedProductsService._refresh_lock:
+            since = RelatedProductsService._loaded_until
+            try:
+                rows = db.execute_query("""
+                    SELECT product_id, related_id, order_count, updated_at
+                    FROM (
+                        SELECT cp.*, ROW_NUMBER() OVER (
+                            PARTITION BY cp.product_id
+                            ORDER BY cp.order_count DESC, cp.related_id
+                        ) as rank
+                        FROM product_co_purchases cp
+                        WHERE cp.product_id IN (
+                            SELECT product_id FROM product_co_purchases
+                            WHERE %(since)s::timestamp IS NULL OR updated_at > %(since)s
+                        )
+                    ) ranked
+                    WHERE rank <= %(max_neighbors)s
+                    ORDER BY product_id, rank
+                """, {'since': since, 'max_neighbors': MAX_NEIGHBORS}, fetch=True)
+            except Exception as e:
+                logger.error(f"❌ Related products refresh failed: {e}")
+                return 0
+
+            if not rows:
+                return 0
+
+            loaded = {}
+            for row in rows:
+                loaded.setdefault(row['product_id'], []).append((row['related_id'], row['order_count']))
+            neighbors = dict(RelatedProductsService._neighbors)
+            neighbors.update({product_id: tuple(items) for product_id, items in loaded.items()})
+
+            RelatedProductsService._neighbors = neighbors
+            RelatedProductsService._loaded_until = max(
+                [row['updated_at'] for row in rows] + ([since] if since else [])
+            )
+            return len(loaded)
+
+    @staticmethod
+    def related(catalog, product_id, limit=4):
+        """
+        Up to `limit` active products related to `product_id` from the
+        catalog snapshot, or None when the product isn't active.
+        """
+        product = catalog.by_id.get(product_id)
+        if product is None:
+            return None
+        limit = max(limit, 0)
+        category_id = product['category_id']
+
+        ranked = [
+            (count + (SAME_CATEGORY_BONUS if catalog.by_id[related_id]['category_id'] == category_id else 0),
+             -related_id)
+            for related_id, count in RelatedProductsService._neighbors.get(product_id, ())
+            if related_id in catalog.by_id
+        ]
+        ranked.sort(reverse=True)
+        chosen = [catalog.by_id[-negated_id] for _, negated_id in ranked[:limit]]
+
+        # Fill up from the category; sampling a few extra covers the products already picked
+        pool = catalog.by_category_id.get(category_id, ())
+        skip = {product_id} | {p['id'] for p in chosen}
+        wanted = limit - len(chosen)
+        if wanted > 0 and pool:
+            sample = random.sample(pool, min(len(pool), wanted + len(skip)))
+            chosen += [p for p in sample if p['id'] not in skip][:wanted]
+        return chosen
+
+
+# Initialize tables on module load
+try:
+    RelatedProductsService.init_related_tables()
+except Exception as e:
+    logger.error(f"Failed to initialize related products: {e}")
@@ -0,0 +1,249 @@
+"""
+Report Job Service for QuickCart
+Background report exports:
+- enqueue() returns at once; a per-process thread pool streams the rows
+  into the file (ReportExporter.write) and records progress as it goes
+- each job's state is a small JSON file next to its artifact on local
+  disk, so any gunicorn worker can answer status polls and downloads
+- the job id is a hash of the normalized report (SQL, bound params,
+  selected fields, format), so identical requests share one job and,
+  once it is done, reuse its artifact until REPORT_JOB_TTL_SECONDS pass
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.config.config import Config
+from backend.services.report_export_service import ReportExporter, FILE_EXTENSIONS, MIMETYPES
+from backend.utils.state_dir import ensure_private_dir, private_state_dir
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+ACTIVE_STATUSES = ('queued', 'running')
+JOB_STATUSES = ACTIVE_STATUSES + ('done', 'failed')
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_enqueue_lock = threading.Lock()
+
+
+def _get_executor():
+    """Thread pool for this process (recreated after a fork)"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=Config.REPORT_JOB_WORKERS, thread_name_prefix='report-job'
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+class ReportJobService:
+    """Queue, run and look up background report exports"""
+
+    PROGRESS_EVERY_ROWS = 1000
+    PROGRESS_EVERY_SECONDS = 1.0
+
+    @staticmethod
+    def job_dir():
+        """REPORT_JOB_DIR, or report_jobs/ in the private state dir (0700, owner checked)"""
+        path = Config.REPORT_JOB_DIR
+        if path:
+            os.makedirs(path, mode=0o700, exist_ok=True)
+            return path
+        return ensure_private_dir(os.path.join(private_state_dir(), 'report_jobs'))
+
+    @staticmethod
+    def job_id(report, export_format):
+        """Same report, filters, fields and format -> same id"""
+        normalized = json.dumps(
+            [report.prefix, export_format, ' '.join(report.query.split()), report.params, report.fields],
+            default=str
+        )
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:32]
+
+    @staticmethod
+    def _state_path(job_id):
+        return os.path.join(ReportJobService.job_dir(), f'{job_id}.json')
+
+    @staticmethod
+    def artifact_path(job):
+        return os.path.join(ReportJobService.job_dir(), f"{job['job_id']}.{FILE_EXTENSIONS[job['format']]}")
+
+    @staticmethod
+    def _save(job):
+        """Atomically replace the job's state file"""
+        job['updated_at'] = time.time()
+        path = ReportJobService._state_path(job['job_id'])
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _load(job_id):
+        """Job state from disk, or None if missing or not a state file this service wrote"""
+        try:
+            with open(ReportJobService._state_path(job_id)) as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # format picks the artifact's file name and mimetype, so never trust it blindly
+        if (not isinstance(job, dict) or job.get('job_id') != job_id
+                or FILE_EXTENSIONS.get(str(job.get('format'))) is None
+                or job.get('status') not in JOB_STATUSES):
+            logger.warning(f"⚠️ Ignoring invalid report job state file for {job_id}")
+            return None
+        job['mimetype'] = MIMETYPES[job['format']]
+        return job
+
+    @staticmethod
+    def get_job(job_id):
+        """
+        Current state of a job, or None if unknown or expired.
+        A queued/running job whose worker stopped updating it is reported as failed.
+        """
+        if not JOB_ID_PATTERN.match(job_id or ''):
+            return None
+
+        job = ReportJobService._load(job_id)
+        if not job:
+            return None
+
+        now = time.time()
+        if job['status'] == 'done':
+            if now > job['expires_at'] or not os.path.exists(ReportJobService.artifact_path(job)):
+                return None
+        elif job['status'] in ACTIVE_STATUSES:
+            if now - job['updated_at'] > Config.REPORT_JOB_STALE_SECONDS:
+                job['status'] = 'failed'
+                job['error'] = 'Report worker stopped responding'
+        elif now > job['expires_at']:
+            return None
+        return job
+
+    @staticmethod
+    def enqueue(report, requested_format):
+        """
+        Start a background export of `report`. Returns the existing job when
+        an identical export is already queued, running or done.
+        """
+        export_format = ReportExporter.export_format(requested_format)
+        job_id = ReportJobService.job_id(report, export_format)
+
+        with _enqueue_lock:
+            job = ReportJobService.get_job(job_id)
+            if job and job['status'] in ACTIVE_STATUSES + ('done',):
+                return job
+
+            now = time.time()
+            job = {
+                'job_id': job_id,
+                'report': report.prefix,
+                'format': export_format,
+                'status': 'queued',
+                'progress': 0,
+                'rows_done': 0,
+                'rows_total': None,
+                'filename': None,
+                'mimetype': MIMETYPES[export_format],
+                'size': None,
+                'error': None,
+                'created_at': now,
+                'finished_at': None,
+                'expires_at': None,
+            }
+            ReportJobService._save(job)
+            _get_executor().submit(ReportJobService._run, report, dict(job))
+
+        logger.info(f"📄 Report job {job_id} queued ({report.prefix}, {export_format})")
+        ReportJobService.purge_expired()
+        return job
+
+    @staticmethod
+    def _run(report, job):
+        """Worker thread: stream the report into a temp file, then publish it"""
+        artifact_path = ReportJobService.artifact_path(job)
+        tmp_path = f'{artifact_path}.{os.getpid()}.partial'
+        started = time.time()
+        try:
+            job['status'] = 'running'
+            ReportJobService._save(job)
+
+            job['rows_total'] = ReportExporter.count(report)
+            ReportJobService._save(job)
+
+            last_saved = [time.monotonic()]
+
+            def on_row(count):
+                if count % ReportJobService.PROGRESS_EVERY_ROWS:
+                    return
+                if time.monotonic() - last_saved[0] < ReportJobService.PROGRESS_EVERY_SECONDS:
+                    return
+                job['rows_done'] = count
+                # Rows may change while the export runs; 100 is reserved for done
+                job['progress'] = min(99, count * 100 // max(job['rows_total'], 1))
+                ReportJobService._save(job)
+                last_saved[0] = time.monotonic()
+
+            rows = ReportExporter.write(report, job['format'], tmp_path, on_row=on_row)
+            os.replace(tmp_path, artifact_path)
+
+            now = time.time()
+            job.update({
+                'status': 'done',
+                'progress': 100,
+                'rows_done': rows.count,
+                'filename': ReportExporter.filename(report.prefix, FILE_EXTENSIONS[job['format']]),
+                'size': os.path.getsize(artifact_path),
+                'finished_at': now,
+                'expires_at': now + Config.REPORT_JOB_TTL_SECONDS,
+            })
+            ReportJobService._save(job)
+            logger.info(
+                f"✅ Report job {job['job_id']} done: {rows.count} rows in {now - started:.1f}s"
+            )
+
+        except Exception as e:
+            logger.error(f"❌ Report job {job['job_id']} failed: {e}")
+            now = time.time()
+            job.update({
+                'status': 'failed',
+                'error': str(e),
+                'finished_at': now,
+                'expires_at': now + Config.REPORT_JOB_TTL_SECONDS,
+            })
+            ReportJobService._save(job)
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    @staticmethod
+    def purge_expired():
+        """Delete state files and artifacts of jobs past their TTL"""
+        job_dir = ReportJobService.job_dir()
+        removed = 0
+        for name in os.listdir(job_dir):
+            job_id, extension = os.path.splitext(name)
+            if extension != '.json' or not JOB_ID_PATTERN.match(job_id):
+                continue
+            job = ReportJobService._load(job_id)
+            if not job or job['status'] in ACTIVE_STATUSES or time.time() <= job['expires_at']:
+                continue
+            try:
+                if os.path.exists(ReportJobService.artifact_path(job)):
+                    os.unlink(ReportJobService.artifact_path(job))
+                os.unlink(os.path.join(job_dir, name))
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            logger.info(f"🧹 Removed {removed} expired report job(s)")
+        return removed
@@ -0,0 +1,290 @@
+"""
+Review Service for QuickCart
+Denormalized rating aggregates and cached review pages:
+- product_review_stats holds, per product, the count, rating sum and a
+  1-5 star histogram (plus verified purchases) of its approved reviews
+- every review write applies its delta in the same transaction as the
+  write itself (apply_change), so the aggregate never drifts from the
+  reviews; the table is seeded once at app startup while it is empty, and
+  rows written by scripts are reconciled with rebuild_review_stats.py
+- product pages read one aggregate row instead of AVG/COUNT over
+  product_reviews, and review lists are paginated and cached per page
+  until the product's next review write
+- summaries() returns the rating summary of many products in one query;
+  cached_summaries() serves them per product from rating_cache, so
+  overlapping product grids share entries and only misses hit the table
+"""
+import logging
+from decimal import Decimal, ROUND_HALF_UP
+
+from backend.config.config import Config
+from backend.utils.database import db
+from backend.utils.response_cache import rating_cache, response_cache
+
+logger = logging.getLogger(__name__)
+
+REVIEW_CACHE_PREFIX = "reviews:"
+RATING_CACHE_PREFIX = "rating:"
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Product ids per bulk rating request (one product grid)
+MAX_BULK_RATINGS = 200
+STAR_COLUMNS = ('one_star', 'two_star', 'three_star', 'four_star', 'five_star')
+# Any constant works; it only has to be unique among advisory locks in this app
+REBUILD_LOCK_ID = 7304
+
+
+def _empty_counts():
+    return dict.fromkeys(('review_count', 'rating_sum', 'verified_count') + STAR_COLUMNS, 0)
+
+
+def _contribution(review):
+    """What one review adds to its product's aggregate (approved reviews only)"""
+    counts = _empty_counts()
+    if review and review['status'] == 'approved':
+        counts['review_count'] = 1
+        counts['rating_sum'] = review['rating']
+        counts['verified_count'] = 1 if review['verified_purchase'] else 0
+        counts[STAR_COLUMNS[review['rating'] - 1]] = 1
+    return counts
+
+
+def format_summary(row):
+    """Aggregate row (or None) -> the stats shape the review endpoints return"""
+    row = row or _empty_counts()
+    total = row['review_count']
+    average = 0
+    if total:
+        # Same rounding as the old AVG(rating)::NUMERIC(3,1)
+        average = float((Decimal(row['rating_sum']) / total).quantize(Decimal('0.1'), ROUND_HALF_UP))
+    return {
+        'total_reviews': total,
+        'average_rating': average,
+        'rating_distribution': {
+            str(stars): row[column] for stars, column in zip(range(5, 0, -1), reversed(STAR_COLUMNS))
+        },
+        'verified_purchases': row['verified_count']
+    }
+
+
+class ReviewService:
+    """Rating aggregates and paginated review lists"""
+
+    @staticmethod
+    def init_review_tables():
+        """Initialize the rating aggregate table and the review page index"""
+        try:
+            review_tables = """
+                CREATE TABLE IF NOT EXISTS product_review_stats (
+                    product_id INTEGER PRIMARY KEY,
+                    review_count INTEGER NOT NULL DEFAULT 0,
+                    rating_sum INTEGER NOT NULL DEFAULT 0,
+                    one_star INTEGER NOT NULL DEFAULT 0,
+                    two_star INTEGER NOT NULL DEFAULT 0,
+                    three_star INTEGER NOT NULL DEFAULT 0,
+                    four_star INTEGER NOT NULL DEFAULT 0,
+                    five_star INTEGER NOT NULL DEFAULT 0,
+                    verified_count INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_reviews_product_page
+                ON product_reviews (product_id, status, created_at DESC, id DESC);
+            """
+            db.execute_query(review_tables)
+            logger.info("✅ Review stats tables initialized")
+
+        except Exception as e:
+            logger.error(f"❌ Error initializing review stats tables: {e}")
+
+    @staticmethod
+    def rebuild_stats(only_if_empty=False):
+        """
+        Recompute every aggregate from product_reviews (one worker at a time).
+        With only_if_empty, skip it unless product_review_stats has no rows.
+        """
+        try:
+            with db.get_cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_xact_lock(%s) as locked", (REBUILD_LOCK_ID,))
+                if not cursor.fetchone()['locked']:
+                    return False
+                # Blocks incremental writers until the rebuild commits
+                cursor.execute("LOCK TABLE product_review_stats IN EXCLUSIVE MODE")
+                if only_if_empty:
+                    cursor.execute("SELECT EXISTS (SELECT 1 FROM product_review_stats) as seeded")
+                    if cursor.fetchone()['seeded']:
+                        return False
+                cursor.execute("""
+                    TRUNCATE product_review_stats;
+
+                    INSERT INTO product_review_stats
+                        (product_id, review_count, rating_sum, one_star, two_star,
+                         three_star, four_star, five_star, verified_count)
+                    SELECT product_id, COUNT(*), SUM(rating),
+                           COUNT(*) FILTER (WHERE rating = 1),
+                           COUNT(*) FILTER (WHERE rating = 2),
+                           COUNT(*) FILTER (WHERE rating = 3),
+                           COUNT(*) FILTER (WHERE rating = 4),
+                           COUNT(*) FILTER (WHERE rating = 5),
+                           COUNT(*) FILTER (WHERE verified_purchase)
+                    FROM product_reviews
+                    WHERE status = 'approved' AND product_id IS NOT NULL
+                    GROUP BY product_id;
+                """)
+            response_cache.invalidate(REVIEW_CACHE_PREFIX)
+            rating_cache.invalidate(RATING_CACHE_PREFIX)
+            logger.info("✅ Review stats rebuilt")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Review stats rebuild failed: {e}")
+            return False
+
+    @staticmethod
+    def seed_stats():
+        """
+        Build the aggregates when product_review_stats is still empty (just
+        created) but approved reviews exist. A filled table is left alone:
+        writes keep it current, so no worker rebuilds it on boot.
+        """
+        try:
+            row = db.execute_query_one("""
+                SELECT NOT EXISTS (SELECT 1 FROM product_review_stats) as empty,
+                       EXISTS (
+                           SELECT 1 FROM product_reviews
+                           WHERE status = 'approved' AND product_id IS NOT NULL
+                       ) as has_reviews
+            """)
+        except Exception as e:
+            logger.error(f"❌ Review stats check failed: {e}")
+            return False
+        if not (row and row['empty'] and row['has_reviews']):
+            return False
+        return ReviewService.rebuild_stats(only_if_empty=True)
+
+    @staticmethod
+    def lock_review(cursor, review_id, user_id=None):
+        """Current row of a review, locked for the rest of the transaction"""
+        query = "SELECT * FROM product_reviews WHERE id = %s"
+        params = [review_id]
+        if user_id is not None:
+            query += " AND user_id = %s"
+            params.append(user_id)
+        cursor.execute(query + " FOR UPDATE", params)
+        return cursor.fetchone()
+
+    @staticmethod
+    def apply_change(cursor, old, new):
+        """
+        Move a product's aggregate from review state `old` to `new` (either
+        may be None for inserts / deletes). Call in the write's transaction.
+        """
+        review = new or old
+        if not review or review['product_id'] is None:
+            return
+        before, after = _contribution(old), _contribution(new)
+        delta = {column: after[column] - before[column] for column in after}
+        if not any(delta.values()):
+            return
+
+        columns = list(delta)
+        cursor.execute(f"""
+            INSERT INTO product_review_stats (product_id, {', '.join(columns)})
+            VALUES (%s, {', '.join(['%s'] * len(columns))})
+            ON CONFLICT (product_id) DO UPDATE SET
+                {', '.join(f'{c} = product_review_stats.{c} + EXCLUDED.{c}' for c in columns)},
+                updated_at = CURRENT_TIMESTAMP
+        """, [review['product_id']] + [delta[c] for c in columns])
+
+    @staticmethod
+    def summaries(product_ids):
+        """{product_id: summary} for every id, from one aggregate query"""
+        product_ids = sorted(set(product_ids))
+        if not product_ids:
+            return {}
+        rows = db.execute_query(
+            "SELECT * FROM product_review_stats WHERE product_id = ANY(%s)",
+            (product_ids,), fetch=True
+        )
+        found = {row['product_id']: row for row in rows}
+        return {product_id: format_summary(found.get(product_id)) for product_id in product_ids}
+
+    @staticmethod
+    def cached_summaries(product_ids):
+        """summaries() through the per-product rating cache (one read, one query for misses)"""
+        product_ids = sorted(set(product_ids))
+        keys = {product_id: f"{RATING_CACHE_PREFIX}{product_id}" for product_id in product_ids}
+        cached = rating_cache.get_many(keys.values())
+
+        result = {}
+        missing = []
+        for product_id in product_ids:
+            summary = cached.get(keys[product_id])
+            if summary is None:
+                missing.append(product_id)
+            else:
+                result[product_id] = summary
+
+        if missing:
+            loaded = ReviewService.summaries(missing)
+            rating_cache.set_many(
+                {keys[product_id]: summary for product_id, summary in loaded.items()},
+                ttl_seconds=Config.RATING_CACHE_SECONDS
+            )
+            result.update(loaded)
+        return result
+
+    @staticmethod
+    def page_payload(product_id, limit=DEFAULT_PAGE_SIZE, offset=0):
+        """Cached page of a product's approved reviews, newest first"""
+        limit = min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+        offset = max(offset or 0, 0)
+
+        def build_payload():
+            reviews = db.execute_query("""
+                SELECT
+                    r.id, r.product_id, r.user_id, r.user_name, r.rating,
+                    r.comment, r.verified_purchase, r.helpful_count,
+                    r.status, r.created_at,
+                    p.name as product_name
+                FROM product_reviews r
+                LEFT JOIN products p ON r.product_id = p.id
+                WHERE r.product_id = %s AND r.status = 'approved'
+                ORDER BY r.created_at DESC, r.id DESC
+                LIMIT %s OFFSET %s
+            """, (product_id, limit, offset), fetch=True)
+            summary = ReviewService.cached_summaries([product_id])[product_id]
+            total = summary['total_reviews']
+            return {
+                'success': True,
+                'reviews': [dict(review) for review in reviews],
+                'stats': {
+                    'average_rating': summary['average_rating'],
+                    'total_reviews': total
+                },
+                'pagination': {
+                    'limit': limit,
+                    'offset': offset,
+                    'total': total,
+                    'has_more': offset + len(reviews) < total
+                }
+            }
+
+        return response_cache.get_or_set(
+            f"{REVIEW_CACHE_PREFIX}{product_id}:page:{limit}:{offset}",
+            build_payload,
+            ttl_seconds=Config.REVIEW_CACHE_SECONDS
+        )
+
+    @staticmethod
+    def invalidate(product_id):
+        """Drop a product's cached review pages and rating (call after the write commits)"""
+        response_cache.invalidate(f"{REVIEW_CACHE_PREFIX}{product_id}:")
+        rating_cache.delete(f"{RATING_CACHE_PREFIX}{product_id}")
+
+
+# Initialize tables on module load (seed_stats() runs once at app startup)
+try:
+    ReviewService.init_review_tables()
+except Exception as e:
+    logger.error(f"Failed to initialize review service: {e}")
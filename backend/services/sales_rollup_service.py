@@ -0,0 +1,367 @@
+"""
+Sales Rollup Service for QuickCart
+Small, incrementally maintained aggregate tables behind the analytics
+dashboard, so its cost tracks the number of days/products rather than
+the number of orders ever placed:
+- sales_daily_status:   orders and revenue per (day, status)
+- sales_daily_product:  orders, lines, units, revenue per (day, product, status)
+- sales_daily_category: orders, units, revenue per (day, category, status)
+- sales_rollup_orders:  what each order currently contributes, so a status
+  change (or a deleted order) can be moved/removed exactly
+apply_orders() runs inside the create_order / update_order_status
+transaction; catch_up() runs periodically to pick up anything changed
+outside those paths (and does a full rebuild when far behind).
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from psycopg2.extras import Json, execute_values
+
+from backend.services.sales_series_service import SalesSeriesService
+from backend.utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Orders out of sync beyond this are rebuilt set-based instead of one by one
+REBUILD_THRESHOLD = 5000
+CATCH_UP_BATCH = 500
+# Any constant works; it only has to be unique among advisory locks in this app
+CATCH_UP_LOCK_ID = 7301
+
+
+class SalesRollupService:
+    """Incremental daily sales aggregates"""
+
+    @staticmethod
+    def init_rollup_tables():
+        """Initialize sales rollup tables in database"""
+        try:
+            rollup_tables = """
+                CREATE TABLE IF NOT EXISTS sales_daily_status (
+                    day DATE NOT NULL,
+                    status VARCHAR(50) NOT NULL,
+                    order_count BIGINT NOT NULL DEFAULT 0,
+                    revenue NUMERIC(14,2) NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, status)
+                );
+
+                CREATE TABLE IF NOT EXISTS sales_daily_product (
+                    day DATE NOT NULL,
+                    product_id INTEGER NOT NULL,
+                    status VARCHAR(50) NOT NULL,
+                    order_count BIGINT NOT NULL DEFAULT 0,
+                    line_count BIGINT NOT NULL DEFAULT 0,
+                    units_sold BIGINT NOT NULL DEFAULT 0,
+                    revenue NUMERIC(14,2) NOT NULL DEFAULT 0,
+                    price_sum NUMERIC(14,2) NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, product_id, status)
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_sales_daily_product_product
+                ON sales_daily_product (product_id);
+
+                CREATE TABLE IF NOT EXISTS sales_daily_category (
+                    day DATE NOT NULL,
+                    category_id INTEGER NOT NULL,
+                    status VARCHAR(50) NOT NULL,
+                    order_count BIGINT NOT NULL DEFAULT 0,
+                    units_sold BIGINT NOT NULL DEFAULT 0,
+                    revenue NUMERIC(14,2) NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, category_id, status)
+                );
+
+                CREATE TABLE IF NOT EXISTS sales_rollup_orders (
+                    order_id VARCHAR(50) PRIMARY KEY,
+                    day DATE NOT NULL,
+                    status VARCHAR(50) NOT NULL,
+                    total NUMERIC(12,2) NOT NULL DEFAULT 0,
+                    -- [[product_id, category_id, units, revenue, price_sum, line_count], ...]
+                    lines JSONB NOT NULL DEFAULT '[]'
+                );
+            """
+            db.execute_query(rollup_tables)
+            logger.info("✅ Sales rollup tables initialized")
+
+        except Exception as e:
+            logger.error(f"❌ Error initializing sales rollup tables: {e}")
+
+    # ---------- incremental maintenance ----------
+
+    @staticmethod
+    def _order_lines(cursor, order_ids):
+        """Per-product line aggregates for orders not yet in the ledger"""
+        if not order_ids:
+            return {}
+        cursor.execute("""
+            SELECT oi.order_id, oi.product_id, p.category_id,
+                   SUM(oi.quantity) as units,
+                   SUM(oi.total_price) as revenue,
+                   SUM(oi.product_price) as price_sum,
+                   COUNT(*) as line_count
+            FROM order_items oi
+            LEFT JOIN products p ON p.id = oi.product_id
+            WHERE oi.order_id = ANY(%s) AND oi.product_id IS NOT NULL
+            GROUP BY oi.order_id, oi.product_id, p.category_id
+        """, (list(order_ids),))
+        lines = defaultdict(list)
+        for row in cursor.fetchall():
+            lines[row['order_id']].append([
+                row['product_id'], row['category_id'], int(row['units']),
+                str(row['revenue']), str(row['price_sum']), int(row['line_count'])
+            ])
+        return lines
+
+    @staticmethod
+    def _add_contribution(deltas, day, status, total, lines, sign):
+        status_deltas, product_deltas, category_deltas = deltas
+
+        entry = status_deltas[(day, status)]
+        entry[0] += sign
+        entry[1] += sign * Decimal(str(total))
+
+        categories = defaultdict(lambda: [0, Decimal('0')])
+        for product_id, category_id, units, revenue, price_sum, line_count in lines:
+            revenue = Decimal(str(revenue))
+            entry = product_deltas[(day, product_id, status)]
+            entry[0] += sign
+            entry[1] += sign * line_count
+            entry[2] += sign * units
+            entry[3] += sign * revenue
+            entry[4] += sign * Decimal(str(price_sum))
+            if category_id is not None:
+                categories[category_id][0] += units
+                categories[category_id][1] += revenue
+
+        for category_id, (units, revenue) in categories.items():
+            entry = category_deltas[(day, category_id, status)]
+            entry[0] += sign
+            entry[1] += sign * units
+            entry[2] += sign * revenue
+
+    @staticmethod
+    def apply_orders(cursor, order_ids):
+        """
+        Bring the rollups in line with the current state of `order_ids`
+        (new orders, status changes, deleted orders). Idempotent; call it in
+        the same transaction as the change so both commit together.
+        """
+        order_ids = sorted(set(order_ids))
+        if not order_ids:
+            return 0
+
+        # Serialize concurrent syncs of the same order (sorted: no deadlocks)
+        cursor.execute("""
+            SELECT pg_advisory_xact_lock(hashtext('sales_rollup:' || id))
+            FROM unnest(%s::text[]) as id ORDER BY id
+        """, (order_ids,))
+
+        cursor.execute(
+            "SELECT * FROM sales_rollup_orders WHERE order_id = ANY(%s)", (order_ids,)
+        )
+        previous = {row['order_id']: row for row in cursor.fetchall()}
+
+        cursor.execute("""
+            SELECT id, created_at::date as day, status, COALESCE(total, 0) as total
+            FROM orders WHERE id = ANY(%s)
+        """, (order_ids,))
+        current = {row['id']: row for row in cursor.fetchall()}
+
+        # Items never change after checkout, so recorded lines are reused
+        new_lines = SalesRollupService._order_lines(cursor, [i for i in current if i not in previous])
+
+        deltas = (
+            defaultdict(lambda: [0, Decimal('0')]),
+            defaultdict(lambda: [0, 0, 0, Decimal('0'), Decimal('0')]),
+            defaultdict(lambda: [0, 0, Decimal('0')]),
+        )
+        ledger_upserts = []
+        ledger_deletes = []
+
+        for order_id in order_ids:
+            old = previous.get(order_id)
+            new = current.get(order_id)
+            if old and new and (old['day'], old['status'], old['total']) == (new['day'], new['status'], new['total']):
+                continue
+
+            lines = old['lines'] if old else new_lines.get(order_id, [])
+            if old:
+                SalesRollupService._add_contribution(deltas, old['day'], old['status'], old['total'], lines, -1)
+            if new:
+                SalesRollupService._add_contribution(deltas, new['day'], new['status'], new['total'], lines, 1)
+                ledger_upserts.append((order_id, new['day'], new['status'], new['total'], Json(lines)))
+            else:
+                ledger_deletes.append(order_id)
+
+        status_deltas, product_deltas, category_deltas = deltas
+        if status_deltas:
+            execute_values(cursor, """
+                INSERT INTO sales_daily_status (day, status, order_count, revenue)
+                VALUES %s
+                ON CONFLICT (day, status) DO UPDATE SET
+                    order_count = sales_daily_status.order_count + EXCLUDED.order_count,
+                    revenue = sales_daily_status.revenue + EXCLUDED.revenue
+            """, [key + tuple(v) for key, v in sorted(status_deltas.items())])
+        if product_deltas:
+            execute_values(cursor, """
+                INSERT INTO sales_daily_product
+                    (day, product_id, status, order_count, line_count, units_sold, revenue, price_sum)
+                VALUES %s
+                ON CONFLICT (day, product_id, status) DO UPDATE SET
+                    order_count = sales_daily_product.order_count + EXCLUDED.order_count,
+                    line_count = sales_daily_product.line_count + EXCLUDED.line_count,
+                    units_sold = sales_daily_product.units_sold + EXCLUDED.units_sold,
+                    revenue = sales_daily_product.revenue + EXCLUDED.revenue,
+                    price_sum = sales_daily_product.price_sum + EXCLUDED.price_sum
+            """, [key + tuple(v) for key, v in sorted(product_deltas.items())])
+        if category_deltas:
+            execute_values(cursor, """
+                INSERT INTO sales_daily_category (day, category_id, status, order_count, units_sold, revenue)
+                VALUES %s
+                ON CONFLICT (day, category_id, status) DO UPDATE SET
+                    order_count = sales_daily_category.order_count + EXCLUDED.order_count,
+                    units_sold = sales_daily_category.units_sold + EXCLUDED.units_sold,
+                    revenue = sales_daily_category.revenue + EXCLUDED.revenue
+            """, [key + tuple(v) for key, v in sorted(category_deltas.items())])
+
+        if ledger_upserts:
+            execute_values(cursor, """
+                INSERT INTO sales_rollup_orders (order_id, day, status, total, lines)
+                VALUES %s
+                ON CONFLICT (order_id) DO UPDATE SET
+                    day = EXCLUDED.day, status = EXCLUDED.status,
+                    total = EXCLUDED.total, lines = EXCLUDED.lines
+            """, ledger_upserts)
+        if ledger_deletes:
+            cursor.execute("DELETE FROM sales_rollup_orders WHERE order_id = ANY(%s)", (ledger_deletes,))
+
+        return len(ledger_upserts) + len(ledger_deletes)
+
+    @staticmethod
+    def apply_orders_safely(cursor, order_ids):
+        """
+        apply_orders() inside a savepoint: a rollup failure is logged and left
+        to catch_up() instead of failing the order write it rides along with.
+        """
+        cursor.execute("SAVEPOINT sales_rollup")
+        try:
+            SalesRollupService.apply_orders(cursor, order_ids)
+            cursor.execute("RELEASE SAVEPOINT sales_rollup")
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT sales_rollup")
+            logger.error(f"❌ Sales rollup update failed for {order_ids}: {e}")
+
+    # ---------- catch-up ----------
+
+    @staticmethod
+    def pending_order_ids(cursor, limit):
+        """Orders whose rollup contribution is missing, outdated or orphaned"""
+        cursor.execute("""
+            (SELECT o.id
+             FROM orders o
+             LEFT JOIN sales_rollup_orders r ON r.order_id = o.id
+             WHERE r.order_id IS NULL
+                OR r.status <> o.status
+                OR r.total <> COALESCE(o.total, 0)
+                OR r.day <> o.created_at::date
+             LIMIT %s)
+            UNION ALL
+            (SELECT r.order_id
+             FROM sales_rollup_orders r
+             WHERE NOT EXISTS (SELECT 1 FROM orders o WHERE o.id = r.order_id)
+             LIMIT %s)
+        """, (limit, limit))
+        return [row['id'] for row in cursor.fetchall()]
+
+    @staticmethod
+    def rebuild(cursor):
+        """Recompute every rollup from orders / order_items (set-based)"""
+        # Blocks incremental writers until the rebuild commits
+        cursor.execute("LOCK TABLE sales_rollup_orders IN EXCLUSIVE MODE")
+        cursor.execute("""
+            TRUNCATE sales_daily_status, sales_daily_product, sales_daily_category, sales_rollup_orders;
+
+            CREATE TEMP TABLE rollup_lines ON COMMIT DROP AS
+            SELECT oi.order_id, oi.product_id, p.category_id,
+                   SUM(oi.quantity) as units,
+                   SUM(oi.total_price) as revenue,
+                   SUM(oi.product_price) as price_sum,
+                   COUNT(*) as line_count
+            FROM order_items oi
+            LEFT JOIN products p ON p.id = oi.product_id
+            WHERE oi.product_id IS NOT NULL
+            GROUP BY oi.order_id, oi.product_id, p.category_id;
+
+            INSERT INTO sales_daily_status (day, status, order_count, revenue)
+            SELECT created_at::date, status, COUNT(*), COALESCE(SUM(total), 0)
+            FROM orders
+            GROUP BY 1, 2;
+
+            INSERT INTO sales_daily_product
+                (day, product_id, status, order_count, line_count, units_sold, revenue, price_sum)
+            SELECT o.created_at::date, l.product_id, o.status,
+                   COUNT(*), SUM(l.line_count), SUM(l.units), SUM(l.revenue), SUM(l.price_sum)
+            FROM rollup_lines l
+            JOIN orders o ON o.id = l.order_id
+            GROUP BY 1, 2, 3;
+
+            INSERT INTO sales_daily_category (day, category_id, status, order_count, units_sold, revenue)
+            SELECT o.created_at::date, l.category_id, o.status,
+                   COUNT(DISTINCT o.id), SUM(l.units), SUM(l.revenue)
+            FROM rollup_lines l
+            JOIN orders o ON o.id = l.order_id
+            WHERE l.category_id IS NOT NULL
+            GROUP BY 1, 2, 3;
+
+            INSERT INTO sales_rollup_orders (order_id, day, status, total, lines)
+            SELECT o.id, o.created_at::date, o.status, COALESCE(o.total, 0),
+                   COALESCE(
+                       JSONB_AGG(JSONB_BUILD_ARRAY(
+                           l.product_id, l.category_id, l.units,
+                           l.revenue::text, l.price_sum::text, l.line_count
+                       )) FILTER (WHERE l.order_id IS NOT NULL),
+                       '[]'::jsonb
+                   )
+            FROM orders o
+            LEFT JOIN rollup_lines l ON l.order_id = o.id
+            GROUP BY o.id;
+        """)
+
+    @staticmethod
+    def catch_up():
+        """
+        Periodic job: sync orders changed outside the incremental paths.
+        Only one worker runs it at a time (advisory lock).
+        """
+        try:
+            with db.get_cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_xact_lock(%s) as locked", (CATCH_UP_LOCK_ID,))
+                if not cursor.fetchone()['locked']:
+                    return 0
+
+                pending = SalesRollupService.pending_order_ids(cursor, REBUILD_THRESHOLD + 1)
+                if len(pending) > REBUILD_THRESHOLD:
+                    logger.info("🔄 Sales rollups far behind, rebuilding from orders...")
+                    SalesRollupService.rebuild(cursor)
+                    logger.info("✅ Sales rollups rebuilt")
+                else:
+                    for start in range(0, len(pending), CATCH_UP_BATCH):
+                        SalesRollupService.apply_orders(cursor, pending[start:start + CATCH_UP_BATCH])
+                    if pending:
+                        logger.info(f"✅ Sales rollups caught up {len(pending)} order(s)")
+
+            # Committed: cached series built from the old rollup rows are stale
+            if pending:
+                SalesSeriesService.invalidate()
+            return len(pending)
+
+        except Exception as e:
+            logger.error(f"❌ Sales rollup catch-up failed: {e}")
+            return 0
+
+
+# Initialize tables on module load
+try:
+    SalesRollupService.init_rollup_tables()
+except Exception as e:
+    logger.error(f"Failed to initialize sales rollups: {e}")
@@ -0,0 +1,150 @@
+"""
+Sales Series Service for QuickCart
+Bucketed order/revenue time series for the admin charts:
+- any date range and any bucket size (N days, N weeks, N calendar months)
+- read from the sales_daily_status rollup (one row per day and status),
+  so a year of orders is a few hundred rows, not a scan of orders
+- buckets come from generate_series, so empty buckets are returned as
+  zeros instead of being dropped
+- results are cached per (range, bucket) until the next order is written
+  (invalidate() is called after order writes and rollup catch-up)
+"""
+import logging
+import re
+from datetime import date, datetime, timedelta
+
+from backend.config.config import Config
+from backend.utils.database import db
+from backend.utils.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+SERIES_CACHE_PREFIX = "analytics:series:"
+MAX_BUCKETS = 1000
+SPAN_PATTERN = re.compile(r'^(\d{1,4})([dwmy])$')
+
+
+class InvalidSeriesError(ValueError):
+    """Raised for an unparseable or oversized range / bucket"""
+
+
+def _parse_span(value, what):
+    """'7d' / '2w' / '3m' / '1y' -> (count, 'day'|'month')"""
+    match = SPAN_PATTERN.match((value or '').strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise InvalidSeriesError(f"Invalid {what} '{value}' (use e.g. 7d, 2w, 1m, 1y)")
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == 'w':
+        return count * 7, 'day'
+    if unit == 'y':
+        return count * 12, 'month'
+    return count, 'day' if unit == 'd' else 'month'
+
+
+def _add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _parse_date(value, what):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise InvalidSeriesError(f"Invalid {what} date '{value}' (use YYYY-MM-DD)")
+
+
+class SalesSeriesService:
+    """Gap-filled sales time series over the daily rollup"""
+
+    @staticmethod
+    def resolve(range_value='30d', bucket='1d', start=None, end=None):
+        """
+        Normalize a request into (start, end, bucket_size, bucket_unit).
+        The range ends today unless `end` is given; `start` overrides it.
+        Month buckets start on the first of a month.
+        """
+        bucket_size, bucket_unit = _parse_span(bucket, 'bucket')
+        end_date = _parse_date(end, 'end') if end else date.today()
+
+        if start:
+            start_date = _parse_date(start, 'start')
+        else:
+            range_size, range_unit = _parse_span(range_value, 'range')
+            if range_unit == 'day':
+                start_date = end_date - timedelta(days=range_size - 1)
+            else:
+                start_date = _add_months(end_date, -(range_size - 1))
+
+        if bucket_unit == 'month':
+            start_date = start_date.replace(day=1)
+        if start_date > end_date:
+            raise InvalidSeriesError("start must not be after end")
+
+        if bucket_unit == 'day':
+            buckets = (end_date - start_date).days // bucket_size + 1
+        else:
+            months = (end_date.year - start_date.year) * 12 + end_date.month - start_date.month
+            buckets = months // bucket_size + 1
+        if buckets > MAX_BUCKETS:
+            raise InvalidSeriesError(f"Too many buckets ({buckets}); max is {MAX_BUCKETS}")
+
+        return start_date, end_date, bucket_size, bucket_unit
+
+    @staticmethod
+    def _query(start_date, end_date, bucket_size, bucket_unit):
+        """One bucket per generate_series step, rollup days hashed into their bucket"""
+        if bucket_unit == 'day':
+            step = f'{bucket_size} days'
+            bucket_of_day = "%(start)s::date + ((day - %(start)s::date) / %(size)s) * %(size)s"
+        else:
+            step = f'{bucket_size} months'
+            bucket_of_day = """(%(start)s::date + MAKE_INTERVAL(months => (
+                (EXTRACT(YEAR FROM day)::int * 12 + EXTRACT(MONTH FROM day)::int)
+                - (EXTRACT(YEAR FROM %(start)s::date)::int * 12 + EXTRACT(MONTH FROM %(start)s::date)::int)
+            ) / %(size)s * %(size)s))::date"""
+
+        query = f"""
+            SELECT
+                b.bucket_start::date as bucket_start,
+                LEAST((b.bucket_start + %(step)s::interval - INTERVAL '1 day')::date, %(end)s::date) as bucket_end,
+                COALESCE(t.order_count, 0) as order_count,
+                COALESCE(t.revenue, 0) as revenue
+            FROM generate_series(%(start)s::date, %(end)s::date, %(step)s::interval) as b(bucket_start)
+            LEFT JOIN (
+                SELECT
+                    {bucket_of_day} as bucket_start,
+                    SUM(order_count) as order_count,
+                    SUM(revenue) as revenue
+                FROM sales_daily_status
+                WHERE day BETWEEN %(start)s AND %(end)s
+                AND status != 'cancelled'
+                GROUP BY 1
+            ) t ON t.bucket_start = b.bucket_start::date
+            ORDER BY b.bucket_start
+        """
+        params = {'start': start_date, 'end': end_date, 'size': bucket_size, 'step': step}
+        rows = db.execute_query(query, params, fetch=True)
+        return [
+            {
+                'start': row['bucket_start'].isoformat(),
+                'end': row['bucket_end'].isoformat(),
+                'orderCount': int(row['order_count']),
+                'revenue': float(row['revenue'])
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def series(start_date, end_date, bucket_size, bucket_unit):
+        """Cached series for an already resolved request"""
+        cache_key = f"{SERIES_CACHE_PREFIX}{start_date}:{end_date}:{bucket_size}{bucket_unit[0]}"
+        return response_cache.get_or_set(
+            cache_key,
+            lambda: SalesSeriesService._query(start_date, end_date, bucket_size, bucket_unit),
+            ttl_seconds=Config.SALES_SERIES_CACHE_SECONDS
+        )
+
+    @staticmethod
+    def invalidate():
+        """Drop cached series after orders are created, change status or are caught up"""
+        response_cache.invalidate(SERIES_CACHE_PREFIX)
@@ -1,13 +1,24 @@
 """
 Authentication Middleware for QuickCart
 Implements JWT token-based authentication and authorization
+Hot path caches (hit/miss counters reported by /health):
+- verified token claims, per process, keyed by token digest until `exp`
+- the user's id / name / phone / role / status, per process for
+  AUTH_USER_CACHE_SECONDS (never on disk); invalidate_auth_user() drops
+  the calling worker's copy after a user's row changes, other workers
+  pick the change up within the TTL
 """
 from functools import wraps
 from flask import request, jsonify
+import hashlib
 import jwt
 import os
+import threading
+import time
 from datetime import datetime, timedelta
+from backend.config.config import Config
 from backend.utils.database import db
+from backend.utils.cache_backends import MemoryCacheBackend
 
 # 🔒 SECURITY: Enforce JWT secret key (no default in production)
 SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
@@ -22,6 +33,37 @@ if not SECRET_KEY:
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRY_HOURS = 24 * 7  # 7 days
 
+# Only what the decorators check and the routes read from current_user
+AUTH_USER_COLUMNS = "id, name, phone, role, status"
+
+# Claims of tokens that already passed signature/expiry checks (never failures)
+_claims_cache = MemoryCacheBackend(max_items=Config.AUTH_TOKEN_CACHE_SIZE)
+_users_cache = MemoryCacheBackend(max_items=Config.AUTH_USER_CACHE_SIZE)
+
+# Per-process counters, reported by /health
+_stats_lock = threading.Lock()
+_stats = {
+    'token_hits': 0,
+    'token_misses': 0,
+    'user_hits': 0,
+    'user_misses': 0,
+}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_auth_cache_stats():
+    """Snapshot of the token / user cache counters for this worker"""
+    with _stats_lock:
+        stats = dict(_stats)
+    for kind in ('token', 'user'):
+        lookups = stats[f'{kind}_hits'] + stats[f'{kind}_misses']
+        stats[f'{kind}_hit_rate'] = round(stats[f'{kind}_hits'] / lookups, 4) if lookups else None
+    return stats
+
 def generate_token(user_data):
     """Generate JWT token for authenticated user"""
     # Check if user is admin based on 'role' field or 'is_admin' field
@@ -46,13 +88,45 @@ def verify_token(token):
         if token.startswith('Bearer '):
             token = token[7:]
         
+        digest = hashlib.sha256(token.encode('utf-8')).hexdigest()
+        payload = _claims_cache.get(digest)
+        if payload is not None:
+            _count('token_hits')
+            return {'success': True, 'data': payload}
+        _count('token_misses')
+        
         payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        # Cached entry expires with the token itself
+        ttl_seconds = payload.get('exp', 0) - time.time()
+        if ttl_seconds > 0:
+            _claims_cache.set(digest, payload, ttl_seconds=ttl_seconds)
         return {'success': True, 'data': payload}
     except jwt.ExpiredSignatureError:
         return {'success': False, 'error': 'Token has expired'}
     except jwt.InvalidTokenError:
         return {'success': False, 'error': 'Invalid token'}
 
+def get_auth_user(user_id):
+    """AUTH_USER_COLUMNS of the user (any status) for an authenticated request, or None"""
+    user = _users_cache.get(user_id)
+    if user is not None:
+        _count('user_hits')
+        return user
+    _count('user_misses')
+    
+    row = db.execute_query_one(
+        f"SELECT {AUTH_USER_COLUMNS} FROM users WHERE id = %s", (user_id,), prepared=True
+    )
+    if not row:
+        return None
+    user = dict(row)
+    _users_cache.set(user_id, user, ttl_seconds=Config.AUTH_USER_CACHE_SECONDS)
+    return user
+
+def invalidate_auth_user(user_id):
+    """Drop this worker's cached user after their role, status or profile changes"""
+    _users_cache.delete(user_id)
+
 def token_required(f):
     """Decorator to protect routes requiring authentication"""
     @wraps(f)
@@ -78,12 +152,11 @@ def token_required(f):
                 'error': result['error']
             }), 401
         
-        # Get current user from database
+        # Get current user (cached row)
         try:
-            user_query = "SELECT * FROM users WHERE id = %s AND status = 'active'"
-            current_user = db.execute_query_one(user_query, (result['data']['user_id'],))
+            current_user = get_auth_user(result['data']['user_id'])
             
-            if not current_user:
+            if not current_user or current_user.get('status') != 'active':
                 return jsonify({
                     'success': False,
                     'error': 'User not found or inactive'
@@ -152,21 +225,16 @@ def admin_required(f):
                 }
                 return f(admin_user, *args, **kwargs)
             
-            # Verify from database for other users
-            user_check_query = "SELECT id, name, role, status FROM users WHERE id = %s"
-            user_result = db.execute_query(user_check_query, (user_id,), fetch=True)
-            
-            print(f"🔍 Database query result: {user_result}")
+            # Verify from database (cached row) for other users
+            user_data = get_auth_user(user_id)
             
-            if not user_result or len(user_result) == 0:
+            if not user_data:
                 print(f"❌ User not found in database")
                 return jsonify({
                     'success': False,
                     'error': 'User not found'
                 }), 403
             
-            user_data = user_result[0]
-            
             if user_data.get('status') != 'active':
                 print(f"❌ User is not active: {user_data.get('status')}")
                 return jsonify({
@@ -207,9 +275,9 @@ def optional_auth(f):
             
             if result['success']:
                 try:
-                    user_query = "SELECT * FROM users WHERE id = %s AND status = 'active'"
-                    current_user = db.execute_query_one(user_query, (result['data']['user_id'],))
-                    current_user = dict(current_user) if current_user else None
+                    current_user = get_auth_user(result['data']['user_id'])
+                    if current_user and current_user.get('status') != 'active':
+                        current_user = None
                 except:
                     current_user = None
         
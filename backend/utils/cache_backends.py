@@ -0,0 +1,486 @@
+"""
+Storage backends for ResponseCache.
+
+- MemoryCacheBackend: per-process LRU store (the stand-in used for tests
+  and single-process runs)
+- SQLiteCacheBackend: one WAL-mode SQLite file shared by every gunicorn
+  worker on the node, so payloads are stored once per node and an
+  invalidate() from any worker is seen by all of them
+
+Every backend implements get / set / get_many / set_many / delete /
+invalidate / purge_expired.
+Values handed back by get() are always private copies, so callers may
+mutate them freely.
+
+The SQLite store keeps values as JSON, never pickle: whoever can write the
+file must not be able to run code in the workers. Types JSON lacks
+(Decimal, dates, tuples, non-string dict keys, classes registered with
+register_cache_type) are stored as tagged objects. Byte strings are not
+put in the JSON at all: a value holding any is stored as a BLOB of the
+JSON header followed by the raw bytes it refers to.
+"""
+import copy
+import datetime
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from functools import partial
+
+from backend.utils.state_dir import private_state_dir
+
+logger = logging.getLogger(__name__)
+
+_TYPE_TAG = '__cache_type__'
+# tag -> class; classes provide __getstate__ / __setstate__
+_cache_types = {}
+_cache_type_names = {}
+# Length prefix of the JSON header and of each raw byte string in a BLOB value
+_BLOB_LENGTH = struct.Struct('>I')
+
+
+def default_cache_path(name='response_cache'):
+    """File in the per-user private state dir (shared by all workers of that user)"""
+    return os.path.join(private_state_dir(), f'{name}.sqlite3')
+
+
+def register_cache_type(name, cls):
+    """Allow instances of `cls` in the SQLite store (saved via __getstate__ / __setstate__)"""
+    _cache_types[name] = cls
+    _cache_type_names[cls] = name
+
+
+def _tagged(tag, value):
+    return {_TYPE_TAG: tag, 'value': value}
+
+
+def _to_json(value, blobs):
+    """
+    JSON-safe form of a cache value; byte strings are appended to `blobs`
+    and referenced by index. Raises TypeError for anything unknown.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, dict):
+        if _TYPE_TAG not in value and all(isinstance(key, str) for key in value):
+            return {key: _to_json(item, blobs) for key, item in value.items()}
+        return _tagged('dict', [[_to_json(key, blobs), _to_json(item, blobs)] for key, item in value.items()])
+    if isinstance(value, list):
+        return [_to_json(item, blobs) for item in value]
+    if isinstance(value, tuple):
+        return _tagged('tuple', [_to_json(item, blobs) for item in value])
+    if isinstance(value, (set, frozenset)):
+        return _tagged('set', [_to_json(item, blobs) for item in value])
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        blobs.append(value)
+        return _tagged('blob', len(blobs) - 1)
+    if isinstance(value, Decimal):
+        return _tagged('decimal', str(value))
+    # datetime before date: datetime is a date subclass
+    if isinstance(value, datetime.datetime):
+        return _tagged('datetime', value.isoformat())
+    if isinstance(value, datetime.date):
+        return _tagged('date', value.isoformat())
+    if isinstance(value, datetime.time):
+        return _tagged('time', value.isoformat())
+    if isinstance(value, datetime.timedelta):
+        return _tagged('timedelta', value.total_seconds())
+    name = _cache_type_names.get(type(value))
+    if name is not None:
+        return _tagged(name, _to_json(value.__getstate__(), blobs))
+    raise TypeError(f"{type(value).__name__} can't be stored in the shared cache")
+
+
+_DECODERS = {
+    'dict': lambda items: {key: item for key, item in items},
+    'tuple': tuple,
+    'set': set,
+    'decimal': Decimal,
+    'datetime': datetime.datetime.fromisoformat,
+    'date': datetime.date.fromisoformat,
+    'time': datetime.time.fromisoformat,
+    'timedelta': lambda seconds: datetime.timedelta(seconds=seconds),
+}
+
+
+def _from_json(blobs, obj):
+    tag = obj.get(_TYPE_TAG)
+    if tag is None:
+        return obj
+    if tag == 'blob':
+        return blobs[obj['value']]
+    decoder = _DECODERS.get(tag)
+    if decoder is not None:
+        return decoder(obj['value'])
+    cls = _cache_types.get(tag)
+    if cls is None:
+        raise ValueError(f"unknown cached type '{tag}'")
+    value = cls.__new__(cls)
+    value.__setstate__(obj['value'])
+    return value
+
+
+def encode_value(value):
+    """JSON text, or a BLOB (bytes) when the value holds byte strings"""
+    blobs = []
+    text = json.dumps(_to_json(value, blobs), separators=(',', ':'))
+    if not blobs:
+        return text
+    header = text.encode('utf-8')
+    parts = [_BLOB_LENGTH.pack(len(header)), header]
+    for blob in blobs:
+        parts += [_BLOB_LENGTH.pack(len(blob)), blob]
+    return b''.join(parts)
+
+
+def decode_value(stored):
+    """Inverse of encode_value"""
+    if isinstance(stored, str):
+        return json.loads(stored, object_hook=partial(_from_json, ()))
+
+    view = memoryview(stored)
+    size = _BLOB_LENGTH.size
+    (header_length,) = _BLOB_LENGTH.unpack_from(view, 0)
+    header = view[size:size + header_length]
+    offset = size + header_length
+    blobs = []
+    while offset < len(view):
+        (length,) = _BLOB_LENGTH.unpack_from(view, offset)
+        offset += size
+        blob = bytes(view[offset:offset + length])
+        if len(blob) != length:
+            raise ValueError("truncated cache entry")
+        blobs.append(blob)
+        offset += length
+    return json.loads(str(header, 'utf-8'), object_hook=partial(_from_json, blobs))
+
+
+class _Stripe:
+    """One independently locked shard of the memory store."""
+
+    __slots__ = ('lock', 'entries', 'expiry_heap')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> (value, expires_at); order is least -> most recently used
+        self.entries = OrderedDict()
+        # (expires_at, key); may hold stale pairs for overwritten/deleted keys
+        self.expiry_heap = []
+
+
+class MemoryCacheBackend:
+    """
+    In-process TTL store with O(1) LRU eviction.
+    Keys are spread over lock stripes so concurrent readers of different keys
+    don't serialize; expiry is drained lazily from a per-stripe min-heap
+    instead of scanning every entry on every call.
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_items=1000, stripes=16):
+        self.max_items = max_items
+        self._stripes = [_Stripe() for _ in range(max(1, stripes))]
+        self._stripe_capacity = max(1, -(-max_items // len(self._stripes)))
+
+    def _stripe_for(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    @staticmethod
+    def _drain_expired(stripe, now):
+        heap = stripe.expiry_heap
+        entries = stripe.entries
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = entries.get(key)
+            # Skip stale heap pairs left behind when a key was rewritten
+            if entry is not None and entry[1] == expires_at:
+                del entries[key]
+
+        # Rebuild when overwrites have left the heap mostly stale
+        if len(heap) > 2 * len(entries) + 64:
+            stripe.expiry_heap = [(entry[1], key) for key, entry in entries.items()]
+            heapq.heapify(stripe.expiry_heap)
+
+    def get(self, key):
+        now = time.time()
+        stripe = self._stripe_for(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del stripe.entries[key]
+                return None
+            stripe.entries.move_to_end(key)
+            value = entry[0]
+        return copy.deepcopy(value)
+
+    def set(self, key, value, ttl_seconds=30):
+        now = time.time()
+        expires_at = now + ttl_seconds
+        value = copy.deepcopy(value)
+        stripe = self._stripe_for(key)
+        with stripe.lock:
+            self._drain_expired(stripe, now)
+
+            stripe.entries[key] = (value, expires_at)
+            stripe.entries.move_to_end(key)
+            heapq.heappush(stripe.expiry_heap, (expires_at, key))
+
+            while len(stripe.entries) > self._stripe_capacity:
+                stripe.entries.popitem(last=False)
+
+    def get_many(self, keys):
+        """{key: value} for the keys that are cached"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set_many(self, items, ttl_seconds=30):
+        for key, value in items.items():
+            self.set(key, value, ttl_seconds=ttl_seconds)
+
+    def delete(self, key):
+        stripe = self._stripe_for(key)
+        with stripe.lock:
+            stripe.entries.pop(key, None)
+
+    def invalidate(self, prefix=None):
+        for stripe in self._stripes:
+            with stripe.lock:
+                if prefix is None:
+                    stripe.entries.clear()
+                    stripe.expiry_heap = []
+                    continue
+
+                keys = [k for k in stripe.entries if k.startswith(prefix)]
+                for key in keys:
+                    del stripe.entries[key]
+
+    def purge_expired(self):
+        now = time.time()
+        for stripe in self._stripes:
+            with stripe.lock:
+                self._drain_expired(stripe, now)
+
+    def __len__(self):
+        return sum(len(stripe.entries) for stripe in self._stripes)
+
+
+class SQLiteCacheBackend:
+    """Node-wide TTL store in a single SQLite file (WAL mode)."""
+
+    name = 'sqlite'
+
+    # Expired rows / overflow are cleaned up every N writes rather than on every call
+    PURGE_EVERY = 50
+
+    def __init__(self, path=None, max_items=1000, timeout=5.0, name='response_cache'):
+        self.path = path or default_cache_path(name)
+        self.max_items = max_items
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._init_store()
+
+    def _connect(self):
+        # One connection per thread; never reuse a connection inherited across fork()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_store(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (expires_at)"
+        )
+
+    @staticmethod
+    def _prefix_bounds(prefix):
+        # Range scan on the primary key instead of LIKE (no escaping, uses the index)
+        return prefix, prefix + '\U0010ffff'
+
+    def get(self, key):
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            # A busy/locked store degrades to a cache miss, never a failed request
+            logger.warning(f"⚠️ Response cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return self._decode(key, row[0])
+
+    @staticmethod
+    def _decode(key, value):
+        try:
+            return decode_value(value)
+        except (TypeError, ValueError, LookupError, struct.error) as e:
+            # Unreadable entry (e.g. written by an older release): treat as a miss
+            logger.warning(f"⚠️ Response cache entry {key} unreadable: {e}")
+            return None
+
+    @staticmethod
+    def _encode(key, value):
+        try:
+            return encode_value(value)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Response cache entry {key} not stored: {e}")
+            return None
+
+    def set(self, key, value, ttl_seconds=30):
+        now = time.time()
+        stored = self._encode(key, value)
+        if stored is None:
+            return
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, stored, now, now + ttl_seconds)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Response cache write failed: {e}")
+            return
+
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % self.PURGE_EVERY == 0
+        if due:
+            self.purge_expired()
+
+    def get_many(self, keys):
+        """{key: value} for the keys that are cached, in one SELECT"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            rows = self._connect().execute(
+                f"SELECT key, value FROM cache_entries "
+                f"WHERE key IN ({', '.join('?' * len(keys))}) AND expires_at > ?",
+                keys + [time.time()]
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Response cache read failed: {e}")
+            return {}
+        found = {}
+        for key, value in rows:
+            value = self._decode(key, value)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set_many(self, items, ttl_seconds=30):
+        """Store several entries in one transaction"""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            stored = self._encode(key, value)
+            if stored is not None:
+                rows.append((key, stored, now, now + ttl_seconds))
+        if not rows:
+            return
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries (key, value, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.warning(f"⚠️ Response cache write failed: {e}")
+            return
+
+        with self._writes_lock:
+            self._writes += len(rows)
+            due = self._writes >= self.PURGE_EVERY
+            if due:
+                self._writes = 0
+        if due:
+            self.purge_expired()
+
+    def delete(self, key):
+        try:
+            self._connect().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Response cache delete failed: {e}")
+
+    def invalidate(self, prefix=None):
+        try:
+            conn = self._connect()
+            if prefix is None:
+                conn.execute("DELETE FROM cache_entries")
+                return
+            low, high = self._prefix_bounds(prefix)
+            conn.execute("DELETE FROM cache_entries WHERE key >= ? AND key < ?", (low, high))
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Response cache invalidate failed: {e}")
+
+    def purge_expired(self):
+        """Drop expired rows, then the oldest rows beyond max_items."""
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+            conn.execute("""
+                DELETE FROM cache_entries WHERE key IN (
+                    SELECT key FROM cache_entries
+                    ORDER BY created_at
+                    LIMIT MAX(0, (SELECT COUNT(*) FROM cache_entries) - ?)
+                )
+            """, (self.max_items,))
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Response cache purge skipped: {e}")
+
+    def __len__(self):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+
+def create_cache_backend(kind=None, path=None, max_items=1000, name='response_cache'):
+    """
+    Build the configured backend, falling back to in-process memory.
+    Without a path the SQLite file is `name` in the private state dir.
+    """
+    kind = (kind or 'memory').lower()
+    if kind == 'sqlite':
+        try:
+            return SQLiteCacheBackend(path=path, max_items=max_items, name=name)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"⚠️ Shared response cache unavailable ({e}), using in-process cache")
+    elif kind != 'memory':
+        logger.warning(f"⚠️ Unknown response cache backend '{kind}', using in-process cache")
+    return MemoryCacheBackend(max_items=max_items)
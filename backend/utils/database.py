@@ -1,10 +1,16 @@
+import hashlib
 import logging
+import re
+import secrets
 import threading
+import time
 from contextlib import contextmanager
 
 import psycopg2
+from flask import g, has_request_context
+from psycopg2 import errors, extensions
 from psycopg2.extras import RealDictCursor
-from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 
 from config.config import Config
 
@@ -12,74 +18,646 @@ from config.config import Config
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+IDLE = extensions.TRANSACTION_STATUS_IDLE
+PRIMARY = 'primary'
+REPLICA = 'replica'
+
+# Plain reads a replica can answer: no row locks, sequence or advisory lock calls
+_READ_QUERY = re.compile(r"^\s*select\b", re.IGNORECASE)
+_WRITE_MARKERS = re.compile(
+    r"\bfor\s+(update|no\s+key\s+update|share|key\s+share)\b|\b(nextval|setval|pg_(try_)?advisory\w*)\s*\(",
+    re.IGNORECASE
+)
+# Seconds the replica is behind; 0 when it has replayed everything it received (or isn't a standby)
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+# read_only() nesting depth, per thread
+_routing = threading.local()
+
+
+def is_read_query(query):
+    return bool(_READ_QUERY.match(query)) and not _WRITE_MARKERS.search(query)
+
+
+# Per-process counters, reported by /health
+_stats_lock = threading.Lock()
+_stats = {
+    'requests': 0,
+    'round_trips': 0,
+    'checkouts': 0,
+    'prepares': 0,
+    'prepared_executions': 0,
+    'prepare_fallbacks': 0,
+    'replica_reads': 0,
+    'replica_fallbacks': 0,
+    'sticky_reads': 0,
+}
+# Pool sizing counters, reported by /api/ops/db-pool
+_pool_stats = {
+    'checkouts': 0,
+    'waits': 0,
+    'wait_ms': 0.0,
+    'max_wait_ms': 0.0,
+    'timeouts': 0,
+    'connections_opened': 0,
+    'peak_in_use': 0,
+    'first_queries': 0,
+    'first_query_ms': 0.0,
+    'max_first_query_ms': 0.0,
+    'queries': 0,
+    'slow_queries': 0,
+}
+
+
+def _count(**increments):
+    with _stats_lock:
+        for name, value in increments.items():
+            _stats[name] += value
+
+
+def _record(total=None, peak=None, value=0.0, **increments):
+    """Add increments to the pool counters; track `value` into the `total` sum and `peak` max"""
+    with _stats_lock:
+        for name, amount in increments.items():
+            _pool_stats[name] += amount
+        if total:
+            _pool_stats[total] += value
+        if peak and value > _pool_stats[peak]:
+            _pool_stats[peak] = value
+
+
+def get_db_stats():
+    """Round trips / checkouts per request (requests that used the database) for this worker"""
+    with _stats_lock:
+        stats = dict(_stats)
+    requests = stats['requests']
+    stats['round_trips_per_request'] = round(stats['round_trips'] / requests, 2) if requests else None
+    stats['request_scoped'] = Config.DB_REQUEST_SCOPED
+    stats['replica'] = {
+        'configured': bool(Config.DATABASE_REPLICA_URL),
+        'auto_route': Config.DB_REPLICA_AUTO_ROUTE,
+        'lag_seconds': db.replica_lag,
+        'max_lag_seconds': Config.DB_REPLICA_MAX_LAG_SECONDS,
+    }
+    return stats
+
+
+def get_pool_stats():
+    """Pool occupancy, checkout waits and query latency counters for this worker"""
+    with _stats_lock:
+        stats = dict(_pool_stats)
+    for name in ('wait_ms', 'max_wait_ms', 'first_query_ms', 'max_first_query_ms'):
+        stats[name] = round(stats[name], 2)
+    stats['avg_wait_ms'] = round(stats['wait_ms'] / stats['waits'], 2) if stats['waits'] else None
+    stats['avg_first_query_ms'] = (
+        round(stats['first_query_ms'] / stats['first_queries'], 2) if stats['first_queries'] else None
+    )
+    stats['slow_query_ms'] = Config.DB_SLOW_QUERY_MS
+    pool = db._pools.get(PRIMARY)
+    if pool is not None:
+        stats.update(pool.occupancy())
+    replica = db._pools.get(REPLICA)
+    if replica is not None:
+        stats['replica'] = replica.occupancy()
+    return stats
+
+
+# Called after every statement as observer(cursor, query, params, elapsed_ms, batch)
+_statement_observers = []
+
+
+def add_statement_observer(observer):
+    """Register a callback for every statement run on a pooled connection (see query_profiler)"""
+    if observer not in _statement_observers:
+        _statement_observers.append(observer)
+
+
+def _observe(cursor, query, params, elapsed_ms, batch):
+    _record(queries=1, slow_queries=1 if elapsed_ms >= Config.DB_SLOW_QUERY_MS else 0)
+    for observer in _statement_observers:
+        observer(cursor, query, params, elapsed_ms, batch)
+
+
+class _CountingCursorMixin:
+    """Counts and times each statement sent to the server on the owning TrackedConnection"""
+
+    def execute(self, query, vars=None):
+        self.connection.count_statements(1)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _observe(self, query, vars, (time.perf_counter() - started) * 1000, False)
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        self.connection.count_statements(len(vars_list))
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _observe(self, query, vars_list, (time.perf_counter() - started) * 1000, True)
+
+
+class CountingCursor(_CountingCursorMixin, extensions.cursor):
+    pass
+
+
+class CountingRealDictCursor(_CountingCursorMixin, RealDictCursor):
+    pass
+
+
+_COUNTING_CURSORS = {
+    None: CountingCursor,
+    extensions.cursor: CountingCursor,
+    RealDictCursor: CountingRealDictCursor,
+}
+
+
+# psycopg2 placeholders: %s, %(name)s, and %% for a literal percent sign
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+
+
+class PreparedStatement:
+    """
+    Server-side form of one query: `PREPARE name AS ...` with $n parameters,
+    executed as `EXECUTE name (...)` with the query's own params. The name
+    is derived from the query text, so every connection agrees on it.
+    """
+
+    def __init__(self, query):
+        self.name = f"qc_{hashlib.sha1(query.encode()).hexdigest()[:16]}"
+        self.arguments = []  # positional index or parameter name, per $n
+        named = {}
+
+        def placeholder(match):
+            if match.group(0) == '%%':
+                return '%'
+            key = match.group(1)
+            if key is None:
+                self.arguments.append(len(self.arguments))
+                return f"${len(self.arguments)}"
+            if key not in named:
+                self.arguments.append(key)
+                named[key] = len(self.arguments)
+            return f"${named[key]}"
+
+        self.prepare_sql = f"PREPARE {self.name} AS {_PLACEHOLDER.sub(placeholder, query)}"
+        self.execute_sql = f"EXECUTE {self.name}"
+        if self.arguments:
+            self.execute_sql += f" ({', '.join(['%s'] * len(self.arguments))})"
+
+    def values(self, params):
+        if not self.arguments:
+            return None
+        return [params[argument] for argument in self.arguments]
+
+
+# query text -> PreparedStatement, or None once the server refused to prepare it
+_prepared_statements = {}
+# statement name -> query text, so profiles show what an EXECUTE ran
+_prepared_sources = {}
+_prepared_lock = threading.Lock()
+
+
+def _prepared_statement(query):
+    with _prepared_lock:
+        if query not in _prepared_statements:
+            statement = _prepared_statements[query] = PreparedStatement(query)
+            _prepared_sources[statement.name] = query
+        return _prepared_statements[query]
+
+
+def statement_source(query):
+    """The query text behind `EXECUTE qc_...` of a prepared statement; other queries unchanged"""
+    if query.startswith('EXECUTE qc_'):
+        return _prepared_sources.get(query.split(None, 2)[1], query)
+    return query
+
+
+class TrackedConnection(extensions.connection):
+    """psycopg2 connection that counts its server round trips"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.round_trips = 0
+        self.checked_out_at_round_trip = 0
+        self.checked_out_at = None
+        self.role = PRIMARY
+        # Names PREPAREd on this server session; a new connection starts empty
+        self.prepared = set()
+
+    def count_statements(self, statements):
+        if self.checked_out_at is not None:
+            # Time from checkout to the first statement: how long callers hold idle connections
+            first_query_ms = (time.perf_counter() - self.checked_out_at) * 1000
+            self.checked_out_at = None
+            _record(total='first_query_ms', peak='max_first_query_ms', value=first_query_ms, first_queries=1)
+        # Outside autocommit psycopg2 sends BEGIN ahead of a transaction's first statement
+        if not self.autocommit and self.info.transaction_status == IDLE:
+            statements += 1
+        self.round_trips += statements
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get('cursor_factory')
+        kwargs['cursor_factory'] = _COUNTING_CURSORS.get(factory, factory)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        # psycopg2 only talks to the server when a transaction is open
+        if self.info.transaction_status != IDLE:
+            self.round_trips += 1
+        super().commit()
+
+    def rollback(self):
+        if self.info.transaction_status != IDLE:
+            self.round_trips += 1
+        super().rollback()
+
+
+class BoundedConnectionPool(ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool whose checkout waits up to `timeout` seconds for
+    a connection to be returned instead of failing as soon as maxconn
+    connections are out. Waiters are woken one per returned connection.
+    """
+
+    def __init__(self, minconn, maxconn, *args, timeout=5.0, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self.timeout = timeout
+        self._waiting = 0
+        self._returned = threading.Condition(self._lock)
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        _record(connections_opened=1)
+        return conn
+
+    def getconn(self, key=None):
+        started = time.perf_counter()
+        waited = False
+        with self._returned:
+            while not self.closed and not self._pool and len(self._used) >= self.maxconn:
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    _record(timeouts=1)
+                    raise PoolError(
+                        f"connection pool exhausted: no connection returned within {self.timeout}s"
+                    )
+                waited = True
+                self._waiting += 1
+                try:
+                    self._returned.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            conn = self._getconn(key)
+            in_use = len(self._used)
+
+        wait_ms = (time.perf_counter() - started) * 1000 if waited else 0.0
+        _record(total='wait_ms', peak='max_wait_ms', value=wait_ms, checkouts=1, waits=1 if waited else 0)
+        _record(peak='peak_in_use', value=in_use)
+        return conn
+
+    def putconn(self, conn=None, key=None, close=False):
+        with self._returned:
+            self._putconn(conn, key, close)
+            self._returned.notify()
+
+    def closeall(self):
+        with self._returned:
+            self._closeall()
+            self._returned.notify_all()
+
+    def occupancy(self):
+        with self._lock:
+            return {
+                'in_use': len(self._used),
+                'idle': len(self._pool),
+                'waiting': self._waiting,
+                'min_connections': self.minconn,
+                'max_connections': self.maxconn,
+                'timeout_seconds': self.timeout,
+            }
+
+
+class _RequestUnit:
+    """The connection bound to one Flask request, and its open transaction depth"""
+
+    __slots__ = ('conn', 'depth')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.depth = 0
+
+
 class Database:
-    """Database connection and operations handler"""
-    
+    """
+    Database connection and operations handler.
+
+    Inside a Flask request every helper shares one pooled connection, bound
+    on first use and returned at teardown (init_app). Single statements run
+    in autocommit - one round trip, committed as before, so cache
+    invalidations that follow a write never race its commit. get_cursor()
+    is the explicit transaction: BEGIN .. COMMIT on that same connection,
+    and helpers called inside it join the transaction.
+    Outside a request (startup, background threads, scripts) each call
+    checks a connection out of the pool and returns it.
+
+    With DATABASE_REPLICA_URL set, reads can go to a second pool:
+    - read_only() blocks, get_connection / get_cursor(read_only=True) and
+      stream_query(read_only=True) read from the replica
+    - with DB_REPLICA_AUTO_ROUTE, plain SELECT helpers do too
+    - once a request may have written to the primary, its reads stay
+      there (read-your-writes), as do statements inside a primary
+      transaction
+    - a replica further behind than DB_REPLICA_MAX_LAG_SECONDS, or one
+      that can't be reached, is skipped in favour of the primary
+    """
+
     def __init__(self):
         self.connection_string = Config.DATABASE_URL
+        self.replica_connection_string = Config.DATABASE_REPLICA_URL
         self.min_connections = Config.DB_POOL_MIN
         self.max_connections = Config.DB_POOL_MAX
         self.connect_timeout = Config.DB_CONNECT_TIMEOUT
-        self._pool = None
+        self.pool_timeout = Config.DB_POOL_TIMEOUT
+        self.request_scoped = Config.DB_REQUEST_SCOPED
+        self._pools = {}
         self._pool_lock = threading.Lock()
+        # Last measured replica lag in seconds (None: not measured yet, or unreachable)
+        self.replica_lag = None
+        self._replica_checked_at = None
+        self._replica_lock = threading.Lock()
 
-    def _init_pool(self):
-        """Initialize connection pool lazily and thread-safely."""
-        if self._pool is not None:
-            return
+    def init_app(self, app):
+        """Return the request's connections to the pool when the request ends."""
+        app.teardown_request(self.release_request_connection)
+
+    def _init_pool(self, role=PRIMARY):
+        """Initialize a connection pool lazily and thread-safely."""
+        pool = self._pools.get(role)
+        if pool is not None:
+            return pool
 
         with self._pool_lock:
-            if self._pool is not None:
-                return
+            pool = self._pools.get(role)
+            if pool is not None:
+                return pool
 
-            self._pool = ThreadedConnectionPool(
+            settings = {
+                'dsn': self.connection_string,
+                'application_name': 'quickcart_api',
+            }
+            if role == REPLICA:
+                # A stand-in replica that accepts writes behaves like a hot standby
+                settings = {
+                    'dsn': self.replica_connection_string,
+                    'application_name': 'quickcart_api_replica',
+                    'options': '-c default_transaction_read_only=on',
+                }
+            pool = BoundedConnectionPool(
                 minconn=self.min_connections,
                 maxconn=self.max_connections,
-                dsn=self.connection_string,
+                timeout=self.pool_timeout,
+                connection_factory=TrackedConnection,
                 connect_timeout=self.connect_timeout,
-                application_name='quickcart_api',
                 keepalives=1,
                 keepalives_idle=30,
                 keepalives_interval=10,
                 keepalives_count=5,
+                **settings,
             )
+            self._pools[role] = pool
             logger.info(
-                "✅ Database pool initialized (min=%s, max=%s)",
+                "✅ Database %s pool initialized (min=%s, max=%s, checkout wait=%ss)",
+                role,
                 self.min_connections,
                 self.max_connections,
+                self.pool_timeout,
             )
+            return pool
 
     def close_pool(self):
         """Close all pooled connections."""
-        if self._pool is not None:
-            self._pool.closeall()
-            self._pool = None
-            logger.info("✅ Database pool closed")
-        
-    @contextmanager
-    def get_connection(self):
-        """Get pooled database connection with context manager."""
-        self._init_pool()
+        for role in list(self._pools):
+            self._pools.pop(role).closeall()
+            logger.info(f"✅ Database {role} pool closed")
+
+    def _checkout(self, role=PRIMARY):
+        conn = self._init_pool(role).getconn()
+        conn.role = role
+        conn.checked_out_at_round_trip = conn.round_trips
+        conn.checked_out_at = time.perf_counter()
+        _count(checkouts=1)
+        return conn
+
+    def _checkout_routed(self, role):
+        """Check out for `role`; a replica that can't be reached falls back to the primary"""
+        if role == REPLICA:
+            try:
+                return self._checkout(REPLICA)
+            except (psycopg2.OperationalError, PoolError) as e:
+                self._replica_unreachable(e)
+                _count(replica_fallbacks=1)
+        return self._checkout(PRIMARY)
+
+    def _release(self, conn):
+        """Return a connection, rolling back only if a transaction was left open."""
+        conn.checked_out_at = None
+        try:
+            if not conn.closed:
+                if conn.info.transaction_status != IDLE:
+                    conn.rollback()
+                conn.autocommit = False
+        finally:
+            if has_request_context():
+                g._db_round_trips = g.get('_db_round_trips', 0) + (
+                    conn.round_trips - conn.checked_out_at_round_trip
+                )
+            self._pools[conn.role].putconn(conn, close=bool(conn.closed))
+
+    def _replica_unreachable(self, error):
+        if self.replica_lag is not None:
+            logger.warning(f"⚠️ Read replica unreachable, reading from primary: {error}")
+        self.replica_lag = None
+        self._replica_checked_at = time.monotonic()
 
+    def _measure_replica_lag(self):
         conn = None
         try:
-            conn = self._pool.getconn()
-            # Reset any aborted transaction state from previous usage.
-            conn.rollback()
-            yield conn
+            conn = self._checkout(REPLICA)
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_QUERY)
+                lag = float(cursor.fetchone()[0])
+        except (psycopg2.Error, PoolError) as e:
+            self._replica_unreachable(e)
+            return
+        finally:
+            if conn is not None:
+                self._release(conn)
+
+        max_lag = Config.DB_REPLICA_MAX_LAG_SECONDS
+        if lag > max_lag and (self.replica_lag is None or self.replica_lag <= max_lag):
+            logger.warning(f"⚠️ Read replica {lag:.1f}s behind (max {max_lag}s), reading from primary")
+        self.replica_lag = lag
+        self._replica_checked_at = time.monotonic()
+
+    def _replica_ready(self):
+        """Replica lag within bounds (re-measured every DB_REPLICA_LAG_CHECK_SECONDS by one thread)"""
+        checked_at = self._replica_checked_at
+        due = checked_at is None or time.monotonic() - checked_at >= Config.DB_REPLICA_LAG_CHECK_SECONDS
+        if due and self._replica_lock.acquire(blocking=False):
+            try:
+                self._measure_replica_lag()
+            finally:
+                self._replica_lock.release()
+        lag = self.replica_lag
+        return lag is not None and lag <= Config.DB_REPLICA_MAX_LAG_SECONDS
+
+    def _route(self, query=None, read_only=False):
+        """
+        PRIMARY or REPLICA for the next database access. query=None means
+        a raw connection or transaction: primary access that may write pins
+        the rest of the request to the primary.
+        """
+        if not self.replica_connection_string:
+            return PRIMARY
+
+        explicit = read_only or getattr(_routing, 'read_only', 0) > 0
+        read = query is not None and is_read_query(query)
+        in_request = has_request_context()
+        if not explicit and not (read and Config.DB_REPLICA_AUTO_ROUTE):
+            if in_request and not read:
+                g._db_wrote = True
+            return PRIMARY
+
+        if in_request:
+            primary = g.get('_db_units', {}).get(PRIMARY)
+            if g.get('_db_wrote') or (primary is not None and primary.depth):
+                # Read-your-writes, and statements inside a primary transaction
+                _count(sticky_reads=1)
+                return PRIMARY
+        if not self._replica_ready():
+            _count(replica_fallbacks=1)
+            return PRIMARY
+        _count(replica_reads=1)
+        return REPLICA
+
+    @contextmanager
+    def read_only(self):
+        """
+        Route the block's database access to the replica (when configured
+        and fresh enough). The block must only read: on the replica any
+        write fails.
+        """
+        _routing.read_only = getattr(_routing, 'read_only', 0) + 1
+        try:
+            yield
+        finally:
+            _routing.read_only -= 1
+
+    def _request_unit(self, role=PRIMARY):
+        """This request's connection for `role` (bound on first use), or None outside requests"""
+        if not self.request_scoped or not has_request_context():
+            return None
+        units = g.setdefault('_db_units', {})
+        unit = units.get(role)
+        if unit is None:
+            conn = self._checkout_routed(role)
+            if conn.role != role:
+                # Replica unreachable: use the request's primary connection instead
+                self._release(conn)
+                return self._request_unit(PRIMARY)
+            conn.autocommit = True
+            unit = units[role] = _RequestUnit(conn)
+        return unit
+
+    def release_request_connection(self, exc=None):
+        """Teardown: give the request's connections back and record their round trips."""
+        for unit in g.pop('_db_units', {}).values():
+            self._release(unit.conn)
+        g.pop('_db_wrote', None)
+        if '_db_round_trips' in g:
+            _count(requests=1, round_trips=g.pop('_db_round_trips'))
+
+    def request_round_trips(self):
+        """Round trips the current request has made so far"""
+        if not has_request_context():
+            return 0
+        pending = sum(
+            unit.conn.round_trips - unit.conn.checked_out_at_round_trip
+            for unit in g.get('_db_units', {}).values()
+        )
+        return g.get('_db_round_trips', 0) + pending
+
+    @contextmanager
+    def _connection(self, role):
+        """(connection, request unit or None) for `role`; per-call connections are returned on exit"""
+        unit = self._request_unit(role)
+        if unit is not None:
+            yield unit.conn, unit
+            return
+
+        conn = self._checkout_routed(role)
+        try:
+            yield conn, None
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def get_connection(self, read_only=False):
+        """Get the request's connection, or a pooled one, with context manager."""
+        try:
+            with self._connection(self._route(read_only=read_only)) as (conn, _):
+                yield conn
         except Exception as e:
-            if conn:
-                conn.rollback()
             logger.error(f"Database error: {e}")
             raise
+
+    @contextmanager
+    def _request_transaction(self, unit):
+        conn = unit.conn
+        outermost = unit.depth == 0
+        if outermost:
+            conn.autocommit = False
+        unit.depth += 1
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            yield cursor
+            if outermost:
+                if conn.info.transaction_status == extensions.TRANSACTION_STATUS_INERROR:
+                    # A failed statement was swallowed inside the block: COMMIT would roll back silently
+                    raise psycopg2.InternalError("transaction aborted by an earlier error, rolled back")
+                conn.commit()
+        except Exception as e:
+            if outermost:
+                conn.rollback()
+                logger.error(f"Database transaction error: {e}")
+            raise
         finally:
-            if conn:
-                self._pool.putconn(conn)
-    
+            cursor.close()
+            unit.depth -= 1
+            if outermost:
+                conn.autocommit = True
+
     @contextmanager
-    def get_cursor(self):
-        """Get database cursor with connection"""
-        with self.get_connection() as conn:
+    def get_cursor(self, read_only=False):
+        """
+        Get database cursor in a transaction: committed when the block
+        exits, rolled back on error. Nested blocks join the outer transaction.
+        """
+        with self._connection(self._route(read_only=read_only)) as (conn, unit):
+            if unit is not None:
+                with self._request_transaction(unit) as cursor:
+                    yield cursor
+                return
+
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             try:
                 yield cursor
@@ -90,12 +668,60 @@ class Database:
                 raise
             finally:
                 cursor.close()
-    
-    def execute_query(self, query, params=None, fetch=False):
-        """Execute a database query"""
-        try:
-            with self.get_cursor() as cursor:
+
+    @contextmanager
+    def _statement_cursor(self, query):
+        """Cursor for one helper statement: autocommit unless inside get_cursor()"""
+        with self._connection(self._route(query)) as (conn, unit):
+            if unit is None:
+                conn.autocommit = True
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                yield cursor
+
+    def _execute(self, cursor, query, params, prepared):
+        """
+        Run `query` on `cursor`; with prepared=True it is PREPAREd once per
+        connection and executed by name. Only in autocommit, where a failed
+        statement leaves nothing to roll back: inside get_cursor() the query
+        runs as plain SQL, as does any query the server refused to prepare.
+        """
+        conn = cursor.connection
+        statement = _prepared_statement(query) if prepared and Config.DB_PREPARED_STATEMENTS else None
+        if statement is None or not conn.autocommit:
+            cursor.execute(query, params)
+            return
+
+        if statement.name not in conn.prepared:
+            try:
+                cursor.execute(statement.prepare_sql)
+            except psycopg2.Error as e:
+                # e.g. a parameter whose type the server can't infer
+                logger.warning(f"⚠️ Query can't be prepared, running it as plain SQL: {e}")
+                with _prepared_lock:
+                    _prepared_statements[query] = None
+                _count(prepare_fallbacks=1)
                 cursor.execute(query, params)
+                return
+            conn.prepared.add(statement.name)
+            _count(prepares=1)
+
+        try:
+            cursor.execute(statement.execute_sql, statement.values(params))
+            _count(prepared_executions=1)
+        except (errors.InvalidSqlStatementName, errors.FeatureNotSupported) as e:
+            # Deallocated behind our back (DISCARD ALL, pooler reset) or the
+            # table changed shape under the plan: re-prepare on next use
+            conn.prepared.discard(statement.name)
+            if isinstance(e, errors.FeatureNotSupported):
+                cursor.execute(f"DEALLOCATE {statement.name}")
+            _count(prepare_fallbacks=1)
+            cursor.execute(query, params)
+
+    def execute_query(self, query, params=None, fetch=False, prepared=False):
+        """Execute a database query (prepared=True for hot, fixed query strings)"""
+        try:
+            with self._statement_cursor(query) as cursor:
+                self._execute(cursor, query, params, prepared)
                 if fetch:
                     if 'returning' in query.lower() or query.strip().lower().startswith('select'):
                         return cursor.fetchall()
@@ -104,17 +730,41 @@ class Database:
         except Exception as e:
             logger.error(f"Query execution error: {e}")
             raise
-    
-    def execute_query_one(self, query, params=None):
-        """Execute query and fetch one result"""
+
+    def stream_query(self, query, params=None, itersize=2000, read_only=False):
+        """
+        Yield rows from a server-side (named) cursor, fetching `itersize`
+        rows per round trip, so memory stays flat however many rows match.
+        Uses its own pooled connection (held until the generator is
+        exhausted or closed), so a streamed response may outlive the request.
+        """
+        conn = self._checkout_routed(self._route(query, read_only=read_only))
         try:
-            with self.get_cursor() as cursor:
+            cursor = conn.cursor(name=f"stream_{secrets.token_hex(6)}", cursor_factory=RealDictCursor)
+            cursor.itersize = itersize
+            try:
                 cursor.execute(query, params)
+                for row in cursor:
+                    yield row
+            finally:
+                cursor.close()
+        except Exception as e:
+            logger.error(f"Database error: {e}")
+            raise
+        finally:
+            # Read-only: _release ends the transaction that kept the portal open
+            self._release(conn)
+
+    def execute_query_one(self, query, params=None, prepared=False):
+        """Execute query and fetch one result"""
+        try:
+            with self._statement_cursor(query) as cursor:
+                self._execute(cursor, query, params, prepared)
                 return cursor.fetchone()
         except Exception as e:
             logger.error(f"Query execution error: {e}")
             raise
-    
+
     def test_connection(self):
         """Test database connection"""
         try:
@@ -127,4 +777,4 @@ class Database:
             return False
 
 # Global database instance
-db = Database()
\ No newline at end of file
+db = Database()
@@ -0,0 +1,238 @@
+"""
+Pre-encoded cached JSON responses.
+
+Hot catalog endpoints cache the final HTTP body instead of the payload dict:
+the JSON bytes are encoded once on a miss together with a strong ETag and
+compressed variants, and every hit writes those bytes straight to the
+response - no deepcopy, no jsonify, no per-request compression.
+
+Responses are also validated: clients that send back the ETag
+(If-None-Match) or a fresh If-Modified-Since get a bodyless 304, and
+Cache-Control / Last-Modified follow the remaining cache TTL.
+
+In the shared response cache an entry is split in two: the small
+validator (ETag, age, size) under the cache key and the bodies under
+key + BODY_KEY_SUFFIX. Each worker keeps the bodies it has decoded in
+memory, keyed by cache key and checked against the shared ETag, so a hit
+reads only the validator from the store and a 304 never touches a body.
+"""
+import gzip
+import hashlib
+import threading
+import time
+
+from flask import Response, current_app, request
+from werkzeug.http import http_date
+
+from backend.utils.cache_backends import MemoryCacheBackend, register_cache_type
+from backend.utils.response_cache import response_cache
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 512
+# Shared-cache key of an entry's bodies (the cache key itself holds its validator)
+BODY_KEY_SUFFIX = '#body'
+
+# Decoded entries of this worker: cache key -> EncodedResponse
+_local_entries = MemoryCacheBackend(max_items=256)
+
+# Per-process counters, reported by /health
+_stats_lock = threading.Lock()
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'not_modified': 0,
+    'bytes_sent': 0,
+    'bytes_saved': 0,
+}
+
+
+def _count(**increments):
+    with _stats_lock:
+        for name, value in increments.items():
+            _stats[name] += value
+
+
+def get_http_cache_stats():
+    """Snapshot of the conditional GET / encoded response counters for this worker"""
+    with _stats_lock:
+        stats = dict(_stats)
+    served = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / served, 4) if served else None
+    stats['not_modified_rate'] = round(stats['not_modified'] / served, 4) if served else None
+    return stats
+
+
+class EncodedResponse:
+    """Immutable, ready-to-send JSON body with its ETag and compressed variants."""
+
+    __slots__ = ('body', 'gzip_body', 'br_body', 'etag', 'created_at', 'ttl_seconds')
+
+    def __init__(self, body, gzip_body, br_body, etag, created_at, ttl_seconds):
+        self.body = body
+        self.gzip_body = gzip_body
+        self.br_body = br_body
+        self.etag = etag
+        self.created_at = created_at
+        self.ttl_seconds = ttl_seconds
+
+    def validator(self):
+        """What conditional requests and cache headers need, without the bodies"""
+        return {
+            'etag': self.etag,
+            'created_at': self.created_at,
+            'ttl_seconds': self.ttl_seconds,
+            'size': len(self.body),
+        }
+
+    def __deepcopy__(self, memo):
+        # Only holds bytes/str/numbers, so sharing one instance is safe
+        return self
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+
+register_cache_type('encoded_response', EncodedResponse)
+
+
+def encode_payload(payload, ttl_seconds):
+    """Serialize a payload once with the app's JSON provider (same output as jsonify)."""
+    body = current_app.json.dumps(payload).encode('utf-8')
+    gzip_body = None
+    br_body = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        gzip_body = gzip.compress(body, compresslevel=6)
+        if brotli is not None:
+            br_body = brotli.compress(body, quality=5)
+
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return EncodedResponse(body, gzip_body, br_body, etag, time.time(), ttl_seconds)
+
+
+def _remaining_seconds(validator):
+    return max(0, int(validator['created_at'] + validator['ttl_seconds'] - time.time()))
+
+
+def _store_shared(cache_key, entry):
+    """Bodies first, then the validator, so a reader never finds a validator without bodies"""
+    response_cache.set(cache_key + BODY_KEY_SUFFIX, entry, ttl_seconds=entry.ttl_seconds)
+    validator = entry.validator()
+    response_cache.set(cache_key, validator, ttl_seconds=entry.ttl_seconds)
+    _local_entries.set(cache_key, entry, ttl_seconds=entry.ttl_seconds)
+    return validator
+
+
+def cache_encoded(cache_key, build_payload, ttl_seconds=30):
+    """Store an encoded payload under cache_key (used for cache warm-up)."""
+    entry = encode_payload(build_payload(), ttl_seconds)
+    _store_shared(cache_key, entry)
+    return entry
+
+
+def _is_not_modified(validator):
+    """True when the client's validators still match the cached entry."""
+    if request.if_none_match:
+        # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+        return request.if_none_match.contains_weak(validator['etag'].strip('"'))
+    if request.if_modified_since:
+        return int(validator['created_at']) <= request.if_modified_since.timestamp()
+    return False
+
+
+def _cache_headers(validator):
+    return {
+        'ETag': validator['etag'],
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': f'public, max-age={_remaining_seconds(validator)}',
+        'Last-Modified': http_date(int(validator['created_at'])),
+    }
+
+
+def _not_modified_response(validator):
+    _count(not_modified=1, bytes_saved=validator['size'])
+    response = Response(status=304, headers=_cache_headers(validator))
+    # Werkzeug would otherwise attach a default text/html mimetype
+    del response.headers['Content-Type']
+    return response
+
+
+def encoded_response(entry, status=200):
+    """Build a response from an EncodedResponse, picking the best accepted encoding."""
+    validator = entry.validator()
+    if status == 200 and _is_not_modified(validator):
+        return _not_modified_response(validator)
+
+    headers = _cache_headers(validator)
+    body = entry.body
+    accepted = request.accept_encodings
+    if entry.br_body is not None and accepted['br']:
+        body = entry.br_body
+        headers['Content-Encoding'] = 'br'
+    elif entry.gzip_body is not None and accepted['gzip']:
+        body = entry.gzip_body
+        headers['Content-Encoding'] = 'gzip'
+
+    _count(bytes_sent=len(body), bytes_saved=len(entry.body) - len(body))
+    return Response(body, status=status, mimetype='application/json', headers=headers)
+
+
+def cached_json_response(cache_key, build_payload, ttl_seconds=30, cache=None):
+    """
+    Serve build_payload() as pre-encoded bytes from `cache` (anything with
+    get_or_set, e.g. a catalog snapshot), the response cache by default.
+    """
+    if cache is None:
+        return _shared_json_response(cache_key, build_payload, ttl_seconds)
+    built = []
+
+    def producer():
+        built.append(True)
+        return encode_payload(build_payload(), ttl_seconds)
+
+    entry = cache.get_or_set(cache_key, producer, ttl_seconds=ttl_seconds)
+    if built:
+        _count(misses=1)
+    else:
+        _count(hits=1)
+    return encoded_response(entry)
+
+
+def _shared_json_response(cache_key, build_payload, ttl_seconds):
+    """
+    Response cache path: only the validator is read from the shared store on
+    a hit; bodies come from this worker's memo unless their ETag changed.
+    """
+    built = []
+
+    def producer():
+        built.append(True)
+        return _store_shared(cache_key, encode_payload(build_payload(), ttl_seconds))
+
+    validator = response_cache.get_or_set(cache_key, producer, ttl_seconds=ttl_seconds)
+    if built:
+        _count(misses=1)
+    else:
+        _count(hits=1)
+    if _is_not_modified(validator):
+        return _not_modified_response(validator)
+
+    entry = _local_entries.get(cache_key)
+    if entry is None or entry.etag != validator['etag']:
+        # Another worker built it (or this one's copy is older): decode once
+        entry = response_cache.get(cache_key + BODY_KEY_SUFFIX)
+        if entry is None or entry.etag != validator['etag']:
+            # Bodies evicted or replaced in between: rebuild both halves
+            entry = encode_payload(build_payload(), ttl_seconds)
+            _store_shared(cache_key, entry)
+        else:
+            _local_entries.set(cache_key, entry, ttl_seconds=max(_remaining_seconds(validator), 1))
+    return encoded_response(entry)
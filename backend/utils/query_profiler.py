@@ -0,0 +1,313 @@
+"""
+Per-endpoint request and database timing (this worker, since it started).
+
+Every SQL statement run on a pooled connection - helpers, get_cursor()
+blocks, raw get_connection() cursors - is timed and attributed to the
+request's endpoint ("POST /api/orders/create"). Per endpoint the profiler
+keeps histograms of request latency, statements per request and database
+time per request, plus the slowest statement seen.
+
+Statements are normalized (string / number literals and parameters
+become ?, IN lists collapse) so the same query with different values
+aggregates under one text. Statements slower than DB_SLOW_QUERY_MS are
+logged and kept in a short ring buffer; a sample of them gets an EXPLAIN
+plan, at most once per statement per DB_EXPLAIN_INTERVAL_SECONDS.
+A request that runs the same statement DB_N_PLUS_ONE_THRESHOLD times or
+more is flagged as an N+1 pattern on its endpoint.
+
+Served by GET /api/ops/endpoints and GET /api/ops/slow-queries.
+"""
+import logging
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from functools import lru_cache
+
+from flask import g, has_request_context, request
+from psycopg2 import extensions
+
+from backend.config.config import Config
+from backend.utils.database import add_statement_observer, statement_source
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+MAX_STATEMENT_LENGTH = 300
+SLOW_QUERY_LOG_SIZE = 100
+# N+1 statements remembered per endpoint
+MAX_N_PLUS_ONE_PER_ENDPOINT = 20
+# EXPLAIN only what it accepts (and never DDL or session commands)
+EXPLAINABLE = ('select', 'insert', 'update', 'delete', 'with', 'execute')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_PARAMETER = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_endpoints = {}
+_slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_explained_at = {}
+_n_plus_one_reported = set()
+
+
+@lru_cache(maxsize=4096)
+def normalize(query):
+    """Statement text with literals and parameters replaced by ?"""
+    text = statement_source(query if isinstance(query, str) else str(query))
+    text = _STRING_LITERAL.sub('?', text)
+    text = _PARAMETER.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _VALUE_LIST.sub('(?, ...)', text)
+    return _WHITESPACE.sub(' ', text).strip()[:MAX_STATEMENT_LENGTH]
+
+
+class Histogram:
+    """Fixed-bucket histogram: counts per upper bound, plus sum and max"""
+
+    __slots__ = ('bounds', 'counts', 'total', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th value (max for the overflow bucket)"""
+        count = sum(self.counts)
+        if not count:
+            return None
+        seen = 0
+        for bound, bucket in zip(self.bounds + (None,), self.counts):
+            seen += bucket
+            if seen >= q * count:
+                return bound if bound is not None else round(self.max, 2)
+
+    def snapshot(self):
+        count = sum(self.counts)
+        labels = [f"le_{bound}" for bound in self.bounds] + ['inf']
+        return {
+            'count': count,
+            'sum': round(self.total, 2),
+            'avg': round(self.total / count, 2) if count else None,
+            'max': round(self.max, 2),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class EndpointStats:
+    """Aggregates for one endpoint"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.db_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.slowest_ms = 0.0
+        self.slowest_statement = None
+        self.n_plus_one = {}
+
+    def snapshot(self, endpoint):
+        return {
+            'endpoint': endpoint,
+            'requests': self.requests,
+            'errors': self.errors,
+            'latency_ms': self.latency_ms.snapshot(),
+            'db_ms': self.db_ms.snapshot(),
+            'statements': self.statements.snapshot(),
+            'slowest_statement': {
+                'ms': round(self.slowest_ms, 2),
+                'statement': self.slowest_statement,
+            } if self.slowest_statement else None,
+            'n_plus_one': [
+                {'statement': statement, **counts}
+                for statement, counts in sorted(
+                    self.n_plus_one.items(), key=lambda item: -item[1]['max_repeats']
+                )
+            ],
+        }
+
+
+class RequestProfile:
+    """Statements of the request in flight (kept on flask.g)"""
+
+    __slots__ = ('started', 'statements', 'db_ms', 'slowest_ms', 'slowest_statement', 'repeats', 'status')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement = None
+        self.repeats = Counter()
+        self.status = None
+
+    def add(self, statement, elapsed_ms, batch):
+        self.statements += 1
+        self.db_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = statement
+        if not batch:
+            # executemany is already one batched call, not a loop of queries
+            self.repeats[statement] += 1
+
+
+def _endpoint_name():
+    rule = request.url_rule
+    return f"{request.method} {rule.rule if rule is not None else '<unmatched>'}"
+
+
+def _should_explain(query, statement, batch):
+    # executemany params are a sequence of rows; EXPLAIN takes one set
+    if batch or not statement.lower().startswith(EXPLAINABLE) or random.random() >= Config.DB_EXPLAIN_SAMPLE_RATE:
+        return False
+    now = time.monotonic()
+    with _lock:
+        if now - _explained_at.get(statement, -Config.DB_EXPLAIN_INTERVAL_SECONDS) < Config.DB_EXPLAIN_INTERVAL_SECONDS:
+            return False
+        _explained_at[statement] = now
+    return True
+
+
+def _explain(cursor, query, params):
+    """Plan of a statement that just ran, on its own connection (autocommit only)"""
+    conn = cursor.connection
+    if not conn.autocommit or cursor.name:
+        # A failed EXPLAIN must not abort the caller's transaction
+        return None
+    try:
+        # Plain cursor: diagnostics stay out of the statement counts
+        with extensions.cursor(conn) as explain_cursor:
+            explain_cursor.execute(f"EXPLAIN {query}", params)
+            return [row[0] for row in explain_cursor.fetchall()]
+    except Exception as e:
+        # Diagnostics only: never lose the slow-query entry over a failed plan
+        return [f"EXPLAIN failed: {e}".strip()]
+
+
+def _record_slow(cursor, query, params, statement, elapsed_ms, batch):
+    endpoint = _endpoint_name() if has_request_context() else 'background'
+    plan = _explain(cursor, query, params) if _should_explain(query, statement, batch) else None
+    with _lock:
+        _slow_queries.append({
+            'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'endpoint': endpoint,
+            'ms': round(elapsed_ms, 2),
+            'statement': statement,
+            'batch': batch,
+            'plan': plan,
+        })
+    logger.warning(f"⚠️ Slow query {elapsed_ms:.0f}ms [{endpoint}]: {statement}")
+    if plan:
+        logger.warning("   EXPLAIN:\n   " + "\n   ".join(plan))
+
+
+def record_statement(cursor, query, params, elapsed_ms, batch):
+    """Statement observer (see database.add_statement_observer); never raises into the query path"""
+    try:
+        statement = None
+        if has_request_context():
+            profile = g.get('_query_profile')
+            if profile is not None:
+                statement = normalize(query)
+                profile.add(statement, elapsed_ms, batch)
+        if elapsed_ms >= Config.DB_SLOW_QUERY_MS:
+            _record_slow(cursor, query, params, statement or normalize(query), elapsed_ms, batch)
+    except Exception as e:
+        logger.error(f"❌ Query profiler error: {e}")
+
+
+def _start_request():
+    g._query_profile = RequestProfile()
+
+
+def _note_status(response):
+    profile = g.get('_query_profile')
+    if profile is not None:
+        profile.status = response.status_code
+    return response
+
+
+def _finish_request(exc=None):
+    profile = g.pop('_query_profile', None)
+    if profile is None:
+        return
+    latency_ms = (time.perf_counter() - profile.started) * 1000
+    endpoint = _endpoint_name()
+    threshold = Config.DB_N_PLUS_ONE_THRESHOLD
+    repeated = [(statement, count) for statement, count in profile.repeats.items() if count >= threshold]
+    new_n_plus_one = []
+
+    with _lock:
+        stats = _endpoints.get(endpoint)
+        if stats is None:
+            stats = _endpoints[endpoint] = EndpointStats()
+        stats.requests += 1
+        if exc is not None or (profile.status or 0) >= 500:
+            stats.errors += 1
+        stats.latency_ms.add(latency_ms)
+        stats.db_ms.add(profile.db_ms)
+        stats.statements.add(profile.statements)
+        if profile.slowest_ms > stats.slowest_ms:
+            stats.slowest_ms = profile.slowest_ms
+            stats.slowest_statement = profile.slowest_statement
+        for statement, count in repeated:
+            counts = stats.n_plus_one.get(statement)
+            if counts is None:
+                if len(stats.n_plus_one) >= MAX_N_PLUS_ONE_PER_ENDPOINT:
+                    continue
+                counts = stats.n_plus_one[statement] = {'requests': 0, 'max_repeats': 0}
+            counts['requests'] += 1
+            counts['max_repeats'] = max(counts['max_repeats'], count)
+            if (endpoint, statement) not in _n_plus_one_reported:
+                _n_plus_one_reported.add((endpoint, statement))
+                new_n_plus_one.append((statement, count))
+
+    for statement, count in new_n_plus_one:
+        logger.warning(f"⚠️ N+1 query pattern in {endpoint}: {count}x {statement}")
+
+
+def init_query_profiler(app):
+    """Profile every request of `app` and every statement on pooled connections."""
+    add_statement_observer(record_statement)
+    app.before_request(_start_request)
+    app.after_request(_note_status)
+    app.teardown_request(_finish_request)
+
+
+SORT_KEYS = {
+    'latency': lambda stats: stats.latency_ms.total,
+    'db': lambda stats: stats.db_ms.total,
+    'statements': lambda stats: stats.statements.total,
+    'requests': lambda stats: stats.requests,
+    'slowest': lambda stats: stats.slowest_ms,
+}
+
+
+def get_endpoint_profiles(sort='db', limit=None):
+    """Endpoint aggregates, heaviest first (by total latency, DB time, statements, ...)"""
+    key = SORT_KEYS.get(sort, SORT_KEYS['db'])
+    with _lock:
+        ranked = sorted(_endpoints.items(), key=lambda item: key(item[1]), reverse=True)
+        return [stats.snapshot(endpoint) for endpoint, stats in ranked[:limit]]
+
+
+def get_slow_queries():
+    """Most recent slow statements, newest first"""
+    with _lock:
+        return list(reversed(_slow_queries))
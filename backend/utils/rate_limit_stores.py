@@ -0,0 +1,255 @@
+"""
+Storage backends for RateLimiter.
+
+- MemoryRateLimitStore: per-process counters (tests, single-process runs)
+- SQLiteRateLimitStore: one WAL-mode SQLite file shared by every gunicorn
+  worker on the node, so a client can't multiply its limit by the number
+  of workers it happens to hit
+- DatabaseRateLimitStore: counters in PostgreSQL, for limits that must
+  survive restarts or be shared across nodes (optional fallback)
+
+Every store implements hit / purge_expired. hit() checks and records a
+request in one atomic step and keeps O(1) state per key:
+- sliding windows use the two-bucket sliding-window counter (the previous
+  bucket's count is weighted by how much of it still overlaps the window)
+- fixed windows start at the key's first request and reset after it
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from backend.utils.state_dir import private_state_dir
+
+logger = logging.getLogger(__name__)
+
+
+def default_rate_limit_path():
+    """File in the per-user private state dir (shared by all workers of that user)"""
+    return os.path.join(private_state_dir(), 'rate_limits.sqlite3')
+
+
+def apply_hit(state, now, limit, window_seconds, sliding=True):
+    """
+    Pure counter step shared by all stores.
+    state is (window_start, count, prev_count) or None for a new key.
+    Returns (new_state, allowed, remaining, reset_at, expires_at).
+    Denied requests are not counted.
+    """
+    if sliding:
+        window_start = math.floor(now / window_seconds) * window_seconds
+        count, prev_count = 0, 0
+        if state is not None:
+            if state[0] == window_start:
+                count, prev_count = state[1], state[2]
+            elif state[0] == window_start - window_seconds:
+                prev_count = state[1]
+        overlap = 1 - (now - window_start) / window_seconds
+        used = prev_count * overlap + count
+        reset_at = now + window_seconds
+        expires_at = window_start + 2 * window_seconds
+    else:
+        if state is None or now >= state[0] + window_seconds:
+            window_start, count = now, 0
+        else:
+            window_start, count = state[0], state[1]
+        prev_count = 0
+        used = count
+        reset_at = window_start + window_seconds
+        expires_at = reset_at
+
+    allowed = used + 1 <= limit
+    if allowed:
+        count += 1
+        used += 1
+    remaining = max(0, int(limit - used))
+    return (window_start, count, prev_count), allowed, remaining, reset_at, expires_at
+
+
+class _Stripe:
+    """One independently locked shard of the memory store."""
+
+    __slots__ = ('lock', 'entries')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> (window_start, count, prev_count, expires_at)
+        self.entries = {}
+
+
+class MemoryRateLimitStore:
+    """
+    In-process counters spread over lock stripes, so requests for
+    different keys never wait on each other.
+    """
+
+    name = 'memory'
+
+    def __init__(self, stripes=16):
+        self._stripes = [_Stripe() for _ in range(max(1, stripes))]
+
+    def _stripe_for(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def hit(self, key, limit, window_seconds, sliding=True):
+        now = time.time()
+        stripe = self._stripe_for(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            state, allowed, remaining, reset_at, expires_at = apply_hit(
+                entry[:3] if entry else None, now, limit, window_seconds, sliding
+            )
+            stripe.entries[key] = state + (expires_at,)
+        return allowed, remaining, reset_at
+
+    def purge_expired(self):
+        now = time.time()
+        removed = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                expired = [k for k, entry in stripe.entries.items() if entry[3] <= now]
+                for key in expired:
+                    del stripe.entries[key]
+                removed += len(expired)
+        return removed
+
+    def __len__(self):
+        return sum(len(stripe.entries) for stripe in self._stripes)
+
+
+class SQLiteRateLimitStore:
+    """Node-wide counters in a single SQLite file (WAL mode)."""
+
+    name = 'sqlite'
+
+    def __init__(self, path=None, timeout=5.0):
+        self.path = path or default_rate_limit_path()
+        self.timeout = timeout
+        self._local = threading.local()
+        self._init_store()
+
+    def _connect(self):
+        # One connection per thread; never reuse a connection inherited across fork()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_store(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                window_start REAL NOT NULL,
+                count INTEGER NOT NULL,
+                prev_count INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_expires ON rate_limits (expires_at)")
+
+    def hit(self, key, limit, window_seconds, sliding=True):
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front, so read-check-write is atomic across workers
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT window_start, count, prev_count FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            state, allowed, remaining, reset_at, expires_at = apply_hit(
+                row, time.time(), limit, window_seconds, sliding
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (key, window_start, count, prev_count, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key,) + state + (expires_at,)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, remaining, reset_at
+
+    def purge_expired(self):
+        return self._connect().execute(
+            "DELETE FROM rate_limits WHERE expires_at <= ?", (time.time(),)
+        ).rowcount
+
+
+class DatabaseRateLimitStore:
+    """Durable counters in PostgreSQL (row-locked per key)."""
+
+    name = 'database'
+
+    def __init__(self, database):
+        self.db = database
+
+    def init_tables(self):
+        self.db.execute_query("""
+            CREATE TABLE IF NOT EXISTS rate_limit_counters (
+                key VARCHAR(255) PRIMARY KEY,
+                window_start DOUBLE PRECISION NOT NULL,
+                count INTEGER NOT NULL,
+                prev_count INTEGER NOT NULL,
+                expires_at DOUBLE PRECISION NOT NULL
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_rate_limit_counters_expires
+            ON rate_limit_counters (expires_at);
+        """)
+
+    def hit(self, key, limit, window_seconds, sliding=True):
+        with self.db.get_cursor() as cursor:
+            # Make sure the row exists, then lock it for the read-check-write
+            cursor.execute("""
+                INSERT INTO rate_limit_counters (key, window_start, count, prev_count, expires_at)
+                VALUES (%s, 0, 0, 0, 0)
+                ON CONFLICT (key) DO NOTHING
+            """, (key,))
+            cursor.execute("""
+                SELECT window_start, count, prev_count, expires_at
+                FROM rate_limit_counters WHERE key = %s FOR UPDATE
+            """, (key,))
+            row = cursor.fetchone()
+
+            now = time.time()
+            state = None
+            if row['expires_at'] > now:
+                state = (row['window_start'], row['count'], row['prev_count'])
+            state, allowed, remaining, reset_at, expires_at = apply_hit(
+                state, now, limit, window_seconds, sliding
+            )
+            cursor.execute("""
+                UPDATE rate_limit_counters
+                SET window_start = %s, count = %s, prev_count = %s, expires_at = %s
+                WHERE key = %s
+            """, state + (expires_at, key))
+        return allowed, remaining, reset_at
+
+    def purge_expired(self):
+        return self.db.execute_query(
+            "DELETE FROM rate_limit_counters WHERE expires_at <= %s", (time.time(),)
+        )
+
+
+def create_rate_limit_store(kind=None, path=None, database=None):
+    """Build the configured store, falling back to in-process memory."""
+    kind = (kind or 'memory').lower()
+    try:
+        if kind == 'sqlite':
+            return SQLiteRateLimitStore(path=path)
+        if kind == 'database' and database is not None:
+            store = DatabaseRateLimitStore(database)
+            store.init_tables()
+            return store
+        if kind != 'memory':
+            logger.warning(f"⚠️ Unknown rate limit store '{kind}', using in-process counters")
+    except Exception as e:
+        logger.warning(f"⚠️ Rate limit store '{kind}' unavailable ({e}), using in-process counters")
+    return MemoryRateLimitStore()
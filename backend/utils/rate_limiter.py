@@ -1,60 +1,67 @@
 """
 Rate Limiter for QuickCart
-Implements database-backed rate limiting to prevent abuse
+Implements rate limiting to prevent abuse
 - 20 OTP requests per day per phone number
 - 3 OTP verification attempts per OTP
-- General API rate limiting
+- General API rate limiting (sliding window)
+Counters live in a pluggable store (see rate_limit_stores): node-wide
+SQLite by default, optionally backed by PostgreSQL as a durable fallback.
+Each check is a single atomic check-and-record; expired counters are
+swept in the background, never on the request path, so there is no daily
+reset job (reset_daily_limits and the otp_rate_limits / api_rate_limits
+tables are gone; see migrate_rate_limits.py).
 """
 from datetime import datetime, timedelta
+from backend.config.config import Config
 from backend.utils.database import db
+from backend.utils.rate_limit_stores import create_rate_limit_store, DatabaseRateLimitStore
 from flask import request
 import logging
 
 logger = logging.getLogger(__name__)
 
 class RateLimiter:
-    """Database-backed rate limiter"""
-    
+    """Store-backed rate limiter"""
+
+    store = None
+    fallback = None
+
     @staticmethod
     def init_rate_limit_tables():
-        """Initialize rate limiting tables in database"""
+        """Initialize the durable rate limit table in database"""
         try:
-            # OTP rate limiting table
-            otp_rate_limit_table = """
-                CREATE TABLE IF NOT EXISTS otp_rate_limits (
-                    id SERIAL PRIMARY KEY,
-                    identifier VARCHAR(255) NOT NULL,
-                    request_count INTEGER DEFAULT 1,
-                    last_request TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    reset_date DATE DEFAULT CURRENT_DATE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                
-                CREATE INDEX IF NOT EXISTS idx_identifier_date 
-                ON otp_rate_limits (identifier, reset_date);
-            """
-            
-            # API rate limiting table
-            api_rate_limit_table = """
-                CREATE TABLE IF NOT EXISTS api_rate_limits (
-                    id SERIAL PRIMARY KEY,
-                    ip_address VARCHAR(50) NOT NULL,
-                    endpoint VARCHAR(255) NOT NULL,
-                    request_count INTEGER DEFAULT 1,
-                    window_start TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                
-                CREATE INDEX IF NOT EXISTS idx_ip_endpoint 
-                ON api_rate_limits (ip_address, endpoint, window_start);
-            """
-            
-            db.execute_query(otp_rate_limit_table)
-            db.execute_query(api_rate_limit_table)
+            DatabaseRateLimitStore(db).init_tables()
             logger.info("✅ Rate limit tables initialized")
-            
+
         except Exception as e:
             logger.error(f"❌ Error initializing rate limit tables: {e}")
+
+    @staticmethod
+    def init_stores():
+        """Build the configured primary and fallback counter stores"""
+        RateLimiter.store = create_rate_limit_store(Config.RATE_LIMIT_BACKEND, Config.RATE_LIMIT_PATH, db)
+        RateLimiter.fallback = None
+        if Config.RATE_LIMIT_FALLBACK:
+            RateLimiter.fallback = create_rate_limit_store(Config.RATE_LIMIT_FALLBACK, Config.RATE_LIMIT_PATH, db)
+        logger.info(
+            f"✅ Rate limiter using {RateLimiter.store.name} store"
+            + (f" (fallback: {RateLimiter.fallback.name})" if RateLimiter.fallback else "")
+        )
+
+    @staticmethod
+    def _hit(key, limit, window_seconds, sliding=True):
+        """
+        Check and record one request. Returns (allowed, remaining, reset_at)
+        or None when no store is usable (callers then fail open).
+        """
+        for store in (RateLimiter.store, RateLimiter.fallback):
+            if store is None:
+                continue
+            try:
+                return store.hit(key, limit, window_seconds, sliding)
+            except Exception as e:
+                logger.warning(f"⚠️ Rate limit store {store.name} failed: {e}")
+        return None
     
     @staticmethod
     def check_otp_rate_limit(identifier, max_requests=20):
@@ -62,51 +69,17 @@ class RateLimiter:
         Check if identifier (phone/email) has exceeded daily OTP limit
         Returns: (allowed: bool, remaining: int, reset_time: datetime)
         """
-        try:
-            today = datetime.now().date()
-            
-            # Get or create rate limit record for today
-            query = """
-                SELECT * FROM otp_rate_limits 
-                WHERE identifier = %s AND reset_date = %s
-            """
-            record = db.execute_query_one(query, (identifier, today))
-            
-            if not record:
-                # First request today - create record
-                insert_query = """
-                    INSERT INTO otp_rate_limits (identifier, request_count, reset_date)
-                    VALUES (%s, 1, %s)
-                    RETURNING *
-                """
-                db.execute_query(insert_query, (identifier, today))
-                
-                reset_time = datetime.combine(today + timedelta(days=1), datetime.min.time())
-                return True, max_requests - 1, reset_time
-            
-            # Check if limit exceeded
-            if record['request_count'] >= max_requests:
-                reset_time = datetime.combine(today + timedelta(days=1), datetime.min.time())
-                return False, 0, reset_time
-            
-            # Increment counter
-            update_query = """
-                UPDATE otp_rate_limits 
-                SET request_count = request_count + 1,
-                    last_request = CURRENT_TIMESTAMP
-                WHERE identifier = %s AND reset_date = %s
-            """
-            db.execute_query(update_query, (identifier, today))
-            
-            remaining = max_requests - (record['request_count'] + 1)
-            reset_time = datetime.combine(today + timedelta(days=1), datetime.min.time())
-            
-            return True, remaining, reset_time
-            
-        except Exception as e:
-            logger.error(f"Rate limit check error: {e}")
+        today = datetime.now().date()
+        reset_time = datetime.combine(today + timedelta(days=1), datetime.min.time())
+
+        # Keyed by date so the count resets at midnight
+        result = RateLimiter._hit(f"otp:{identifier}:{today.isoformat()}", max_requests, 86400, sliding=False)
+        if result is None:
             # On error, allow request but log it
             return True, max_requests, datetime.now() + timedelta(days=1)
+
+        allowed, remaining, _ = result
+        return allowed, remaining, reset_time
     
     @staticmethod
     def check_api_rate_limit(ip_address, endpoint, max_requests=100, window_minutes=60):
@@ -114,47 +87,12 @@ class RateLimiter:
         Check API rate limit for IP and endpoint
         Returns: (allowed: bool, remaining: int, reset_time: datetime)
         """
-        try:
-            window_start = datetime.now() - timedelta(minutes=window_minutes)
-            
-            # Clean up old records
-            cleanup_query = """
-                DELETE FROM api_rate_limits 
-                WHERE window_start < %s
-            """
-            db.execute_query(cleanup_query, (window_start,))
-            
-            # Get current window records
-            query = """
-                SELECT SUM(request_count) as total_requests
-                FROM api_rate_limits 
-                WHERE ip_address = %s 
-                AND endpoint = %s 
-                AND window_start >= %s
-            """
-            result = db.execute_query_one(query, (ip_address, endpoint, window_start))
-            
-            current_count = int(result['total_requests'] or 0)
-            
-            if current_count >= max_requests:
-                reset_time = datetime.now() + timedelta(minutes=window_minutes)
-                return False, 0, reset_time
-            
-            # Record this request
-            insert_query = """
-                INSERT INTO api_rate_limits (ip_address, endpoint, request_count, window_start)
-                VALUES (%s, %s, 1, CURRENT_TIMESTAMP)
-            """
-            db.execute_query(insert_query, (ip_address, endpoint))
-            
-            remaining = max_requests - (current_count + 1)
-            reset_time = datetime.now() + timedelta(minutes=window_minutes)
-            
-            return True, remaining, reset_time
-            
-        except Exception as e:
-            logger.error(f"API rate limit check error: {e}")
+        result = RateLimiter._hit(f"api:{endpoint}:{ip_address}", max_requests, window_minutes * 60)
+        if result is None:
             return True, max_requests, datetime.now() + timedelta(hours=1)
+
+        allowed, remaining, reset_at = result
+        return allowed, remaining, datetime.fromtimestamp(reset_at)
     
     @staticmethod
     def get_client_ip():
@@ -167,18 +105,20 @@ class RateLimiter:
             return request.remote_addr or 'unknown'
     
     @staticmethod
-    def reset_daily_limits():
-        """Reset daily OTP limits - run as cron job"""
-        try:
-            yesterday = datetime.now().date() - timedelta(days=1)
-            delete_query = "DELETE FROM otp_rate_limits WHERE reset_date < %s"
-            db.execute_query(delete_query, (yesterday,))
-            logger.info("✅ Daily OTP limits reset")
-        except Exception as e:
-            logger.error(f"❌ Error resetting daily limits: {e}")
+    def purge_expired():
+        """Drop expired counters - run periodically in the background"""
+        removed = 0
+        for store in (RateLimiter.store, RateLimiter.fallback):
+            if store is None:
+                continue
+            try:
+                removed += store.purge_expired() or 0
+            except Exception as e:
+                logger.error(f"❌ Error purging {store.name} rate limits: {e}")
+        return removed
 
-# Initialize tables on module load
+# Initialize stores on module load
 try:
-    RateLimiter.init_rate_limit_tables()
+    RateLimiter.init_stores()
 except Exception as e:
     logger.error(f"Failed to initialize rate limiter: {e}")
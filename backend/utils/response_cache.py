@@ -1,45 +1,25 @@
-import copy
 import threading
-import time
+
+from backend.config.config import Config
+from backend.utils.cache_backends import create_cache_backend
 
 
 class ResponseCache:
-    """Simple in-memory TTL cache for API response payloads."""
+    """TTL cache for API response payloads on a pluggable storage backend."""
 
-    def __init__(self, max_items=1000):
+    def __init__(self, max_items=1000, backend=None):
         self.max_items = max_items
-        self._data = {}
+        if backend is None:
+            backend = create_cache_backend('memory', max_items=max_items)
+        self.backend = backend
         self._lock = threading.Lock()
         self._key_locks = {}
 
-    def _purge_expired(self, now):
-        expired = [k for k, v in self._data.items() if v['expires_at'] <= now]
-        for key in expired:
-            self._data.pop(key, None)
-
     def get(self, key):
-        now = time.time()
-        with self._lock:
-            self._purge_expired(now)
-            item = self._data.get(key)
-            if not item:
-                return None
-            return copy.deepcopy(item['value'])
+        return self.backend.get(key)
 
     def set(self, key, value, ttl_seconds=30):
-        now = time.time()
-        with self._lock:
-            self._purge_expired(now)
-
-            if len(self._data) >= self.max_items:
-                oldest_key = min(self._data, key=lambda k: self._data[k]['created_at'])
-                self._data.pop(oldest_key, None)
-
-            self._data[key] = {
-                'value': copy.deepcopy(value),
-                'created_at': now,
-                'expires_at': now + ttl_seconds,
-            }
+        self.backend.set(key, value, ttl_seconds=ttl_seconds)
 
     def _get_key_lock(self, key):
         with self._lock:
@@ -62,17 +42,72 @@ class ResponseCache:
 
             value = producer()
             self.set(key, value, ttl_seconds=ttl_seconds)
-            return copy.deepcopy(value)
+            return value
 
-    def invalidate(self, prefix=None):
-        with self._lock:
-            if prefix is None:
-                self._data.clear()
-                return
+    def get_many(self, keys):
+        return self.backend.get_many(keys)
 
-            keys = [k for k in self._data.keys() if k.startswith(prefix)]
-            for key in keys:
-                self._data.pop(key, None)
+    def set_many(self, items, ttl_seconds=30):
+        self.backend.set_many(items, ttl_seconds=ttl_seconds)
 
+    def delete(self, key):
+        self.backend.delete(key)
 
-response_cache = ResponseCache()
+    def invalidate(self, prefix=None):
+        self.backend.invalidate(prefix)
+
+
+response_cache = ResponseCache(
+    max_items=Config.RESPONSE_CACHE_MAX_ITEMS,
+    backend=create_cache_backend(
+        Config.RESPONSE_CACHE_BACKEND,
+        path=Config.RESPONSE_CACHE_PATH,
+        max_items=Config.RESPONSE_CACHE_MAX_ITEMS,
+    ),
+)
+
+# Per-user lookups (phone -> user id) are high-cardinality,
+# so they get their own bounded store instead of evicting catalog payloads
+identity_cache = ResponseCache(
+    max_items=Config.IDENTITY_CACHE_MAX_ITEMS,
+    backend=create_cache_backend(
+        Config.RESPONSE_CACHE_BACKEND,
+        path=Config.IDENTITY_CACHE_PATH,
+        name='identity_cache',
+        max_items=Config.IDENTITY_CACHE_MAX_ITEMS,
+    ),
+)
+
+# Product search results: one entry per distinct search string, kept apart
+# so search-as-you-type traffic can't evict the catalog keys
+search_cache = ResponseCache(
+    max_items=Config.SEARCH_CACHE_MAX_ITEMS,
+    backend=create_cache_backend(
+        Config.RESPONSE_CACHE_BACKEND,
+        path=Config.SEARCH_CACHE_PATH,
+        name='search_cache',
+        max_items=Config.SEARCH_CACHE_MAX_ITEMS,
+    ),
+)
+
+# Rating summaries: one entry per product, read in batches by product grids
+rating_cache = ResponseCache(
+    max_items=Config.RATING_CACHE_MAX_ITEMS,
+    backend=create_cache_backend(
+        Config.RESPONSE_CACHE_BACKEND,
+        path=Config.RATING_CACHE_PATH,
+        name='rating_cache',
+        max_items=Config.RATING_CACHE_MAX_ITEMS,
+    ),
+)
+
+# Version markers (catalog:version): a handful of tiny keys in their own
+# store, so the size purge of the payload caches can never evict them
+version_cache = ResponseCache(
+    max_items=100,
+    backend=create_cache_backend(
+        Config.RESPONSE_CACHE_BACKEND,
+        max_items=100,
+        name='version_cache',
+    ),
+)
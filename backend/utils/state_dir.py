@@ -0,0 +1,38 @@
+"""
+Private on-disk location for node-local state (shared caches, rate limit
+counters, report job files).
+
+The default lives under the system temp dir, which every local user can
+write to, so the directory is created with mode 0700 and an existing one
+is only used when it is a real directory owned by this user and closed to
+group / others. Anything else raises PermissionError instead of handing a
+file somebody else controls to the workers.
+"""
+import getpass
+import os
+import stat
+import tempfile
+
+
+def ensure_private_dir(path):
+    """Create `path` with mode 0700, or check that the existing one is private to this user"""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} is not a directory")
+    # No owner / mode bits to check on Windows
+    if hasattr(os, 'getuid') and (info.st_uid != os.getuid() or info.st_mode & 0o077):
+        raise PermissionError(f"{path} must be owned by this user and have mode 0700")
+    return path
+
+
+def private_state_dir():
+    """Per-user 0700 directory in the system temp dir (shared by all workers of that user)"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = 'default'
+    return ensure_private_dir(os.path.join(tempfile.gettempdir(), f'quickcart_{user}'))
@@ -32,8 +32,7 @@ DEFAULT_TABLE_ORDER = [
     "banners",
     "offers",
     "product_reviews",
-    "otp_rate_limits",
-    "api_rate_limits",
+    "rate_limit_counters",
 ]
 
 
@@ -223,6 +223,9 @@ CREATE INDEX idx_orders_phone ON orders(phone);
 CREATE INDEX idx_orders_date ON orders(order_date);
 CREATE INDEX idx_orders_status ON orders(status);
 CREATE INDEX idx_order_items_order ON order_items(order_id);
+CREATE INDEX idx_order_timeline_order ON order_timeline(order_id);
+CREATE INDEX idx_orders_created_id ON orders(created_at DESC, id DESC);
+CREATE INDEX idx_orders_status_created_id ON orders(status, created_at DESC, id DESC);
 CREATE INDEX idx_cart_user ON cart_items(user_id);
 CREATE INDEX idx_wishlist_user ON wishlist_items(user_id);
 CREATE INDEX idx_offers_code ON offers(code);